@@ -0,0 +1,218 @@
+"""
+A module implementing a scanner and a persistent index of local archives of Sentinel .SAFE products
+"""
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ThreadPoolExecutor
+from shapely import wkt
+from shapely.geometry import Polygon, box
+from shapely.prepared import prep
+from sentinelhub import CRS, BBox
+from sentinel_io_utils import read_manifests, get_time_stamps_from_filenames
+
+MEASUREMENT_PATTERN = re.compile(r'^s1[a-d]-[^-]+-[^-]+-(?P<band>[a-z]{2})-.*\.tiff?$|'
+                                 r'_(?P<s2_band>B\d[\dA]|TCI|AOT|WVP|SCL)(_\d+m)?\.jp2$', re.IGNORECASE)
+MAX_WORKERS = 16
+INDEX_COLUMNS = ('safe_path', 'measurement_path', 'band', 'start_time', 'bounds', 'footprint', 'epsg')
+
+
+def _find_safe_folders(folder):
+    """ Walks a folder iteratively and returns all .SAFE folders below it without descending into them
+    """
+    safe_folders, folders = [], [folder]
+    while folders:
+        try:
+            entries = list(os.scandir(folders.pop()))
+        except (PermissionError, FileNotFoundError):
+            continue
+
+        for entry in entries:
+            if not entry.is_dir(follow_symlinks=False):
+                continue
+            if entry.name.upper().endswith('.SAFE'):
+                safe_folders.append(entry.path)
+            else:
+                folders.append(entry.path)
+
+    return safe_folders
+
+
+def _find_measurement_files(safe_folder):
+    """ Lists the measurement files of a Sentinel-1 product (measurement/*.tiff) or the band files of a Sentinel-2
+    product (GRANULE/*/IMG_DATA/**/*.jp2) together with their polarisation or band name
+    """
+    measurement_files, folders = [], [os.path.join(safe_folder, 'measurement'), os.path.join(safe_folder, 'GRANULE')]
+    while folders:
+        try:
+            entries = list(os.scandir(folders.pop()))
+        except (NotADirectoryError, FileNotFoundError):
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                folders.append(entry.path)
+                continue
+
+            name_match = MEASUREMENT_PATTERN.search(entry.name)
+            if name_match:
+                band = name_match.group('band') or name_match.group('s2_band')
+                measurement_files.append((entry.path, band.upper()))
+
+    return measurement_files
+
+
+class SafeArchiveIndex:
+    """ An index of the measurement files of all .SAFE products below the root of a local archive, e.g. `D:\\SAR`.
+
+    Each row of the index describes one measurement file by its product folder, path, polarisation (Sentinel-1) or
+    band name (Sentinel-2), sensing time and the product footprint. Footprints are stored as WGS84 longitude/latitude
+    polygons. The index can be saved to and loaded from a single .npz file, so queries do not touch the archive.
+    """
+    def __init__(self, columns):
+        """
+        :param columns: Columns of the index, see `INDEX_COLUMNS`
+        :type columns: dict(str, numpy.ndarray)
+        """
+        missing_columns = set(INDEX_COLUMNS).difference(columns)
+        if missing_columns:
+            raise ValueError(f'The index is missing the columns {missing_columns}')
+
+        self.columns = {name: np.asarray(columns[name]) for name in INDEX_COLUMNS}
+        self._geometries = None
+
+    def __len__(self):
+        return len(self.columns['measurement_path'])
+
+    @classmethod
+    def build(cls, archive_root, max_workers=MAX_WORKERS, processes=None):
+        """ Scans an archive for .SAFE products and builds an index of their measurement files. The folders below the
+        root are walked in a thread pool and the manifest files are parsed in a process pool.
+
+        :param archive_root: Root folder of the archive
+        :type archive_root: str
+        :param max_workers: Number of threads walking the archive
+        :type max_workers: int
+        :param processes: Number of processes parsing manifest files, by default the number of CPUs
+        :type processes: int or None
+        :return: The index of the archive
+        :rtype: SafeArchiveIndex
+        """
+        top_level_folders = [entry.path for entry in os.scandir(archive_root) if entry.is_dir()]
+        safe_folders = [folder for folder in top_level_folders if folder.upper().endswith('.SAFE')]
+        top_level_folders = [folder for folder in top_level_folders if not folder.upper().endswith('.SAFE')]
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for folders in executor.map(_find_safe_folders, top_level_folders):
+                safe_folders.extend(folders)
+            measurement_files = list(executor.map(_find_measurement_files, safe_folders))
+
+        manifests = read_manifests(safe_folders, fields=('footprint', 'epsg'), max_workers=processes) \
+            if safe_folders else []
+
+        rows = []
+        for safe_folder, manifest, files in zip(safe_folders, manifests, measurement_files):
+            if 'footprint' not in manifest:
+                continue
+            # manifest coordinates are stated in latitude/longitude order
+            footprint = Polygon([(lon, lat) for lat, lon in manifest['footprint']])
+            for measurement_path, band in files:
+                rows.append((safe_folder, measurement_path, band, footprint.bounds, footprint.wkt,
+                             manifest.get('epsg', '4326')))
+
+        safe_paths, measurement_paths, bands, bounds, footprints, epsg_codes = zip(*rows) if rows else [()] * 6
+
+        return cls({
+            'safe_path': np.array(safe_paths, dtype=str),
+            'measurement_path': np.array(measurement_paths, dtype=str),
+            'band': np.array(bands, dtype=str),
+            'start_time': get_time_stamps_from_filenames([os.path.basename(path) for path in safe_paths]),
+            'bounds': np.array(bounds, dtype=np.float64).reshape(-1, 4),
+            'footprint': np.array(footprints, dtype=str),
+            'epsg': np.array(epsg_codes, dtype=str)
+        })
+
+    def save(self, index_path):
+        """ Saves the index into a compressed .npz file
+
+        :param index_path: Path of the index file
+        :type index_path: str
+        """
+        np.savez_compressed(index_path, **self.columns)
+
+    @classmethod
+    def load(cls, index_path):
+        """ Loads an index from a .npz file written by `save`
+
+        :param index_path: Path of the index file
+        :type index_path: str
+        :return: The loaded index
+        :rtype: SafeArchiveIndex
+        """
+        with np.load(index_path, allow_pickle=False) as index_file:
+            return cls({name: index_file[name] for name in INDEX_COLUMNS})
+
+    def get_mask(self, bbox=None, band=None, start=None, end=None):
+        """ Computes which measurement files satisfy all given conditions, conditions which are None are skipped.
+
+        :param bbox: An area which has to intersect the product footprints. A tuple is interpreted as
+            (min_lon, min_lat, max_lon, max_lat), a BBox is transformed to WGS84 first.
+        :type bbox: BBox or tuple or None
+        :param band: One or several polarisations or band names, e.g. 'VV' or ['B02', 'B03']
+        :type band: str or list of str or None
+        :param start: Earliest sensing time (included)
+        :type start: datetime or str or None
+        :param end: Latest sensing time (excluded)
+        :type end: datetime or str or None
+        :return: A boolean mask over the rows of the index
+        :rtype: numpy.ndarray
+        """
+        mask = np.ones(len(self), dtype=bool)
+
+        if band is not None:
+            mask &= np.isin(self.columns['band'], np.char.upper(np.atleast_1d(band).astype(str)))
+        if start is not None:
+            mask &= self.columns['start_time'] >= np.datetime64(start, 's')
+        if end is not None:
+            mask &= self.columns['start_time'] < np.datetime64(end, 's')
+
+        if bbox is not None and mask.any():
+            if isinstance(bbox, BBox):
+                bbox = tuple(bbox.transform_bounds(CRS.WGS84))
+            min_x, min_y, max_x, max_y = bbox
+            bounds = self.columns['bounds']
+            mask &= (bounds[:, 0] <= max_x) & (bounds[:, 2] >= min_x) & (bounds[:, 1] <= max_y) & \
+                (bounds[:, 3] >= min_y)
+
+            prepared_bbox = prep(box(min_x, min_y, max_x, max_y))
+            geometries = self._get_geometries()
+            for index in np.flatnonzero(mask):
+                mask[index] = prepared_bbox.intersects(geometries[index])
+
+        return mask
+
+    def query(self, bbox=None, band=None, start=None, end=None):
+        """ Returns the measurement files which satisfy all given conditions, see `get_mask`. E.g. all VV measurements
+        intersecting a bounding box in 2021:
+
+            index.query(bbox=aoi, band='VV', start='2021-01-01', end='2022-01-01')
+
+        :return: A table with one row per measurement file, sorted by sensing time
+        :rtype: pandas.DataFrame
+        """
+        mask = self.get_mask(bbox=bbox, band=band, start=start, end=end)
+        table = pd.DataFrame({name: self.columns[name][mask] for name in INDEX_COLUMNS if name != 'bounds'})
+        return table.sort_values('start_time', ignore_index=True)
+
+    def _get_geometries(self):
+        """ Parses the footprints of the index once, products share the geometry objects of their footprints
+        """
+        if self._geometries is None:
+            parsed = {}
+            for footprint in self.columns['footprint']:
+                if footprint not in parsed:
+                    parsed[footprint] = wkt.loads(footprint)
+            self._geometries = [parsed[footprint] for footprint in self.columns['footprint']]
+        return self._geometries
@@ -11,25 +11,59 @@ Copyright (c) 2019 Drew Bollinger (DevelopmentSeed)
 This source code is licensed under the MIT license found in the LICENSE
 file in the root directory of this source tree.
 """
+import io
+import os
+import gzip
+import math
+import pickle
+import uuid
+import atexit
+import bisect
+import contextvars
+import inspect
 import logging
+import weakref
+import threading
 import fs
 import rasterio
+import rasterio.shutil
 import numpy as np
 
 from abc import abstractmethod
+from collections import deque
+from contextlib import ExitStack, closing, contextmanager
+from functools import partial
+from concurrent.futures import Future, ThreadPoolExecutor
+from rasterio.vrt import WarpedVRT
+from rasterio.enums import MaskFlags, Resampling
+from rasterio.warp import calculate_default_transform, reproject
 from sentinelhub import CRS, BBox
-from pyproj import Transformer
-from sentinel_io_utils import get_footprint_from_gcps
-from eolearn.core import EOTask, EOPatch, FeatureType
-from filesystem_utils import get_base_filesystem_and_path
+from geometry_utils import transform_points
+from sentinel_io_utils import get_gcp_geolocation
+from eolearn.core import EOTask, EOPatch, FeatureType, OverwritePermission
+from eolearn.core.eodata_io import FeatureIO, walk_eopatch, walk_filesystem
+from fs_s3fs import S3FS
+from filesystem_utils import PREFETCH_DEPTH, PrefetchingReader, get_filesystem, get_base_filesystem_and_path, \
+    open_s3_file
 
 LOGGER = logging.getLogger(__name__)
 
+MAX_WORKERS = 8
+SAVE_CODECS = ('none', 'gzip')
+GZIP_CHUNK_SIZE = 2 ** 24
+OVERVIEW_STRIP_HEIGHT = 256
+# since rasterio 1.4 GDAL can read images through Python file objects instead of an in-memory copy of them
+RASTERIO_OPENER = 'opener' in inspect.signature(rasterio.open).parameters
 
-def get_distance_point_to_line(A: tuple, B: tuple, P: tuple):
-    AB = (B[0] - A[0], B[1] - A[1])
-    AP = (P[0] - A[0], P[1] - A[1])
-    return abs(AB[0] * AP[1] - AB[1] * AP[0]) / np.sqrt(AB[0] ** 2 + AB[1] ** 2)
+# latest views of the filled parts of time stack buffers with spare capacity, by the id of the buffer
+_TIME_STACK_VIEWS = {}
+# saved states of EOPatches by their id, EOPatches are not hashable and cannot be keys of a WeakKeyDictionary
+_SAVED_STATES = {}
+_META_FEATURE_TYPES = (FeatureType.BBOX, FeatureType.TIMESTAMP, FeatureType.META_INFO)
+# files of memory-mapped arrays which have not been removed yet, and those of them whose arrays have been collected
+_MEMMAP_FILES = set()
+_PENDING_MEMMAP_FILES = set()
+_MEMMAP_FILES_LOCK = threading.Lock()
 
 
 def get_window(upper_left: tuple, bottom_right: tuple, crs_transform, ref_crs='epsg:4326', out_crs='epsg:32632'):
@@ -43,17 +77,364 @@ def get_window(upper_left: tuple, bottom_right: tuple, crs_transform, ref_crs='e
     :param crs_transform:
     :type crs_transform: Rasterio.transform. transform
     """
-    if not ref_crs == out_crs:
-        transformer = Transformer.from_crs(crs_from=ref_crs, crs_to=out_crs)
+    x_coords, y_coords = transform_points((upper_left[0], bottom_right[0]), (upper_left[1], bottom_right[1]),
+                                          crs_from=ref_crs, crs_to=out_crs, always_xy=False)
+
+    return rasterio.windows.from_bounds(left=x_coords.min(), bottom=y_coords.min(), right=x_coords.max(),
+                                        top=y_coords.max(), transform=crs_transform)
+
+
+def read_into(src, out, indexes, window, fill_value=0, boundless=True, resampling=Resampling.nearest):
+    """ Reads bands of a raster window directly into a given array. GDAL writes into the array itself if it is
+    contiguous and of the data type of the raster. Otherwise, e.g. for a strided view into a channel-last array, the
+    bands are read one by one into a single reusable buffer and converted into the array, so no more than one band
+    is held in memory in addition to the output.
+
+    If the array is smaller than the window the window is read decimated. GDAL then reads from the internal or external
+    overview of the image which matches the decimation best, instead of reading and decoding full resolution pixels.
+
+    :param src: An opened raster dataset
+    :type src: rasterio.io.DatasetReader
+    :param out: Array of shape (len(indexes), height, width) into which the data is written
+    :type out: numpy.ndarray
+    :param indexes: Band indexes, starting at 1
+    :type indexes: list(int)
+    :param window: The window to be read, it may exceed the bounds of the raster
+    :type window: rasterio.windows.Window or tuple
+    :param fill_value: Value of pixels outside the bounds of the raster
+    :type fill_value: int or float
+    :param boundless: If `False` the window has to lie within the raster, as required by a `WarpedVRT`
+    :type boundless: bool
+    :param resampling: Resampling method of decimated reads
+    :type resampling: Resampling
+    """
+    if out.flags.c_contiguous and all(np.dtype(src.dtypes[index - 1]) == out.dtype for index in indexes):
+        src.read(indexes=indexes, out=out, window=window, boundless=boundless, fill_value=fill_value,
+                 resampling=resampling)
+        return
+
+    buffers = {}
+    for index, band_out in zip(indexes, out):
+        band_dtype = np.dtype(src.dtypes[index - 1])
+        if band_out.flags.c_contiguous and band_dtype == out.dtype:
+            src.read(indexes=index, out=band_out, window=window, boundless=boundless, fill_value=fill_value,
+                     resampling=resampling)
+            continue
+
+        if band_dtype not in buffers:
+            buffers[band_dtype] = np.empty(band_out.shape, dtype=band_dtype)
+        buffer = buffers[band_dtype]
+
+        src.read(indexes=index, out=buffer, window=window, boundless=boundless, fill_value=fill_value,
+                 resampling=resampling)
+        np.copyto(band_out, buffer, casting='unsafe')
+
+
+def warp_into(src, out, indexes, grid, resampling=Resampling.nearest, nodata=0):
+    """ Warps bands of an image onto a grid and writes them into a given array. Images with a CRS are read through a
+    `WarpedVRT`, so that GDAL only reads the part of the image covering the grid. A `WarpedVRT` ignores ground control
+    points, therefore images referenced by GCPs, e.g. Sentinel-1 GRD, are warped band by band with the GCP transformer
+    of GDAL, which also only reads the needed parts of the image.
+
+    :param src: An opened raster dataset
+    :type src: rasterio.io.DatasetReader
+    :param out: Array of shape (len(indexes), height, width) into which the data is written
+    :type out: numpy.ndarray
+    :param indexes: Band indexes, starting at 1
+    :type indexes: list(int)
+    :param grid: The affine transform, width, height and CRS of the target grid
+    :type grid: (affine.Affine, int, int, str)
+    :param resampling: Resampling method
+    :type resampling: Resampling
+    :param nodata: Value of pixels which are not covered by the image
+    :type nodata: int or float
+    """
+    transform, width, height, crs = grid
+    if src.crs:
+        with WarpedVRT(src, crs=crs, transform=transform, width=width, height=height, resampling=resampling,
+                       nodata=nodata, warp_extras={'NUM_THREADS': 'ALL_CPUS'}) as vrt:
+            read_into(vrt, out, indexes, rasterio.windows.Window(0, 0, width, height), fill_value=nodata,
+                      boundless=False)
+        return
+
+    gcps, gcp_crs = src.gcps
+    buffer = None
+    for index, band_out in zip(indexes, out):
+        if band_out.flags.c_contiguous:
+            destination = band_out
+        else:
+            buffer = np.empty(band_out.shape, dtype=out.dtype) if buffer is None else buffer
+            destination = buffer
+
+        reproject(rasterio.band(src, index), destination, gcps=gcps, src_crs=gcp_crs, dst_transform=transform,
+                  dst_crs=crs, dst_nodata=nodata, resampling=resampling, num_threads=os.cpu_count())
+
+        if destination is buffer:
+            np.copyto(band_out, buffer)
+
+
+def _round_window(window):
+    """ Converts a window given as ((row_start, row_stop), (col_start, col_stop)) or as a window with fractional
+    offsets into a window of whole pixels, as rasterio would round it when reading
+    """
+    if not isinstance(window, rasterio.windows.Window):
+        window = rasterio.windows.Window.from_slices(*window, boundless=True)
+
+    col_off, row_off = round(window.col_off), round(window.row_off)
+    return rasterio.windows.Window(col_off, row_off, round(window.col_off + window.width) - col_off,
+                                   round(window.row_off + window.height) - row_off)
+
+
+def _remove_memmap_file(path):
+    """ Removes the .npy file of a memory-mapped array whose memory map has been garbage collected, together with
+    files which could not be removed before
+    """
+    with _MEMMAP_FILES_LOCK:
+        _PENDING_MEMMAP_FILES.add(path)
+    _remove_pending_memmap_files()
+
+
+def _remove_pending_memmap_files():
+    """ Retries to remove the files of collected memory-mapped arrays, which fails e.g. on Windows while another
+    process still maps them
+    """
+    with _MEMMAP_FILES_LOCK:
+        paths = list(_PENDING_MEMMAP_FILES)
+    _remove_memmap_files(paths, logging.DEBUG)
+
+
+@atexit.register
+def _remove_memmap_files_at_exit():
+    """ Removes the files of all memory-mapped arrays at exit, including those of arrays which are still alive
+    """
+    with _MEMMAP_FILES_LOCK:
+        paths = list(_MEMMAP_FILES)
+    _remove_memmap_files(paths, logging.WARNING)
+
+
+def _remove_memmap_files(paths, log_level):
+    """ Removes the .npy files of memory-mapped arrays, files which cannot be removed are kept for another attempt
+    """
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as exception:
+            LOGGER.log(log_level, 'Could not remove the memory-mapped file %s: %s', path, exception)
+            continue
+
+        with _MEMMAP_FILES_LOCK:
+            _MEMMAP_FILES.discard(path)
+            _PENDING_MEMMAP_FILES.discard(path)
+
+
+def get_valid_mask(src, view, indexes, window=None, nodata=None):
+    """ Derives which pixels of bands, which have just been read into a view, are valid without a second pass over the
+    image. Pixels are invalid if they lie outside of the image, if an internal or alpha mask band of the image masks
+    them or if all bands equal the nodata value. Warped bands are given without a window, their pixels outside of the
+    image have been filled with the nodata value by GDAL.
+
+    :param src: An opened image
+    :type src: rasterio.io.DatasetReader
+    :param view: Bands of shape (bands, height, width) as read by `read_into` or `warp_into`
+    :type view: numpy.ndarray
+    :param indexes: Indexes of the bands in the image, starting at 1
+    :type indexes: list(int)
+    :param window: The window which has been read, None for warped bands
+    :type window: rasterio.windows.Window or tuple or None
+    :param nodata: Value of invalid pixels, by default the nodata value of the image
+    :type nodata: int or float or None
+    :return: A mask of shape (height, width) which is `True` for valid pixels
+    :rtype: numpy.ndarray
+    """
+    _, height, width = view.shape
+    valid = np.ones((height, width), dtype=bool)
+
+    if window is not None:
+        window = _round_window(window)
+        rows = window.row_off + (np.arange(height) + 0.5) * window.height / height
+        cols = window.col_off + (np.arange(width) + 0.5) * window.width / width
+        valid &= ((rows >= 0) & (rows < src.height))[:, np.newaxis] & ((cols >= 0) & (cols < src.width))[np.newaxis, :]
+
+        mask_flags = src.mask_flag_enums[indexes[0] - 1]
+        if MaskFlags.per_dataset in mask_flags or MaskFlags.alpha in mask_flags:
+            valid &= src.read_masks(indexes[0], window=window, boundless=True, out_shape=(height, width)) > 0
+
+    nodata = src.nodata if nodata is None else nodata
+    if nodata is not None:
+        invalid = np.isnan(view) if np.isnan(nodata) else view == nodata
+        valid &= ~np.all(invalid, axis=0)
+
+    return valid
+
+
+def pack_mask(valid):
+    """ Packs a validity mask of shape (..., height, width) into a mask feature of shape (..., height, width / 8, 1),
+    in which each byte holds 8 pixels along the width
+    """
+    return np.packbits(valid, axis=-1)[..., np.newaxis]
+
+
+def unpack_mask(eopatch, feature, time_index=None):
+    """ Unpacks a bit-packed validity mask created by an import task with a `mask_feature`. Masks stay packed in the
+    EOPatch and are unpacked only when they are needed, possibly only a single time frame of them.
+
+    :param eopatch: An EOPatch with a bit-packed mask
+    :type eopatch: EOPatch
+    :param feature: The mask feature
+    :type feature: (FeatureType, str)
+    :param time_index: Index of a single time frame which is unpacked, by default all frames are unpacked
+    :type time_index: int or None
+    :return: A boolean mask with the shape of the imported data and a single band
+    :rtype: numpy.ndarray
+    """
+    feature_type, feature_name = feature
+    packed = eopatch[feature_type][feature_name]
+    if time_index is not None:
+        packed = packed[time_index]
+
+    width = eopatch.meta_info[f'{feature_name}_width']
+    return np.unpackbits(packed[..., 0], axis=-1, count=width).view(bool)[..., np.newaxis]
+
+
+class _SavedState:
+    """ The features of an EOPatch as they are stored in an EOPatch folder. A feature is unchanged as long as the
+    EOPatch holds the same object which was saved or loaded. A lazily loaded feature is replaced in the EOPatch by its
+    value once it is loaded, which is then recorded in place of the `FeatureIO` object. Frames appended to a time stack
+    by `ImportTimeFeatureFromTiffTask` are tracked separately, so that only they have to be written.
+    """
+    def __init__(self, eopatch, location):
+        self.location = location
+        self.values = {}
+        self.appends = {}
+        self.changed = set()
+        self._finalizer = weakref.finalize(eopatch, _SAVED_STATES.pop, id(eopatch), None)
+
+    def update(self, eopatch, features):
+        """ Records the current values of the given features as saved
+        """
+        for feature in features:
+            value = _get_raw_value(eopatch, feature)
+            value_ref = self.values[feature] = _get_weakref(value)
+            if isinstance(value, FeatureIO):
+                finalizer = weakref.finalize(value, self._record_loaded_value, feature, value_ref, vars(value))
+                finalizer.atexit = False
+            self.appends.pop(feature, None)
+            self.changed.discard(feature)
+
+    def _record_loaded_value(self, feature, value_ref, attributes):
+        """ Called once the `FeatureIO` object of a lazily loaded feature has been dropped, records its loaded value
+        """
+        loaded_value = attributes.get('loaded_value')
+        if self.values.get(feature) is value_ref and loaded_value is not None:
+            self.values[feature] = _get_weakref(loaded_value)
+
+    def is_unchanged(self, eopatch, feature):
+        if feature in self.changed or feature not in self.values:
+            return False
+        return _is_same_value(self.values[feature], _get_raw_value(eopatch, feature))
+
+    def get_saved_frames(self, eopatch, feature):
+        """ Returns the number of frames of a time stack which are saved, if all other frames have been appended after
+        them, otherwise None
+        """
+        if feature in self.changed:
+            return None
+        if self.is_unchanged(eopatch, feature):
+            return len(eopatch[feature[0]][feature[1]])
+        if feature in self.appends:
+            value_ref, saved_frames = self.appends[feature]
+            if value_ref() is _get_raw_value(eopatch, feature):
+                return saved_frames
+        return None
+
+
+def _get_raw_value(eopatch, feature):
+    """ Returns the value of a feature without triggering lazy loading
+    """
+    feature_type, feature_name = feature
+    return dict.get(eopatch[feature_type], feature_name)
+
+
+def _get_weakref(value):
+    try:
+        return weakref.ref(value)
+    except TypeError:
+        return None
+
+
+def _is_same_value(value_ref, value):
+    """ Checks if a value is the referenced saved value, or the array of a lazily loaded saved feature
+    """
+    saved_value = None if value_ref is None else value_ref()
+    if saved_value is None or value is None:
+        return False
+    return value is saved_value or (isinstance(saved_value, FeatureIO) and saved_value.loaded_value is value)
+
+
+def _get_location_key(filesystem, patch_location):
+    """ Identifies an EOPatch folder across filesystem objects
+    """
+    if filesystem.hassyspath(patch_location):
+        return os.path.normcase(os.path.abspath(filesystem.getsyspath(patch_location)))
+    return f'{filesystem}{patch_location}'
 
-        x_ul, y_ul = transformer.transform(upper_left[0], upper_left[1])
-        x_lr, y_lr = transformer.transform(bottom_right[0], bottom_right[1])
 
+def _record_saved_state(eopatch, location, features):
+    """ Records that the given features of the EOPatch are stored in the folder at the location
+    """
+    state = _SAVED_STATES.get(id(eopatch))
+    if state is None or state.location != location:
+        state = _SAVED_STATES[id(eopatch)] = _SavedState(eopatch, location)
+    state.update(eopatch, features)
+
+
+def _record_time_insert(eopatch, feature, old_value, new_value, position):
+    """ Records that a frame has been inserted into a time stack. If it is inserted after all saved frames the saved
+    frames stay unchanged and the new frames can be appended to the saved file.
+    """
+    state = _SAVED_STATES.get(id(eopatch))
+    if state is None or old_value is None:
+        return
+
+    saved_frames = state.get_saved_frames(eopatch, feature)
+    if saved_frames is not None and position >= saved_frames:
+        state.appends[feature] = weakref.ref(new_value), saved_frames
     else:
-        x_ul, y_ul = upper_left
-        x_lr, y_lr = bottom_right
+        state.appends.pop(feature, None)
 
-    return rasterio.windows.from_bounds(left=x_lr, bottom=y_ul, right=x_ul, top=y_lr, transform=crs_transform)
+
+def mark_changed(eopatch, feature):
+    """ Marks a feature as changed, so that it is rewritten by the next incremental save. Replaced features are
+    detected automatically, this is needed only after a feature array has been modified in place.
+
+    :param eopatch: An EOPatch which has been saved or loaded by `SaveTask` or `LoadTask`
+    :type eopatch: EOPatch
+    :param feature: The modified feature
+    :type feature: (FeatureType, str)
+    """
+    state = _SAVED_STATES.get(id(eopatch))
+    if state is not None:
+        feature_type, feature_name = feature
+        state.changed.add((FeatureType(feature_type), feature_name))
+
+
+def get_changed_features(eopatch):
+    """ Returns the features of an EOPatch which have changed since it has been saved or loaded by `SaveTask` or
+    `LoadTask`, all features if it has been neither saved nor loaded
+
+    :param eopatch: An EOPatch
+    :type eopatch: EOPatch
+    :return: Changed features
+    :rtype: set((FeatureType, str))
+    """
+    state = _SAVED_STATES.get(id(eopatch))
+    features = {feature for feature in eopatch.get_feature_list() if isinstance(feature, tuple) and
+                feature[0] not in _META_FEATURE_TYPES}
+    if state is None:
+        return features
+    return {feature for feature in features if not state.is_unchanged(eopatch, feature)}
 
 
 class AddFeatureTask(EOTask):
@@ -109,7 +490,8 @@ class IOTask(EOTask):
 
     @property
     def filesystem(self):
-        """ A filesystem property that either initializes a new object or returns an existing one
+        """ A filesystem property that either returns the given object or a filesystem object of the path, which is
+        shared with other tasks through the cache of `get_filesystem`
         """
         if self._filesystem is None:
             return get_filesystem(self.path, create=self._create, config=self.config)
@@ -125,27 +507,66 @@ class IOTask(EOTask):
 
 class SaveTask(IOTask):
     """ Saves the given EOPatch to a filesystem
+
+    Features are encoded and compressed concurrently in a thread pool, the codec and its level can be chosen for each
+    feature type. Large features are compressed in chunks of `GZIP_CHUNK_SIZE` bytes, each chunk is a gzip member of
+    its own and a file of concatenated members is a valid gzip file, so that a single large feature is also compressed
+    in several threads. Files are written in the same format as by `EOPatch.save`, therefore a saved EOPatch can be
+    loaded with `EOPatch.load`. All files are first written into a temporary folder next to the EOPatch folder and then
+    renamed into place, so that an interrupted save never leaves a partially written EOPatch or feature behind.
+
+    An EOPatch which has been saved or loaded by `SaveTask` or `LoadTask` can be saved incrementally into the same
+    folder. Then only features which have been replaced or marked with `mark_changed` are rewritten, together with the
+    small timestamp, bbox and meta info files. Frames which `ImportTimeFeatureFromTiffTask` appended after all saved
+    frames of a time stack are appended in place to its uncompressed .npy file, the header of the file is updated only
+    after the frames are written.
     """
-    def __init__(self, path, filesystem=None, config=None, **kwargs):
+    def __init__(self, path, filesystem=None, config=None, *, features=...,
+                 overwrite_permission=OverwritePermission.ADD_ONLY, compress_level=0, codecs=None,
+                 max_workers=MAX_WORKERS, incremental=False):
         """
         :param path: root path where all EOPatches are saved
         :type path: str
         :param filesystem: An existing filesystem object. If not given it will be initialized according to the EOPatch
             path. If you intend to run this task in multiprocessing mode you shouldn't specify this parameter.
         :type filesystem: fs.base.FS or None
+        :param config: A configuration object with AWS credentials. By default is set to None and in this case the
+            default configuration will be taken.
+        :type config: SHConfig or None
         :param features: A collection of features types specifying features of which type will be saved. By default
             all features will be saved.
         :type features: an object supported by the :class:`FeatureParser<eolearn.core.utilities.FeatureParser>`
         :param overwrite_permission: A level of permission for overwriting an existing EOPatch
         :type overwrite_permission: OverwritePermission or int
-        :param compress_level: A level of data compression and can be specified with an integer from 0 (no compression)
-            to 9 (highest compression).
+        :param compress_level: A level of gzip compression of feature types which are not given in `codecs`, from 0
+            (no compression) to 9 (highest compression).
         :type compress_level: int
-        :param config: A configuration object with AWS credentials. By default is set to None and in this case the
-            default configuration will be taken.
-        :type config: SHConfig or None
+        :param codecs: A codec and its level for each feature type, e.g.
+            `{FeatureType.DATA: ('gzip', 1), FeatureType.MASK: ('gzip', 9), FeatureType.BBOX: ('none', 0)}`.
+            Supported codecs are given in `SAVE_CODECS`.
+        :type codecs: dict(FeatureType, (str, int)) or None
+        :param max_workers: Maximum number of features which are written at the same time
+        :type max_workers: int
+        :param incremental: If `True` only changed features of an EOPatch are written into the folder from which it
+            has been loaded or into which it has been saved before. It requires a permission to overwrite features.
+        :type incremental: bool
         """
-        self.kwargs = kwargs
+        self.features = features
+        self.overwrite_permission = OverwritePermission(overwrite_permission)
+        self.max_workers = max_workers
+        self.incremental = incremental
+
+        if incremental and self.overwrite_permission is OverwritePermission.ADD_ONLY:
+            raise ValueError('Incremental saving rewrites changed features, therefore it cannot be used with '
+                             'overwrite_permission=OverwritePermission.ADD_ONLY')
+
+        self.codecs = {}
+        for feature_type, (codec, level) in (codecs or {}).items():
+            if codec not in SAVE_CODECS:
+                raise ValueError(f'Unsupported codec {codec} for {feature_type}, supported codecs are {SAVE_CODECS}')
+            self.codecs[FeatureType(feature_type)] = codec, level
+        self.default_codec = ('gzip', compress_level) if compress_level else ('none', 0)
+
         super().__init__(path, filesystem=filesystem, create=True, config=config)
 
     def execute(self, eopatch, *, eopatch_folder=''):
@@ -158,9 +579,280 @@ class SaveTask(IOTask):
         :return: The same EOPatch
         :rtype: EOPatch
         """
-        path = fs.path.combine(self.filesystem_path, eopatch_folder)
+        filesystem = self.filesystem
+        patch_location = fs.path.abspath(fs.path.combine(self.filesystem_path, eopatch_folder))
+        patch_exists = filesystem.exists(patch_location)
+        location = _get_location_key(filesystem, patch_location)
+
+        fs_features = list(walk_filesystem(filesystem, patch_location)) if patch_exists else []
+        eopatch_features = list(walk_eopatch(eopatch, patch_location, self.features))
+        if self.overwrite_permission is OverwritePermission.ADD_ONLY:
+            existing_features = {(feature_type, feature_name) for feature_type, feature_name, _ in fs_features}
+            overwritten_features = existing_features.intersection((feature_type, feature_name) for
+                                                                  feature_type, feature_name, _ in eopatch_features)
+            if overwritten_features:
+                raise ValueError(f'Cannot save features {overwritten_features} with '
+                                 'overwrite_permission=OverwritePermission.ADD_ONLY')
+
+        state = _SAVED_STATES.get(id(eopatch)) if self.incremental and patch_exists else None
+        if state is not None and state.location == location:
+            written_features, kept_paths = self._skip_saved_features(filesystem, eopatch, eopatch_features,
+                                                                     fs_features, state)
+        else:
+            state = None
+            written_features, kept_paths = eopatch_features, set()
+
+        replace_folder = state is None and patch_location != '/' and \
+            (not patch_exists or self.overwrite_permission is OverwritePermission.OVERWRITE_PATCH)
+
+        temp_location = self._get_temporary_location(patch_location)
+        filesystem.makedirs(temp_location)
+        try:
+            file_paths = self._write_features(filesystem, eopatch, written_features, patch_location, temp_location)
+
+            if replace_folder:
+                self._replace_folder(filesystem, temp_location, patch_location, patch_exists)
+            else:
+                for temp_path, path in file_paths:
+                    filesystem.makedirs(fs.path.dirname(path), recreate=True)
+                    self._move(filesystem, temp_path, path)
+        finally:
+            if filesystem.exists(temp_location):
+                filesystem.removetree(temp_location)
+
+        if not replace_folder:
+            saved_paths = kept_paths.union(path for _, path in file_paths)
+            saved_features = {(feature_type, feature_name) for feature_type, feature_name, _ in eopatch_features}
+            for feature_type, feature_name, path in fs_features:
+                is_overwritten = (feature_type, feature_name) in saved_features or \
+                    self.overwrite_permission is OverwritePermission.OVERWRITE_PATCH
+                if is_overwritten and path not in saved_paths and filesystem.isfile(path):
+                    filesystem.remove(path)
+
+        _record_saved_state(eopatch, location, [(feature_type, feature_name) for feature_type, feature_name, _ in
+                                                eopatch_features if feature_type not in _META_FEATURE_TYPES])
+        return eopatch
+
+    def _skip_saved_features(self, filesystem, eopatch, eopatch_features, fs_features, state):
+        """ Finds features whose files are up to date and appends new frames of time stacks to their files
+
+        :return: Features which have to be written and paths of files which are kept
+        :rtype: (list((FeatureType, str, str)), set(str))
+        """
+        fs_paths = {(feature_type, feature_name): path for feature_type, feature_name, path in fs_features}
+        written_features, kept_paths = [], set()
+
+        for feature_type, feature_name, path in eopatch_features:
+            feature = feature_type, feature_name
+            file_path, _ = self._get_file_path(feature_type, path)
+            if feature_type in _META_FEATURE_TYPES or fs_paths.get(feature) != file_path:
+                written_features.append((feature_type, feature_name, path))
+                continue
+
+            if state.is_unchanged(eopatch, feature):
+                kept_paths.add(file_path)
+                continue
+
+            saved_frames = None if feature_type.is_timeless() else state.get_saved_frames(eopatch, feature)
+            if saved_frames is not None and \
+                    self._append_frames(filesystem, file_path, eopatch[feature_type][feature_name], saved_frames):
+                kept_paths.add(file_path)
+                continue
+
+            written_features.append((feature_type, feature_name, path))
 
-        eopatch.save(path, filesystem=self.filesystem, **self.kwargs)
+        return written_features, kept_paths
+
+    @staticmethod
+    def _append_frames(filesystem, path, data, saved_frames):
+        """ Appends the frames of a time stack after its saved frames to a local .npy file and then updates the shape in
+        the header of the file. If the save is interrupted before, the file still holds the saved frames.
+
+        :return: `True` if the frames have been appended, `False` if the file has to be rewritten
+        :rtype: bool
+        """
+        if not path.endswith('.npy') or not filesystem.hassyspath(path):
+            return False
+
+        header_writers = {(1, 0): np.lib.format.write_array_header_1_0, (2, 0): np.lib.format.write_array_header_2_0}
+        header_readers = {(1, 0): np.lib.format.read_array_header_1_0, (2, 0): np.lib.format.read_array_header_2_0}
+
+        with open(filesystem.getsyspath(path), 'r+b') as file_handle:
+            version = np.lib.format.read_magic(file_handle)
+            if version not in header_readers:
+                return False
+
+            shape, fortran_order, dtype = header_readers[version](file_handle)
+            header_size = file_handle.tell()
+            if fortran_order or dtype != data.dtype or shape != (saved_frames,) + data.shape[1:]:
+                return False
+
+            header = io.BytesIO()
+            header_writers[version](header, {'shape': data.shape, 'fortran_order': False,
+                                             'descr': np.lib.format.dtype_to_descr(data.dtype)})
+            if len(header.getvalue()) != header_size:
+                return False
+
+            file_handle.seek(header_size + saved_frames * data[0].nbytes)
+            file_handle.truncate()
+            np.ascontiguousarray(data[saved_frames:]).tofile(file_handle)
+            file_handle.flush()
+            os.fsync(file_handle.fileno())
+
+            file_handle.seek(0)
+            file_handle.write(header.getvalue())
+
+        return True
+
+    @staticmethod
+    def _get_temporary_location(patch_location):
+        """ Returns a path of a temporary folder on the same filesystem as the EOPatch, so that its files can be
+        renamed into the EOPatch folder. If the EOPatch is the root of the filesystem the folder is inside of it.
+        """
+        temp_name = f'.tmp_{uuid.uuid4().hex}'
+        if patch_location == '/':
+            return fs.path.join(patch_location, temp_name)
+        return fs.path.join(fs.path.dirname(patch_location), f'{temp_name}_{fs.path.basename(patch_location)}')
+
+    def _write_features(self, filesystem, eopatch, eopatch_features, patch_location, temp_location):
+        """ Writes features into the temporary folder in a thread pool
+
+        :return: Pairs of a path in the temporary folder and the final path of each written file
+        :rtype: list((str, str))
+        """
+        jobs = []
+        for feature_type, feature_name, path in eopatch_features:
+            path, compress_level = self._get_file_path(feature_type, path)
+            temp_path = fs.path.join(temp_location, fs.path.relativefrom(patch_location, path))
+            jobs.append((temp_path, path, eopatch[(feature_type, feature_name)], feature_type.is_raster(),
+                         compress_level))
+
+        for folder in {fs.path.dirname(temp_path) for temp_path, *_ in jobs}:
+            filesystem.makedirs(folder, recreate=True)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            # all chunks are submitted before the files, therefore a file never waits for a chunk which is not running
+            file_parts = [self._encode_feature(executor, *job[2:]) for job in jobs]
+            list(executor.map(lambda job, parts: self._write_file(filesystem, job[0], job[2], parts), jobs,
+                              file_parts))
+
+        return [(temp_path, path) for temp_path, path, *_ in jobs]
+
+    def _get_file_path(self, feature_type, path):
+        """ Adds the extension of the file format and codec of a feature type to a feature path
+
+        :return: The path of the file and the gzip compression level, 0 for uncompressed files
+        :rtype: (str, int)
+        """
+        codec, level = self.codecs.get(feature_type, self.default_codec)
+        compress_level = level if codec == 'gzip' else 0
+        extension = '.npy' if feature_type.is_raster() else '.pkl'
+
+        return (f'{path}{extension}.gz' if compress_level else f'{path}{extension}'), compress_level
+
+    @staticmethod
+    def _encode_feature(executor, data, is_raster, compress_level):
+        """ Splits the content of a feature file into parts which are compressed in the thread pool. Uncompressed
+        arrays are written directly with `numpy.save`, in that case None is returned.
+
+        :return: A list of bytes or futures of compressed bytes
+        :rtype: list(bytes or concurrent.futures.Future) or None
+        """
+        if not is_raster:
+            content = pickle.dumps(data)
+            return [executor.submit(gzip.compress, content, compress_level)] if compress_level else [content]
+
+        if not compress_level:
+            return None
+
+        data = np.ascontiguousarray(data)
+        header = io.BytesIO()
+        np.lib.format.write_array_header_1_0(header, np.lib.format.header_data_from_array_1_0(data))
+        body = memoryview(data.reshape(-1).view(np.uint8))
+
+        chunks = [header.getvalue()] + [body[start: start + GZIP_CHUNK_SIZE] for start in
+                                        range(0, len(body), GZIP_CHUNK_SIZE)]
+        return [executor.submit(gzip.compress, chunk, compress_level) for chunk in chunks]
+
+    @staticmethod
+    def _write_file(filesystem, path, data, parts):
+        """ Writes encoded parts of a feature into a file, or the array itself if there are no parts
+        """
+        with filesystem.openbin(path, 'w') as file_handle:
+            if parts is None:
+                np.save(file_handle, data)
+                return
+
+            for part in parts:
+                file_handle.write(part.result() if isinstance(part, Future) else part)
+
+    def _replace_folder(self, filesystem, temp_location, patch_location, patch_exists):
+        """ Renames the temporary folder into the EOPatch folder. An existing EOPatch folder is first renamed aside
+        and removed only after the new one is in place.
+        """
+        old_location = None
+        if patch_exists:
+            old_location = self._get_temporary_location(patch_location)
+            self._move(filesystem, patch_location, old_location)
+
+        filesystem.makedirs(fs.path.dirname(patch_location), recreate=True)
+        self._move(filesystem, temp_location, patch_location)
+
+        if old_location is not None:
+            filesystem.removetree(old_location)
+
+    @staticmethod
+    def _move(filesystem, src_path, dst_path):
+        """ Moves a file or a folder. On a local filesystem it is an atomic rename which replaces an existing file,
+        other filesystems copy the data.
+        """
+        if filesystem.hassyspath(src_path):
+            os.replace(filesystem.getsyspath(src_path), filesystem.getsyspath(dst_path))
+        elif filesystem.isdir(src_path):
+            filesystem.movedir(src_path, dst_path, create=True)
+        else:
+            filesystem.move(src_path, dst_path, overwrite=True)
+
+
+class LoadTask(IOTask):
+    """ Loads an EOPatch from a filesystem and records which features are stored in its folder, so that a following
+    incremental `SaveTask` into the same folder writes only the changes
+    """
+    def __init__(self, path, filesystem=None, config=None, *, features=..., lazy_loading=False):
+        """
+        :param path: root path where all EOPatches are saved
+        :type path: str
+        :param filesystem: An existing filesystem object. If not given it will be initialized according to the EOPatch
+            path. If you intend to run this task in multiprocessing mode you shouldn't specify this parameter.
+        :type filesystem: fs.base.FS or None
+        :param config: A configuration object with AWS credentials. By default is set to None and in this case the
+            default configuration will be taken.
+        :type config: SHConfig or None
+        :param features: A collection of features to be loaded. By default all features will be loaded.
+        :type features: an object supported by the :class:`FeatureParser<eolearn.core.utilities.FeatureParser>`
+        :param lazy_loading: If `True` features will be lazy loaded
+        :type lazy_loading: bool
+        """
+        self.features = features
+        self.lazy_loading = lazy_loading
+        super().__init__(path, filesystem=filesystem, create=False, config=config)
+
+    def execute(self, *, eopatch_folder=''):
+        """Loads the EOPatch from disk: `folder/eopatch_folder`.
+
+        :param eopatch_folder: name of EOPatch folder containing data
+        :type eopatch_folder: str
+        :return: EOPatch loaded from disk
+        :rtype: EOPatch
+        """
+        filesystem = self.filesystem
+        patch_location = fs.path.abspath(fs.path.combine(self.filesystem_path, eopatch_folder))
+
+        eopatch = EOPatch.load(patch_location, filesystem=filesystem, features=self.features,
+                               lazy_loading=self.lazy_loading)
+        _record_saved_state(eopatch, _get_location_key(filesystem, patch_location),
+                            [feature for feature in eopatch.get_feature_list() if isinstance(feature, tuple) and
+                             feature[0] not in _META_FEATURE_TYPES])
         return eopatch
 
 
@@ -240,6 +932,182 @@ class BaseLocalIoTask(EOTask):
         raise NotImplementedError
 
 
+class ExportToTiffTask(BaseLocalIoTask):
+    """ Task for exporting a spatial feature of an EOPatch into a cloud-optimized Geo-Tiff file (COG)
+
+    The image is stored in internal tiles, compressed by GDAL in several threads and followed by internal overviews,
+    so that windowed and decimated reads of the exported file only have to fetch and decompress a few small blocks.
+    Channels of a time-dependant feature are written in order T(1)B(1), ..., T(1)B(N), T(2)B(1), ..., T(M)B(N), the
+    same order in which `ImportFromTiffTask` reads them. If the filename contains a timestamp template, e.g.
+    `'image_%Y%m%d.tif'` or `'image_*.tif'`, each date is written into its own file instead.
+    """
+    def __init__(self, feature, folder=None, *, band_indices=None, date_indices=None, compress='deflate',
+                 compression_level=None, predictor=True, blocksize=512, overview_levels=None,
+                 overview_resampling='nearest', num_threads='ALL_CPUS', **kwargs):
+        """
+        :param feature: A spatial feature of the EOPatch which will be exported
+        :type feature: (FeatureType, str)
+        :param folder: A directory of exported files or a path of an exported file
+        :type folder: str
+        :param band_indices: Indices of bands which are exported, by default all bands
+        :type band_indices: list(int) or None
+        :param date_indices: Indices of dates of a time-dependant feature which are exported, by default all dates
+        :type date_indices: list(int) or None
+        :param compress: Compression of tiles, e.g. 'deflate', 'zstd', 'lzw' or 'none'
+        :type compress: str
+        :param compression_level: Level of 'deflate' (1-9) or 'zstd' (1-22) compression, by default the GDAL default
+        :type compression_level: int or None
+        :param predictor: If `True` a horizontal differencing predictor is applied before compression, which makes
+            compression of smooth images much more effective. A floating point predictor is used for float data.
+        :type predictor: bool
+        :param blocksize: Width and height of internal tiles, a multiple of 16
+        :type blocksize: int
+        :param overview_levels: Decimation factors of overviews. By default power of two levels are built until the
+            image fits into a single tile, an empty list disables overviews.
+        :type overview_levels: list(int) or None
+        :param overview_resampling: Resampling method of overviews, a name like 'average' or a
+            `rasterio.enums.Resampling`
+        :type overview_resampling: str or Resampling
+        :param num_threads: Number of threads in which GDAL compresses tiles and builds overviews
+        :type num_threads: int or str
+        :param image_dtype: Type of data of the exported image, by default the type of the feature
+        :type image_dtype: numpy.dtype
+        :param no_data_value: Value of undefined pixels, which is written as the nodata value of the image
+        :type no_data_value: int or float
+        :param config: A configuration object containing AWS credentials
+        :type config: SHConfig
+        """
+        super().__init__(feature, folder=folder, **kwargs)
+
+        if blocksize % 16 != 0:
+            raise ValueError(f'The size of internal tiles must be a multiple of 16, got {blocksize}')
+
+        self.band_indices = band_indices
+        self.date_indices = date_indices
+        self.compress = compress.lower()
+        self.compression_level = compression_level
+        self.predictor = predictor
+        self.blocksize = blocksize
+        self.overview_levels = overview_levels
+        self.overview_resampling = Resampling[overview_resampling] if isinstance(overview_resampling, str) \
+            else Resampling(overview_resampling)
+        self.num_threads = num_threads
+
+    def execute(self, eopatch, *, filename=None):
+        """ Execute method which exports a feature of the EOPatch
+
+        :param eopatch: input EOPatch
+        :type eopatch: EOPatch
+        :param filename: filename of tiff file or None if entire path has already been specified in `folder` parameter
+            of task initialization.
+        :type filename: str, list of str or None
+        :return: Unchanged input EOPatch
+        :rtype: EOPatch
+        """
+        feature_type, feature_name = next(self.feature())
+        if not feature_type.is_spatial():
+            raise ValueError(f'Only spatial features can be exported into a tiff image, got {feature_type}')
+
+        data = eopatch[feature_type][feature_name]
+        if feature_type.is_timeless():
+            data = data[np.newaxis, ...]
+
+        date_indices = list(range(data.shape[0])) if self.date_indices is None else list(self.date_indices)
+        band_indices = list(range(data.shape[-1])) if self.band_indices is None else list(self.band_indices)
+        timestamps = [] if feature_type.is_timeless() else [eopatch.timestamp[index] for index in date_indices]
+
+        filesystem, filename_paths = self._get_filesystem_and_paths(filename, timestamps, create_paths=True)
+        if len(filename_paths) == 1:
+            file_dates = [date_indices]
+        elif len(filename_paths) == len(date_indices):
+            file_dates = [[date_index] for date_index in date_indices]
+        else:
+            raise ValueError(f'Cannot export {len(date_indices)} dates into {len(filename_paths)} files')
+
+        transform = rasterio.transform.from_bounds(*eopatch.bbox, data.shape[2], data.shape[1])
+        crs = eopatch.bbox.crs.ogc_string()
+
+        for path, dates in zip(filename_paths, file_dates):
+            channels = [(date_index, band_index) for date_index in dates for band_index in band_indices]
+            self._write_file(filesystem, path, data, channels, transform, crs)
+
+        return eopatch
+
+    def _write_file(self, filesystem, path, data, channels, transform, crs):
+        """ Writes channels of a feature array of shape (times, height, width, bands) into a COG. The bands are
+        written into an uncompressed tiled image in memory, overviews are built on it and finally GDAL copies the image
+        together with its overviews into the compressed file in several threads.
+        """
+        _, height, width, _ = data.shape
+        dtype = np.dtype(self.image_dtype or data.dtype)
+        profile = {
+            'driver': 'GTiff',
+            'width': width,
+            'height': height,
+            'count': len(channels),
+            'dtype': dtype,
+            'crs': crs,
+            'transform': transform,
+            'nodata': self.no_data_value,
+            'tiled': True,
+            'blockxsize': self.blocksize,
+            'blockysize': self.blocksize
+        }
+
+        with rasterio.Env(GDAL_NUM_THREADS=self.num_threads), rasterio.io.MemoryFile() as tmp_file:
+            with tmp_file.open(**profile) as dst:
+                for index, (date_index, band_index) in enumerate(channels, start=1):
+                    dst.write(data[date_index, :, :, band_index].astype(dtype, copy=False), index)
+
+                overview_levels = self._get_overview_levels(width, height)
+                if overview_levels:
+                    dst.build_overviews(overview_levels, self.overview_resampling)
+
+            creation_options = self._get_creation_options(dtype)
+            if filesystem.hassyspath(path):
+                rasterio.shutil.copy(tmp_file.name, filesystem.getsyspath(path), **creation_options)
+                return
+
+            with rasterio.io.MemoryFile() as out_file:
+                rasterio.shutil.copy(tmp_file.name, out_file.name, **creation_options)
+                filesystem.writebytes(path, out_file.read())
+
+    def _get_overview_levels(self, width, height):
+        """ Returns the given overview levels or power of two levels until the image fits into a single tile
+        """
+        if self.overview_levels is not None:
+            return list(self.overview_levels)
+
+        levels = []
+        while max(width, height) / 2 ** len(levels) > self.blocksize:
+            levels.append(2 ** (len(levels) + 1))
+        return levels
+
+    def _get_creation_options(self, dtype):
+        """ Collects the GDAL creation options of the compressed, tiled image with internal overviews
+        """
+        options = {
+            'driver': 'GTiff',
+            'tiled': True,
+            'blockxsize': self.blocksize,
+            'blockysize': self.blocksize,
+            'copy_src_overviews': True,
+            'interleave': 'pixel',
+            'num_threads': self.num_threads,
+            'bigtiff': 'if_safer'
+        }
+        if self.compress == 'none':
+            return options
+
+        options['compress'] = self.compress
+        if self.predictor:
+            options['predictor'] = 3 if np.issubdtype(dtype, np.floating) else 2
+        if self.compression_level is not None and self.compress in ('deflate', 'zstd'):
+            options['zlevel' if self.compress == 'deflate' else 'zstd_level'] = self.compression_level
+
+        return options
+
+
 class ImportFromTiffTask(BaseLocalIoTask):
     """ Task for importing data from a Geo-Tiff file into an EOPatch
 
@@ -248,9 +1116,22 @@ class ImportFromTiffTask(BaseLocalIoTask):
     feature and set a bounding box of the new EOPatch.
 
     Note that if Geo-Tiff file is not completely spatially aligned with location of given EOPatch it will try to fit it
-    as best as possible. However it will not do any spatial resampling or interpolation on Geo-TIFF data.
+    as best as possible. However it will not do any spatial resampling or interpolation on Geo-TIFF data, unless
+    `warp` is set. In that case the image is warped onto the bounding box, CRS and resolution of the EOPatch through a
+    `WarpedVRT` in a single pass, which also works for images referenced only by ground control points, e.g.
+    Sentinel-1 GRD. GDAL then reads only the part of the image needed for the EOPatch and warps it in several threads.
+
+    Features which do not fit into memory can be imported into memory-mapped .npy files by setting `memmap_folder`.
+    The feature of the EOPatch is then a `numpy.memmap` and its data is paged in from disk only when it is accessed.
+    The files are temporary, each one is removed when its array and all views of it are garbage collected.
+
+    If `mask_feature` is set, a mask of valid pixels is derived while the data is read, see `get_valid_mask`. It is
+    stored bit-packed along the width, as a mask feature with a single band and 8 pixels per byte, together with the
+    width of the data in `meta_info['<mask_feature>_width']`. Use `unpack_mask` to unpack it.
     """
-    def __init__(self, feature, folder=None, *, timestamp_size=None, **kwargs):
+    def __init__(self, feature, folder=None, *, timestamp_size=None, max_workers=MAX_WORKERS, memmap_folder=None,
+                 warp=False, resolution=None, out_shape=None, resampling='nearest', build_overviews=False,
+                 mask_feature=None, **kwargs):
         """
         :param feature: EOPatch feature into which data will be imported
         :type feature: (FeatureType, str)
@@ -263,6 +1144,30 @@ class ImportFromTiffTask(BaseLocalIoTask):
             T(1)B(1), T(1)B(2), ..., T(1)B(N), T(2)B(1), T(2)B(2), ..., T(2)B(N), ..., ..., T(M)B(N)
             where T and B are the time and band indices.
         :type timestamp_size: int
+        :param max_workers: Maximum number of files which are read at the same time
+        :type max_workers: int
+        :param memmap_folder: A local folder in which imported features are stored as memory-mapped .npy files instead
+            of being held in memory. The files are removed once the features are garbage collected, save the EOPatch
+            to keep the data.
+        :type memmap_folder: str or None
+        :param warp: If `True` images are warped onto the grid of the EOPatch instead of being cut out of the image
+        :type warp: bool
+        :param resolution: Pixel size of the imported feature in units of the CRS of the EOPatch, either one value or
+            a pair (x, y). If it is coarser than the pixel size of the image, the image is read decimated. When warping
+            without a resolution, the resolution which GDAL suggests for the image in the CRS of the EOPatch is used,
+            otherwise the resolution of the image.
+        :type resolution: float or (float, float) or None
+        :param out_shape: Height and width of the imported feature, an alternative to `resolution`
+        :type out_shape: (int, int) or None
+        :param resampling: Resampling method of warping and decimated reads, a name like 'average' or a
+            `rasterio.enums.Resampling`
+        :type resampling: str or Resampling
+        :param build_overviews: If `True` external overviews (.ovr) are built for local images without overviews
+            before they are read decimated, so that decimated reads of following imports are fast
+        :type build_overviews: bool
+        :param mask_feature: Name of a bit-packed mask of valid pixels, which is imported together with a spatial
+            feature. It is a `FeatureType.MASK` for time-dependant features, otherwise a `FeatureType.MASK_TIMELESS`.
+        :type mask_feature: str or None
         :param image_dtype: Type of data of new feature imported from tiff image
         :type image_dtype: numpy.dtype
         :param no_data_value: Values where given Geo-Tiff image does not cover EOPatch
@@ -273,6 +1178,18 @@ class ImportFromTiffTask(BaseLocalIoTask):
         super().__init__(feature, folder=folder, **kwargs)
 
         self.timestamp_size = timestamp_size
+        self.max_workers = max_workers
+        self.memmap_folder = memmap_folder
+        self.warp = warp
+        self.resolution = resolution
+        self.out_shape = out_shape
+        self.resampling = Resampling[resampling] if isinstance(resampling, str) else Resampling(resampling)
+        self.build_overviews = build_overviews
+        self.mask_feature = mask_feature
+
+        feature_type, _ = next(self.feature())
+        if mask_feature is not None and not feature_type.is_spatial():
+            raise ValueError(f'A mask can only be imported together with a spatial feature, got {feature_type}')
 
     @staticmethod
     def _get_reading_window(width, height, data_bbox, eopatch_bbox):
@@ -301,41 +1218,21 @@ class ImportFromTiffTask(BaseLocalIoTask):
         return (top, bottom), (left, right)
 
     @staticmethod
-    def _get_reading_window_from_geometry(width, height, gcps: list, data_footprint, eopatch_bbox):
-        """ Calculates a window in pixel coordinates from a footprint geometry for which data will be read from an image.
+    def _get_reading_window_from_geometry(gcps, gcp_crs, eopatch_bbox):
+        """ Calculates a window in pixel coordinates for which data will be read from an image referenced by ground
+        control points. The window is derived from the geolocation model of the entire GCP grid of the image, parts
+        of it outside of the image are read as no data like for other images.
         """
-        if eopatch_bbox.crs is not data_footprint.crs:
-            eopatch_bbox = eopatch_bbox.transform(data_footprint.crs)
-
-        data_ul_x, data_lr_y = data_footprint.bbox.lower_left
-        data_lr_x, data_ul_y = data_footprint.bbox.upper_right
+        return get_gcp_geolocation(gcps, gcp_crs).get_window(eopatch_bbox)
 
-        res_x = abs(data_ul_x - data_lr_x) / width
-        res_y = abs(data_ul_y - data_lr_y) / height
-
-        aoi_x_min, aoi_y_min = eopatch_bbox.lower_left
-        aoi_x_max, aoi_y_max = eopatch_bbox.upper_right
-
-        if aoi_x_min < data_ul_x or aoi_x_max > data_lr_x or aoi_y_max > data_ul_y or aoi_y_min < data_lr_y:
-            raise Warning('The given bounding box is not fully covered by the data boundings.')
-
-        for gcp in gcps[0]:
-            if gcp.col == 0 and gcp.row == 0:
-                upper_right = (gcp.y, gcp.x)
-            elif gcp.col == 0 and gcp.row == height - 1:
-                lower_right = (gcp.y, gcp.x)
-            elif gcp.col == width - 1 and gcp.row == 0:
-                upper_left = (gcp.y, gcp.x)
-            elif gcp.col == width-1 and gcp.row == height - 1:
-                lower_left = (gcp.y, gcp.x)
-
-# dieser Ansatz nimmt an, dass die aoi leicht  gg den Uhrzeiger rotiert ist
-        bottom = round(get_distance_point_to_line(upper_right, upper_left, (aoi_x_min, aoi_y_max)) / res_y)
-        top = round(get_distance_point_to_line(upper_right, upper_left, (aoi_x_max, aoi_y_min)) / res_y)
-        left = round(get_distance_point_to_line(upper_left, lower_left, (aoi_x_min, aoi_y_min)) / res_x)
-        right = round(get_distance_point_to_line(upper_left, lower_left, (aoi_x_max, aoi_y_max)) / res_x)
-
-        return (top, bottom), (left, right)
+    @classmethod
+    def _get_source_reading_window(cls, info, eopatch_bbox):
+        """ Calculates a window in pixel coordinates for which data will be read from an image described by
+        `_get_source_info`, with the geolocation model of its GCP grid if it has no CRS
+        """
+        if info['gcps']:
+            return cls._get_reading_window_from_geometry(info['gcps'], info['crs'], eopatch_bbox)
+        return cls._get_reading_window(info['width'], info['height'], info['bbox'], eopatch_bbox)
 
     def execute(self, eopatch=None, *, filename=None):
         """ Execute method which adds a new feature to the EOPatch
@@ -354,177 +1251,756 @@ class ImportFromTiffTask(BaseLocalIoTask):
 
         filesystem, filename_paths = self._get_filesystem_and_paths(filename, eopatch.timestamp, create_paths=False)
 
-        with filesystem:
-            data = []
-            for path in filename_paths:
-                with filesystem.openbin(path, 'r') as file_handle:
-                    with rasterio.open(file_handle) as src:
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(filename_paths))) as executor:
+            file_info = list(executor.map(lambda path: self._get_file_info(filesystem, path), filename_paths))
+
+            if eopatch.bbox is None:
+                eopatch.bbox = file_info[0]['bbox']
+
+            if self.warp:
+                grid = self._get_warp_grid(eopatch.bbox, file_info[0])
+                _, grid_width, grid_height, _ = grid
+                read_windows = [((0, grid_height), (0, grid_width))] * len(file_info)
+                out_shapes = {(grid_height, grid_width)}
+            else:
+                grid = None
+                read_windows = [self._get_source_reading_window(info, eopatch.bbox) for info in file_info]
+                out_shapes = {self._get_output_shape(read_window, info['pixel_size'])
+                              for read_window, info in zip(read_windows, file_info)}
+            if len(out_shapes) > 1:
+                raise ValueError('The given tiff files do not share the same resolution, their reading windows '
+                                 f'have different shapes {out_shapes}')
+            height, width = out_shapes.pop()
+
+            channels = sum(info['count'] for info in file_info)
+            dtype = self.image_dtype or np.result_type(*[info['dtype'] for info in file_info])
+
+            if not feature_type.is_spatial():
+                data = self._allocate((channels, height, width), dtype)
+                channel_views = self._get_channel_views(np.moveaxis(data[np.newaxis, ...], 1, -1), file_info)
+            else:
+                times = 1
+                if not feature_type.is_timeless():
+                    times = self.timestamp_size
+                    if times is None:
+                        times = len(eopatch.timestamp) if eopatch.timestamp else 1
+
+                if channels % times != 0:
+                    raise ValueError('Cannot import as a time-dependant feature because the number of tiff image '
+                                     'channels is not divisible by the number of timestamps')
+
+                data = self._allocate((times, height, width, channels // times), dtype)
+                channel_views = self._get_channel_views(data, file_info)
+
+            file_masks = list(executor.map(lambda args: self._read_file(filesystem, *args, grid=grid),
+                                           zip(filename_paths, read_windows, channel_views)))
+
+        if self.mask_feature is not None:
+            valid = np.ones(data.shape[:3], dtype=bool)
+            for time_index, mask in (time_mask for masks in file_masks for time_mask in masks):
+                valid[time_index] &= mask
+            self._add_mask(eopatch, feature_type, valid)
 
-                        data_bbox = BBox(src.bounds, CRS(src.crs.to_epsg()))
-                        if eopatch.bbox is None:
-                            eopatch.bbox = data_bbox
+        if not feature_type.is_spatial():
+            data = data.reshape(-1)
 
-                        read_window = self._get_reading_window(src.width, src.height, data_bbox, eopatch.bbox)
+            if not feature_type.is_timeless():
+                times = self.timestamp_size
+                if times is None:
+                    times = len(eopatch.timestamp) if eopatch.timestamp else 1
 
-                        data.append(src.read(window=read_window, boundless=True, fill_value=self.no_data_value))
+                if data.shape[0] % times != 0:
+                    raise ValueError('Cannot import as a time-dependant feature because the number of tiff image '
+                                     'channels is not divisible by the number of timestamps')
 
-        data = np.concatenate(data, axis=0)
+                data = data.reshape((times, data.shape[0] // times))
 
-        if self.image_dtype is not None:
-            data = data.astype(self.image_dtype)
+        elif feature_type.is_timeless():
+            data = data[0]
 
-        if not feature_type.is_spatial():
-            data = data.flatten()
+        eopatch[feature_type][feature_name] = data
+
+        return eopatch
 
+    def _add_mask(self, eopatch, feature_type, valid):
+        """ Adds a validity mask of shape (times, height, width) to the EOPatch, bit-packed along the width
+        """
         if feature_type.is_timeless():
-            data = np.moveaxis(data, 0, -1)
+            eopatch.mask_timeless[self.mask_feature] = pack_mask(valid[0])
         else:
-            channels = data.shape[0]
+            eopatch.mask[self.mask_feature] = pack_mask(valid)
+        eopatch.meta_info[f'{self.mask_feature}_width'] = valid.shape[-1]
 
-            times = self.timestamp_size
-            if times is None:
-                times = len(eopatch.timestamp) if eopatch.timestamp else 1
+    def _allocate(self, shape, dtype):
+        """ Allocates an uninitialized feature array in memory or as a memory-mapped .npy file in `memmap_folder`
+        """
+        if self.memmap_folder is None:
+            return np.empty(shape, dtype=dtype)
+
+        _remove_pending_memmap_files()
+
+        os.makedirs(self.memmap_folder, exist_ok=True)
+        _, feature_name = next(self.feature())
+        path = os.path.join(self.memmap_folder, f'{feature_name}_{uuid.uuid4().hex}.npy')
+        array = np.lib.format.open_memmap(path, mode='w+', dtype=dtype, shape=shape)
+        with _MEMMAP_FILES_LOCK:
+            _MEMMAP_FILES.add(path)
+
+        # the memory map is closed before its finalizer runs, unlike the array's, as Windows cannot remove mapped files
+        finalizer = weakref.finalize(array._mmap, _remove_memmap_file, path)
+        finalizer.atexit = False
+        return array
+
+    @classmethod
+    def _get_file_info(cls, filesystem, path):
+        """ Reads the bounding box, size, number of bands and data type of a tiff file
+        """
+        with cls._open_raster(filesystem, path) as src:
+            return cls._get_source_info(src)
 
-            if channels % times != 0:
-                raise ValueError('Cannot import as a time-dependant feature because the number of tiff image channels '
-                                 'is not divisible by the number of timestamps')
+    @staticmethod
+    @contextmanager
+    def _open_raster(filesystem, path):
+        """ Opens an image of a filesystem. Local images are opened by their path and images on S3 with an opener
+        which downloads byte ranges, so that GDAL reads only the needed blocks and finds external overviews. Other
+        images are opened from a file object. The opener is registered per thread, so the image must be read and
+        closed by the thread which opened it.
+        """
+        if filesystem.hassyspath(path):
+            with rasterio.open(filesystem.getsyspath(path)) as src:
+                yield src
+        elif isinstance(filesystem, S3FS) and RASTERIO_OPENER:
+            with rasterio.open(path, opener=partial(open_s3_file, filesystem)) as src:
+                yield src
+        else:
+            with filesystem.openbin(path, 'r') as file_handle:
+                with rasterio.open(file_handle) as src:
+                    yield src
 
-            data = data.reshape((times, channels // times) + data.shape[1:])
-            data = np.moveaxis(data, 1, -1)
+    @staticmethod
+    def _get_source_info(src):
+        """ Collects the bounding box, size, number of bands, data type and georeference of an opened image. The
+        bounding box of an image referenced by ground control points is the bounding box of its footprint.
+        """
+        if src.crs:
+            bbox = BBox(src.bounds, CRS(src.crs.to_epsg()))
+            gcps = None
+            pixel_size = src.res
+        else:
+            footprint = get_gcp_geolocation(*src.gcps).footprint
+            bbox = BBox(footprint.geometry.bounds, footprint.crs)
+            gcps = src.gcps[0]
+            pixel_size = (bbox.max_x - bbox.min_x) / src.width, (bbox.max_y - bbox.min_y) / src.height
+
+        return {
+            'bbox': bbox,
+            'width': src.width,
+            'height': src.height,
+            'count': src.count,
+            'dtype': src.dtypes[0],
+            'crs': src.crs or src.gcps[1],
+            'bounds': src.bounds,
+            'gcps': gcps,
+            'pixel_size': pixel_size
+        }
+
+    def _get_resolution(self):
+        """ Returns the target resolution as a pair (x, y)
+        """
+        if isinstance(self.resolution, (int, float)):
+            return self.resolution, self.resolution
+        return tuple(self.resolution)
 
-        eopatch[feature_type][feature_name] = data
+    def _get_output_shape(self, read_window, pixel_size):
+        """ Calculates the height and width of the array into which a reading window is read, which is smaller than
+        the window if the target resolution is coarser than the pixel size of the image
+        """
+        (top, bottom), (left, right) = read_window
+        if self.out_shape is not None:
+            return tuple(self.out_shape)
+        if self.resolution is None:
+            return bottom - top, right - left
+
+        res_x, res_y = self._get_resolution()
+        size_x, size_y = pixel_size
+        return max(round((bottom - top) * size_y / res_y), 1), max(round((right - left) * size_x / res_x), 1)
+
+    def _build_missing_overviews(self, filesystem, path, decimation):
+        """ Builds external overviews of a local image which has none, with power of two levels up to the decimation.
+        The image is only opened for reading, rasterio can build overviews only in update mode though, therefore the
+        first level is written as the image of the .ovr file and the further levels as its internal overviews, which
+        GDAL reads as the overviews of the image.
+
+        :return: `True` if overviews have been built
+        :rtype: bool
+        """
+        if not self.build_overviews or decimation < 2 or not filesystem.hassyspath(path):
+            return False
+
+        image_path = filesystem.getsyspath(path)
+        with rasterio.open(image_path) as src:
+            if src.overviews(1):
+                return False
+
+            levels = [2 ** level for level in range(1, int(math.log2(decimation)) + 1)]
+            LOGGER.info('Building overviews %s of %s', levels, image_path)
+
+            width, height = -(-src.width // 2), -(-src.height // 2)
+            temp_path = f'{image_path}.tmp_{uuid.uuid4().hex}'
+            try:
+                with rasterio.open(temp_path, 'w', driver='GTiff', width=width, height=height, count=src.count,
+                                   dtype=src.dtypes[0], crs=src.crs, transform=src.transform * src.transform.scale(2),
+                                   tiled=True) as dst:
+                    for row in range(0, height, OVERVIEW_STRIP_HEIGHT):
+                        rows = min(OVERVIEW_STRIP_HEIGHT, height - row)
+                        window = rasterio.windows.Window(0, 2 * row, src.width, min(2 * rows, src.height - 2 * row))
+                        data = src.read(window=window, out_shape=(src.count, rows, width), resampling=self.resampling)
+                        dst.write(data, window=rasterio.windows.Window(0, row, width, rows))
+
+                    if len(levels) > 1:
+                        dst.build_overviews([level // 2 for level in levels[1:]], self.resampling)
+
+                os.replace(temp_path, f'{image_path}.ovr')
+            except BaseException:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+
+        return True
+
+    def _get_warp_grid(self, bbox, info):
+        """ Calculates the transform, size and CRS of the grid onto which an image is warped for a bounding box
+
+        :return: The affine transform, width, height and CRS of the grid
+        :rtype: (affine.Affine, int, int, str)
+        """
+        if self.out_shape is not None:
+            height, width = self.out_shape
+            return rasterio.transform.from_bounds(*bbox, width, height), width, height, bbox.crs.ogc_string()
+
+        if self.resolution is None:
+            bounds = {} if info['gcps'] else dict(zip(('left', 'bottom', 'right', 'top'), info['bounds']))
+            default_transform, _, _ = calculate_default_transform(info['crs'], bbox.crs.ogc_string(), info['width'],
+                                                                  info['height'], gcps=info['gcps'], **bounds)
+            res_x, res_y = default_transform.a, -default_transform.e
+        else:
+            res_x, res_y = self._get_resolution()
 
-        return eopatch
+        width = max(round((bbox.max_x - bbox.min_x) / res_x), 1)
+        height = max(round((bbox.max_y - bbox.min_y) / res_y), 1)
+        return rasterio.transform.from_bounds(*bbox, width, height), width, height, bbox.crs.ogc_string()
 
+    @staticmethod
+    def _get_channel_views(data, file_info):
+        """ Splits a preallocated feature array of shape (times, height, width, bands) into the views into which the
+        bands of each file are read. Channels of all files together are ordered as
+        T(1)B(1), ..., T(1)B(N), T(2)B(1), ..., T(M)B(N). Each view has the band axis first, as returned by rasterio.
+
+        :return: For each file a list of band indexes (starting at 1), the view into which they are read and its time
+            index
+        :rtype: list(list((list(int), numpy.ndarray, int)))
+        """
+        bands = data.shape[-1]
+        channel_views, channel_offset = [], 0
 
-class ImportTimeFeatureFromTiffTask(ImportFromTiffTask):
-    """ Adds a raster scene to the specified data feature array."""
-    def __init__(self, data_feature, folder=None, **kwargs):
+        for info in file_info:
+            file_views = []
+            band_index = 1
+            while band_index <= info['count']:
+                time_index, band_offset = divmod(channel_offset, bands)
+                band_count = min(bands - band_offset, info['count'] - band_index + 1)
+
+                view = np.moveaxis(data[time_index, :, :, band_offset:band_offset + band_count], -1, 0)
+                file_views.append((list(range(band_index, band_index + band_count)), view, time_index))
+
+                band_index += band_count
+                channel_offset += band_count
+            channel_views.append(file_views)
+
+        return channel_views
+
+    def _read_file(self, filesystem, path, read_window, file_views, grid=None):
+        """ Reads the bands of a tiff file into their views of the preallocated feature array. If the grid of the
+        EOPatch is given the file is warped onto it.
+
+        :return: Time indexes and validity masks of the views if a `mask_feature` is set
+        :rtype: list((int, numpy.ndarray))
         """
-        :param data_feature: Feature to which the data will be added to
-        :type data_feature: (FeatureType, str)
-        :param filesystem: An existing filesystem object. If not given it will be initialized according to the EOPatch
-            path. If you intend to run this task in multiprocessing mode you shouldn't specify this parameter.
-        :type filesystem: fs.base.FS or None
-        :param features: A collection of features types specifying features of which type will be saved. By default
-            all features will be saved.
-        :type features: an object supported by the :class:`FeatureParser<eolearn.core.utilities.FeatureParser>`
-        :param overwrite_permission: A level of permission for overwriting an existing EOPatch
-        :type overwrite_permission: OverwritePermission or int
-        :param compress_level: A level of data compression and can be specified with an integer from 0 (no compression)
-            to 9 (highest compression).
-        :type compress_level: int
-        :param config: A configuration object with AWS credentials. By default is set to None and in this case the
-            default configuration will be taken.
-        :type config: SHConfig or None
+        if grid is None and file_views:
+            (top, bottom), (left, right) = read_window
+            _, height, width = file_views[0][1].shape
+            self._build_missing_overviews(filesystem, path, min((bottom - top) / height, (right - left) / width))
+
+        masks = []
+        with self._open_raster(filesystem, path) as src:
+            for indexes, view, time_index in file_views:
+                if grid is None:
+                    read_into(src, view, indexes, read_window, fill_value=self.no_data_value,
+                              resampling=self.resampling)
+                else:
+                    warp_into(src, view, indexes, grid, resampling=self.resampling, nodata=self.no_data_value)
+
+                if self.mask_feature is not None:
+                    masks.append((time_index, self._get_valid_mask(src, view, indexes, read_window, grid)))
+
+        return masks
+
+    def _get_valid_mask(self, src, view, indexes, read_window, grid):
+        """ Derives the validity mask of a view which has been read or warped
         """
-        self.kwargs = kwargs
-        feature = (FeatureType.DATA, data_feature)
-        super().__init__(feature=feature, folder=folder)
+        if grid is None:
+            return get_valid_mask(src, view, indexes, read_window)
+        return get_valid_mask(src, view, indexes, nodata=self.no_data_value)
 
-    def execute(self, file_name, time_stamps, eopatch=None, manifest_file=None):
-        """ Adds another time stamp to the given data feature.
 
-        :param path: Path of an image file (.tiff)
-        :type path: str
-        :param eopatch: EOPatch which will be saved
-        :type eopatch: EOPatch
-        :param data_feature: name of EOPatch folder containing data
-        :type data_feature: (FeatureType, str)
+class ImportTilesFromTiffTask(ImportFromTiffTask):
+    """ Imports a single large scene into many EOPatches, one for each bounding box of a tiling of the scene, e.g. the
+    bounding boxes of a `BBoxSplitter` or of `BBox.get_partition`.
 
+    The scene is opened only once by every worker thread and the windows of the tiles are read in the order of the
+    internal blocks of the image, so that neighbouring tiles reuse the blocks in the cache of GDAL. At most
+    `max_pending` tiles are read ahead of the consumer, which bounds the memory for any number of tiles. A scene on S3
+    is opened through `open_s3_file`, which downloads only the blocks of the tiles. Other remote scenes, and scenes on
+    S3 with rasterio<1.4 which does not support openers, are read into memory once and shared by the workers.
 
-        :return: The same EOPatch
-        :rtype: EOPatch
+    If `warp` is set each tile is warped onto the grid of its bounding box, which may be in another CRS than the scene,
+    and the tiles are read row by row of the tiling.
+    """
+    def __init__(self, feature, folder=None, *, max_pending=None, **kwargs):
+        """
+        :param feature: EOPatch feature into which data will be imported, it has to be a spatial feature
+        :type feature: (FeatureType, str)
+        :param folder: A directory containing image files or a path of an image file
+        :type folder: str
+        :param max_pending: Maximum number of tiles which have been read but not yet consumed, by default twice the
+            number of workers
+        :type max_pending: int or None
+        :param kwargs: Parameters of `ImportFromTiffTask`, e.g. `timestamp_size`, `max_workers` or `image_dtype`
+        """
+        super().__init__(feature, folder=folder, **kwargs)
+
+        self.max_pending = max_pending or 2 * self.max_workers
+
+    def execute(self, bbox_list, *, filename=None):
+        """ Imports the tiles of a scene
+
+        :param bbox_list: Bounding boxes of the tiles
+        :type bbox_list: list(BBox)
+        :param filename: filename of tiff file or None if entire path has already been specified in `folder` parameter
+            of task initialization.
+        :type filename: str or None
+        :return: One new EOPatch for each bounding box, in the order of the bounding boxes
+        :rtype: list(EOPatch)
+        """
+        eopatches = [None] * len(bbox_list)
+        for tile_index, eopatch in self.iter_tiles(bbox_list, filename=filename):
+            eopatches[tile_index] = eopatch
+
+        return eopatches
+
+    def iter_tiles(self, bbox_list, *, filename=None):
+        """ Imports the tiles of a scene one by one, e.g. to save each EOPatch as soon as it is read:
+
+            for tile_index, eopatch in task.iter_tiles(bbox_splitter.get_bbox_list(), filename='T32ULA.tif'):
+                eopatch.save(f'patches/tile_{tile_index}')
+
+        :param bbox_list: Bounding boxes of the tiles
+        :type bbox_list: list(BBox)
+        :param filename: filename of tiff file or None if entire path has already been specified in `folder` parameter
+            of task initialization.
+        :type filename: str or None
+        :return: A generator of pairs of the index of a bounding box and the new EOPatch of its tile, in the order in
+            which the tiles are read
+        :rtype: Iterator((int, EOPatch))
         """
         feature_type, feature_name = next(self.feature())
+        if not feature_type.is_spatial():
+            raise ValueError(f'Tiles can only be imported into a spatial feature, got {feature_type}')
+
+        filesystem, filename_paths = self._get_filesystem_and_paths(filename, [], create_paths=False)
+        if len(filename_paths) != 1:
+            raise ValueError(f'Tiles are imported from a single scene, got {len(filename_paths)} files')
+        path = filename_paths[0]
+
+        with ExitStack() as stack:
+            if self.build_overviews and (self.resolution is not None or self.out_shape is not None):
+                with self._open_raster(filesystem, path) as src:
+                    if self.out_shape is None:
+                        res_x, res_y = self._get_resolution()
+                        decimation = min(res_x / src.res[0], res_y / src.res[1])
+                    else:
+                        decimation = min(src.height / self.out_shape[0], src.width / self.out_shape[1])
+                self._build_missing_overviews(filesystem, path, decimation)
+
+            if filesystem.hassyspath(path):
+                scene = filesystem.getsyspath(path)
+            elif isinstance(filesystem, S3FS) and RASTERIO_OPENER:
+                scene = None
+            else:  # workers share a single in-memory copy of a remote scene
+                scene = stack.enter_context(rasterio.io.MemoryFile(filesystem.readbytes(path)))
+
+            datasets, datasets_lock, local = [], threading.Lock(), threading.local()
+
+            def get_dataset():
+                """ Opens the scene once per thread, GDAL datasets must not be shared between threads. The opener of a
+                scene on S3 is registered in the context of the thread, in which the dataset is therefore closed.
+                """
+                if not hasattr(local, 'src'):
+                    if scene is None:
+                        local.src = rasterio.open(path, opener=partial(open_s3_file, filesystem))
+                    elif isinstance(scene, rasterio.io.MemoryFile):
+                        local.src = scene.open()
+                    else:
+                        local.src = rasterio.open(scene)
+                    with datasets_lock:
+                        datasets.append((local.src, contextvars.copy_context()))
+                return local.src
+
+            try:
+                src = get_dataset()
+                info = self._get_source_info(src)
+                block_height, block_width = src.block_shapes[0]
+                channels = src.count
+                dtype = self.image_dtype or src.dtypes[0]
+
+                times = 1
+                if not feature_type.is_timeless():
+                    times = self.timestamp_size or 1
+
+                if channels % times != 0:
+                    raise ValueError('Cannot import as a time-dependant feature because the number of tiff image '
+                                     'channels is not divisible by the number of timestamps')
+
+                if self.warp:
+                    grids = [self._get_warp_grid(bbox, info) for bbox in bbox_list]
+                    read_windows = [((0, height), (0, width)) for _, width, height, _ in grids]
+                    tile_order = sorted(range(len(bbox_list)),
+                                        key=lambda index: (-bbox_list[index].max_y, bbox_list[index].min_x))
+                else:
+                    grids = [None] * len(bbox_list)
+                    read_windows = [self._get_source_reading_window(info, bbox) for bbox in bbox_list]
+                    tile_order = sorted(range(len(bbox_list)), key=lambda index: (
+                        read_windows[index][0][0] // block_height, read_windows[index][1][0] // block_width,
+                        read_windows[index][0][0], read_windows[index][1][0]))
+
+                def read_tile(tile_index):
+                    grid, read_window = grids[tile_index], read_windows[tile_index]
+                    if grid is None:
+                        height, width = self._get_output_shape(read_window, info['pixel_size'])
+                    else:
+                        _, width, height, _ = grid
+                    data = self._allocate((times, height, width, channels // times), dtype)
+                    valid = np.ones((times, height, width), dtype=bool) if self.mask_feature is not None else None
+                    for indexes, view, time_index in self._get_channel_views(data, [{'count': channels}])[0]:
+                        if grid is None:
+                            read_into(get_dataset(), view, indexes, read_window, fill_value=self.no_data_value,
+                                      resampling=self.resampling)
+                        else:
+                            warp_into(get_dataset(), view, indexes, grid, resampling=self.resampling,
+                                      nodata=self.no_data_value)
+                        if valid is not None:
+                            valid[time_index] &= self._get_valid_mask(get_dataset(), view, indexes, read_window, grid)
+
+                    eopatch = EOPatch(bbox=bbox_list[tile_index])
+                    eopatch[feature_type][feature_name] = data[0] if feature_type.is_timeless() else data
+                    if valid is not None:
+                        self._add_mask(eopatch, feature_type, valid)
+                    return eopatch
+
+                with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                    pending = deque()
+                    for tile_index in tile_order:
+                        if len(pending) >= self.max_pending:
+                            done_index, future = pending.popleft()
+                            yield done_index, future.result()
+                        pending.append((tile_index, executor.submit(read_tile, tile_index)))
+
+                    while pending:
+                        done_index, future = pending.popleft()
+                        yield done_index, future.result()
+            finally:
+                for dataset, context in datasets:
+                    context.run(dataset.close)
 
-        if eopatch.timestamp:
-            time_stamps = eopatch.timestamp
 
-        filesystem, filename_paths = self._get_filesystem_and_paths(file_name, time_stamps, create_paths=False)
+class ImportTimeFeatureFromTiffTask(ImportFromTiffTask):
+    """ Adds raster scenes to the time stack of the specified data feature array.
 
+    The time axis of the feature is kept sorted by the time stamps of the EOPatch and is backed by a buffer with spare
+    capacity, which is doubled whenever it runs out. Adding the scenes of a time series one by one, in one or in many
+    calls of the task, therefore costs linear time in the number of scenes.
 
+    While a scene is decoded the following scenes can be prefetched, i.e. read into memory by background threads,
+    which hides the latency of the filesystem on long time series.
+    """
+    def __init__(self, data_feature, folder=None, *, prefetch_depth=None, **kwargs):
+        """
+        :param data_feature: Feature to which the data will be added to
+        :type data_feature: (FeatureType, str)
+        :param folder: A directory containing image files or a path of an image file
+        :type folder: str
+        :param prefetch_depth: A number of scenes read into memory in advance. Prefetched scenes are downloaded as a
+            whole, which pays off on remote filesystems without ranged reads and for scenes mostly covered by the
+            EOPatch. By default `PREFETCH_DEPTH` scenes are prefetched from remote filesystems, except from S3 when
+            rasterio supports openers and only the covered blocks of a scene are downloaded, `0` disables prefetching.
+        :type prefetch_depth: int or None
+        :param image_dtype: Type of data of the imported feature, by default the type of the tiff image
+        :type image_dtype: numpy.dtype
+        :param no_data_value: Values where given Geo-Tiff image does not cover EOPatch
+        :type no_data_value: int or float
+        :param memmap_folder: A local folder in which the feature is stored as a memory-mapped .npy file
+        :type memmap_folder: str or None
+        :param config: A configuration object containing AWS credentials
+        :type config: SHConfig
+        """
+        feature = (FeatureType.DATA, data_feature)
+        super().__init__(feature=feature, folder=folder, **kwargs)
+
+        self.prefetch_depth = prefetch_depth
+
+    def execute(self, file_name, time_stamps, eopatch=None, manifest_file=None):
+        """ Adds the scenes of the given files to the time stack of the data feature. Each scene is inserted at the
+        position of its time stamp, scenes of time stamps which the EOPatch already contains are skipped without being
+        read. The time stamps of the EOPatch are expected to be sorted.
+
+        :param file_name: Name of a tiff file, a path template with a `*` for the time stamp or a list of names with one
+            file per time stamp. A single file may contain several time frames, its channels are then expected in the
+            order T(1)B(1), ..., T(1)B(N), T(2)B(1), ..., T(M)B(N).
+        :type file_name: str or list(str)
+        :param time_stamps: Time stamps of the scenes
+        :type time_stamps: list(datetime)
+        :param eopatch: EOPatch to which the scenes are added, if not given a new EOPatch is created
+        :type eopatch: EOPatch or None
+        :param manifest_file: Manifest file of a Sentinel-1 product, required for not georeferenced GRD images
+        :type manifest_file: str or None
+        :return: The EOPatch with the added scenes
+        :rtype: EOPatch
+        """
+        if eopatch is None:
+            eopatch = EOPatch()
 
-        with filesystem:
-            for path in filename_paths:
-                with filesystem.openbin(path, 'r') as file_handle:
-                    with rasterio.open(file_handle, driver='Gtiff') as src:
-                        if not src.crs:  # as common for not georeferenced GRD Sentinel-1 data
-                            if not manifest_file:
-                                raise ValueError(f"The given tiff-file {path} (at: {filesystem.root_path})does not "
-                                                 f"feature any reference bounding box. Please state a manifest file.")
+        if not time_stamps:
+            raise ValueError('At least one time stamp has to be given')
 
-                            data_crs = str(src.gcps[1])
-                            data_footprint = get_footprint_from_gcps(src.height, src.width, src.gcps[0], data_crs)
-                            data_bbox = data_footprint.bbox
+        filesystem, filename_paths = self._get_filesystem_and_paths(file_name, time_stamps, create_paths=False)
 
-                            data_transform = rasterio.transform.from_gcps(src.gcps[0])
+        if len(filename_paths) == len(time_stamps):
+            scenes = sorted(([time_stamp], path) for time_stamp, path in zip(time_stamps, filename_paths))
+        elif len(filename_paths) == 1:
+            scenes = [(list(time_stamps), filename_paths[0])]
+        else:
+            raise ValueError(f'Got {len(filename_paths)} files for {len(time_stamps)} time stamps')
+
+        new_scenes = []
+        for scene_time_stamps, path in scenes:
+            if all(self._contains(eopatch.timestamp, time_stamp) for time_stamp in scene_time_stamps):
+                LOGGER.info('Skipping %s, the EOPatch already contains its time stamps', path)
+            else:
+                new_scenes.append((scene_time_stamps, path))
+
+        with closing(self._iter_sources(filesystem, [path for _, path in new_scenes])) as sources:
+            for (scene_time_stamps, path), src in zip(new_scenes, sources):
+                # time stamps of an earlier scene of this call might have been equal
+                new_frames = [(frame_index, time_stamp) for frame_index, time_stamp in enumerate(scene_time_stamps)
+                              if not self._contains(eopatch.timestamp, time_stamp)]
+                if not new_frames:
+                    LOGGER.info('Skipping %s, the EOPatch already contains its time stamps', path)
+                    continue
+
+                self._add_scene(eopatch, filesystem, src, path, len(scene_time_stamps), new_frames, manifest_file)
 
-                            if not eopatch.bbox:
-                                eopatch.bbox = data_bbox
+        return eopatch
 
-                            data_ul_y, data_lr_x = eopatch.bbox.lower_left
-                            data_lr_y, data_ul_x = eopatch.bbox.upper_right
+    def _iter_sources(self, filesystem, paths):
+        """ Opens the images of the given paths one after another, each is closed when the next one is requested.
+        With prefetching the following images are read into memory in the background meanwhile.
+        """
+        prefetch_depth = self.prefetch_depth
+        if prefetch_depth is None:
+            ranged_reads = isinstance(filesystem, S3FS) and RASTERIO_OPENER
+            prefetch_depth = 0 if not paths or ranged_reads or filesystem.hassyspath(paths[0]) else PREFETCH_DEPTH
+
+        if not prefetch_depth:
+            for path in paths:
+                with self._open_raster(filesystem, path) as src:
+                    yield src
+            return
+
+        for _, data in PrefetchingReader(filesystem, paths, depth=prefetch_depth):
+            memory_file = rasterio.io.MemoryFile(data)
+            del data  # the memory file holds its own copy
+            with memory_file, memory_file.open() as src:
+                yield src
+
+    def _add_scene(self, eopatch, filesystem, src, path, times, new_frames, manifest_file):
+        """ Reads the given time frames of an opened scene into their places in the time stack of the EOPatch. If
+        `warp` is set the scene is warped onto the grid of the EOPatch instead.
+        """
+        grid = None
+        if self.warp:
+            info = self._get_source_info(src)
+            if eopatch.bbox is None:
+                eopatch.bbox = info['bbox']
 
-                            read_window = get_window(upper_left=(data_lr_x, data_ul_y),
-                                                     bottom_right=(data_ul_x, data_lr_y),
-                                                     crs_transform=data_transform,
-                                                     ref_crs=str(eopatch.bbox.crs), out_crs=data_crs)
+            grid = self._get_warp_grid(eopatch.bbox, info)
+            data_transform, width, height, _ = grid
 
-                            try:  # execute src.read throws an error due to failed Proj definition
-                                scene_data = src.read(window=read_window, boundless=True, fill_value=999)
-                            except rasterio._err.CPLE_AppDefinedError:
-                                scene_data = src.read(window=read_window, boundless=True, fill_value=999)
+            read_window = ((0, height), (0, width))
+            flip = False
 
-                            scene_data = np.flip(scene_data, 2)  # flipping needed for GRD S1 data!
+        elif not src.crs:  # as common for not georeferenced GRD Sentinel-1 data
+            if not manifest_file:
+                raise ValueError(f"The given tiff-file {path} does not feature any reference bounding box. "
+                                 f"Please state a manifest file.")
 
-                        else:  # S2 Data
-                            data_bbox = BBox(src.bounds, CRS(src.crs.to_epsg()))
-                            data_crs = str(src.crs)
-                            data_transform = src.transform
+            data_transform = rasterio.transform.from_gcps(src.gcps[0])
 
-                            data_ul_x, data_lr_y = eopatch.bbox.lower_left
-                            data_lr_x, data_ul_y = eopatch.bbox.upper_right
+            if not eopatch.bbox:
+                eopatch.bbox = self._get_source_info(src)['bbox']
 
-                            read_window = get_window(upper_left=(data_ul_x, data_ul_y),
-                                                     bottom_right=(data_lr_x, data_lr_y),
-                                                     crs_transform=data_transform,
-                                                     ref_crs=str(eopatch.bbox.crs), out_crs=data_crs)
+            read_window = self._get_reading_window_from_geometry(*src.gcps, eopatch.bbox)
+            flip = True  # flipping needed for GRD S1 data!
 
-                            scene_data = src.read(window=read_window, boundless=True,
-                                                  fill_value=999)  # self.no_data_value)
+        else:  # S2 Data
+            data_bbox = BBox(src.bounds, CRS(src.crs.to_epsg()))
+            data_crs = str(src.crs)
+            data_transform = src.transform
 
-                        if eopatch.bbox is None:
-                            eopatch.bbox = data_bbox
+            if eopatch.bbox is None:
+                eopatch.bbox = data_bbox
 
-                        eopatch.meta_info['transform'] = data_transform
+            data_ul_x, data_lr_y = eopatch.bbox.lower_left
+            data_lr_x, data_ul_y = eopatch.bbox.upper_right
 
-        # scene_data = np.concatenate(scene_data, axis=0)
+            read_window = get_window(upper_left=(data_ul_x, data_ul_y),
+                                     bottom_right=(data_lr_x, data_lr_y),
+                                     crs_transform=data_transform,
+                                     ref_crs=str(eopatch.bbox.crs), out_crs=data_crs)
+            flip = False
 
-        if self.image_dtype is not None:
-            scene_data = scene_data.astype(self.image_dtype)
+        eopatch.meta_info['transform'] = data_transform
 
-        if not feature_type.is_spatial():
-            scene_data = scene_data.flatten()  # flatten 2d array into one single axis
+        bands, remainder = divmod(src.count, times)
+        if remainder:
+            raise ValueError('Cannot import as a time-dependant feature because the number of tiff image channels '
+                             'is not divisible by the number of timestamps')
 
-        if feature_type.is_timeless():
-            data = np.moveaxis(scene_data, 0, -1)  # moves the first axis one to the back
+        window = _round_window(read_window)
+        if grid is None:
+            pixel_size = self._get_source_info(src)['pixel_size'] if self.resolution is not None else None
+            frame_shape = self._get_output_shape(((0, int(window.height)), (0, int(window.width))), pixel_size) + \
+                (bands,)
         else:
-            channels = scene_data.shape[0]
+            frame_shape = (int(window.height), int(window.width), bands)
+
+        with ExitStack() as stack:
+            decimation = min(window.height / frame_shape[0], window.width / frame_shape[1])
+            if grid is None and self._build_missing_overviews(filesystem, path, decimation):
+                src = stack.enter_context(self._open_raster(filesystem, path))  # the opened scene lacks the overviews
+
+            for frame_index, time_stamp in new_frames:
+                indexes = list(range(frame_index * bands + 1, (frame_index + 1) * bands + 1))
+
+                with self._inserted_frame(eopatch, time_stamp, frame_shape, self.image_dtype or src.dtypes[0]) as \
+                        (frame, mask_frame):
+                    view = np.moveaxis(frame[:, ::-1, :] if flip else frame, -1, 0)
+                    if grid is not None:
+                        warp_into(src, view, indexes, grid, resampling=self.resampling, nodata=self.no_data_value)
+                    else:
+                        try:  # execute src.read throws an error due to failed Proj definition
+                            read_into(src, view, indexes, window, fill_value=self.no_data_value,
+                                      resampling=self.resampling)
+                        except rasterio._err.CPLE_AppDefinedError:
+                            read_into(src, view, indexes, window, fill_value=self.no_data_value,
+                                      resampling=self.resampling)
+
+                    if self.mask_feature is not None:
+                        valid = self._get_valid_mask(src, view, indexes, window, grid)
+                        mask_frame[...] = pack_mask(valid[:, ::-1] if flip else valid)
 
-            times = len(time_stamps)
-            if times == 0:
-                times = len(time_stamps) if time_stamps else 1
+    @staticmethod
+    def _contains(time_stamps, time_stamp):
+        """ Checks if a sorted list of time stamps contains a time stamp
+        """
+        position = bisect.bisect_left(time_stamps, time_stamp)
+        return position < len(time_stamps) and time_stamps[position] == time_stamp
+
+    @contextmanager
+    def _inserted_frame(self, eopatch, time_stamp, frame_shape, dtype):
+        """ Makes room for a frame at the position of its time stamp in the time stack of the feature and yields the
+        views of the frame, into which it has to be read, and of its packed validity mask if `mask_feature` is set.
+        The frame, its mask and its time stamp are only added to the EOPatch if reading succeeds.
+        """
+        feature_type, feature_name = next(self.feature())
+        time_stamps = eopatch.timestamp
+        size = len(time_stamps)
+        position = bisect.bisect_left(time_stamps, time_stamp)
+
+        stack = eopatch[feature_type][feature_name] if feature_name in eopatch[feature_type] else None
+        if stack is None:
+            if size:
+                raise ValueError(f'Cannot add the feature {feature_name} to an EOPatch which already has time stamps')
+        else:
+            if stack.shape != (size,) + frame_shape:
+                raise ValueError(f'The scene of shape {frame_shape} does not fit into the time stack of shape '
+                                 f'{stack.shape} with {size} time stamps')
+            dtype = stack.dtype
+
+        masks = new_masks = mask_frame = None
+        if self.mask_feature is not None:
+            masks = eopatch.mask[self.mask_feature] if self.mask_feature in eopatch.mask else None
+            mask_shape = (frame_shape[0], -(-frame_shape[1] // 8), 1)
+            if (0 if masks is None else len(masks)) != size or (masks is not None and masks.shape[1:] != mask_shape):
+                raise ValueError(f'The mask {self.mask_feature} does not cover all {size} previous time frames of the '
+                                 'feature')
+
+        new_stack, frame = self._grow_time_stack(stack, position, frame_shape, dtype)
+        if self.mask_feature is not None:
+            new_masks, mask_frame = self._grow_time_stack(masks, position, mask_shape, np.uint8)
+        yield frame, mask_frame
+
+        self._set_time_stack(eopatch, (feature_type, feature_name), stack, new_stack, position)
+        if self.mask_feature is not None:
+            self._set_time_stack(eopatch, (FeatureType.MASK, self.mask_feature), masks, new_masks, position)
+            eopatch.meta_info[f'{self.mask_feature}_width'] = frame_shape[1]
+        time_stamps.insert(position, time_stamp)
+
+    def _grow_time_stack(self, stack, position, frame_shape, dtype):
+        """ Returns a time stack with room for a new frame at the given position and the view of the new frame. A
+        frame appended to the latest view of a buffer is written into its spare capacity, the frames of the stack are
+        then shared. Otherwise the frames are copied into a new buffer, so that views of the buffer which have been
+        handed out earlier, e.g. to shallow copies of the EOPatch, never change.
+        """
+        size = 0 if stack is None else len(stack)
+        buffer = self._get_buffer(stack) if position == size else None
 
-            if channels % times != 0:
-                raise ValueError('Cannot import as a time-dependant feature because the number of tiff image channels '
-                                 'is not divisible by the number of timestamps')
+        if buffer is None or buffer.shape[0] == size:
+            buffer = self._allocate((max(2 * size, 1),) + frame_shape, dtype)
+            _TIME_STACK_VIEWS[id(buffer)] = None
+            weakref.finalize(buffer, _TIME_STACK_VIEWS.pop, id(buffer), None)
+            if size:
+                buffer[:position] = stack[:position]
+                buffer[position + 1:size + 1] = stack[position:]
 
-            data = scene_data.reshape((times, channels // times) + scene_data.shape[1:])
-            data = np.moveaxis(data, 1, -1)
+        return buffer[:size + 1], buffer[position]
 
-        eopatch[feature_type][feature_name] = data
-        for i in range(times):
-            eopatch.timestamp.append(time_stamps[i])
+    @staticmethod
+    def _set_time_stack(eopatch, feature, stack, new_stack, position):
+        """ Replaces a time stack of the EOPatch by the grown one, which becomes the latest view of its buffer
+        """
+        _TIME_STACK_VIEWS[id(new_stack.base)] = weakref.ref(new_stack)
+        _record_time_insert(eopatch, feature, stack, new_stack, position)
+        feature_type, feature_name = feature
+        eopatch[feature_type][feature_name] = new_stack
 
-        return eopatch
+    @staticmethod
+    def _get_buffer(stack):
+        """ Returns the buffer of a time stack if the stack is the latest view of a buffer created by this task, i.e.
+        the frames after it are spare capacity which no one else refers to
+        """
+        if stack is None or stack.base is None:
+            return None
+        latest_view = _TIME_STACK_VIEWS.get(id(stack.base))
+        if latest_view is None or latest_view() is not stack:
+            return None
+        return stack.base
@@ -1,20 +1,49 @@
 # import required libraries
 import boto3
-import xml.etree.ElementTree as ET
 import os
+import numpy as np
+import pandas as pd
 
+from io import BytesIO
 from re import search
+from datetime import date as date_typ, datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
 from sentinelhub.geometry import BBox
-from pyproj import Transformer
-from os import remove as remove_file
-from geometry_utils import point_in_bounding_box
-from sentinel_io_utils import API_Error
+from shapely.geometry import Polygon
+from shapely.prepared import prep
+from geometry_utils import transform_points
+from sentinel_io_utils import API_Error, parse_s1_product_names, get_s1_product_masks, get_relative_orbit, \
+    find_manifest_feature_text, parse_coordinates_text
 from http_api_utils import append_directory, append_search_parameter, append_aoi, append_point, append_timestamp, make_url_request
 
 # Define repository
 HOST = 'http://data.cloud.code-de.org'
 BUCKET = 'CODEDE'
 FINDER_API = 'https://finder.code-de.org/resto/api'
+MANIFEST_CRS = 'epsg:4326'
+MAX_WORKERS = 16
+
+
+def get_dates(start_date, end_date):
+    """ Lists all days between the start and the end date (both included) in the date format of the CODE-DE bucket.
+
+    :param start_date: first day, either as date or as a string 'YYYY/MM/DD' or 'YYYY-MM-DD'
+    :type start_date: date or datetime or str
+    :param end_date: last day, either as date or as a string 'YYYY/MM/DD' or 'YYYY-MM-DD'
+    :type end_date: date or datetime or str
+    :return: days in the format 'YYYY/MM/DD'
+    :rtype: list of str
+    """
+    days = []
+    for day in (start_date, end_date):
+        if isinstance(day, str):
+            day = date_typ.fromisoformat(day.replace('/', '-')[:10])
+        elif isinstance(day, datetime):
+            day = day.date()
+        days.append(day)
+
+    n_days = (days[1] - days[0]).days + 1
+    return [(days[0] + timedelta(days=i_day)).strftime('%Y/%m/%d') for i_day in range(n_days)]
 
 class SentinelIOClient:
     def __init__(self, access_key, secret_key):
@@ -23,6 +52,7 @@ class SentinelIOClient:
         self.aws_client = boto3.client('s3', aws_access_key_id=access_key, aws_secret_access_key=secret_key,
                                        endpoint_url=HOST)
         self.product_list = []
+        self._footprint_cache = dict()
 
     def find(self, collection: str, pretty=True, start_date=None, completion_date=None, processing_level=None,
              aoi=None, show_list=False):
@@ -93,77 +123,129 @@ class SentinelIOClient:
 
     @staticmethod
     def read_feature_from_manifest(manifest_file_path, feature_id='measurementFrameSet', tag='coordinates'):
-        tree = ET.parse(manifest_file_path)
-        root = tree.getroot()
+        feature_text = find_manifest_feature_text(manifest_file_path, feature_id=feature_id, tag=tag)
 
-        i = 0
-        for elem in root:
-            for sub_elem in elem:
-                if 'ID' in sub_elem.attrib.keys():
-                    if sub_elem.attrib['ID'] == feature_id:
-                        while i < 8:
-                            i += 1
-                            for sub_sub_elem in sub_elem:
-                                if sub_sub_elem.tag.endswith(tag):  # oder: if tag in sub_sub_elem.tag:
-                                    feature_text = sub_sub_elem.text
-                                    break
-                                else:
-                                    sub_elem = sub_sub_elem
         if tag == 'coordinates':
-            coordinates = []  # list of 4 coordinate tuples
-            coordinates_list_txt = feature_text.strip(' ').split(' ')
-
-            if len(coordinates_list_txt) == 4:  # Format for S1 coordinates: altitude1,latitude1 alt2,lat2 ...
-                for coordinate in coordinates_list_txt:
-                    coordinates.append((float(coordinate.split(',')[0]),
-                                        float(coordinate.split(',')[1])))
-            elif len(coordinates_list_txt) > 4 and len(
-                    coordinates_list_txt) % 2 == 0:  # Format for S2 coordinates: altitude1 latitude1 alt2-4 lat2-4 alt1 lat1
-                for i_coordinate in range(int(len(coordinates_list_txt) / 2)):
-                    coordinate = (
-                    float(coordinates_list_txt[i_coordinate * 2]), float(coordinates_list_txt[i_coordinate * 2 + 1]))
-                    if not coordinate in coordinates:
-                        coordinates.append(coordinate)
-            else:
-                raise ValueError('Coordinates from feature text could not be interpreted.')
-
-            return coordinates
+            return parse_coordinates_text(feature_text)  # list of coordinate tuples
         else:
             return feature_text
 
+    @staticmethod
+    def _get_manifest_key(product_id):
+        return product_id.lstrip('codede').lstrip('CODEDE').strip('//') + r'/manifest.safe'
+
     def download_manifest(self, product_id, target_file=None):
         if not target_file:
             target_file = r'manifest.safe'
-        manifest_file = product_id.lstrip('codede').lstrip('CODEDE').strip('//') + r'/manifest.safe'
 
         with open(target_file, 'wb') as data:
-            self.aws_client.download_fileobj('CODEDE', manifest_file, data)
+            self.aws_client.download_fileobj(BUCKET, self._get_manifest_key(product_id), data)
             print(f'The target file has been downloaded: {target_file} ')
 
-    #     def filter_for_aoi(self, product_id_list, upper_left:tuple, lower_right:tuple, crs:str):
-    def filter_for_aoi(self, product_id_list, aoi: BBox):
-
-        filtered_products = list()
-        temp_file = 'manifest_temp.safe'
+    def load_manifest(self, product_id):
+        """ Downloads the manifest file of a product into an in-memory buffer instead of a file on disk. Other than
+        `download_manifest` this can safely be called from several threads at once.
+
+        :param product_id: product identifier or key of the product on the CODE-DE bucket
+        :type product_id: str
+        :return: buffer holding the manifest file, positioned at its beginning
+        :rtype: BytesIO
+        """
+        buffer = BytesIO()
+        self.aws_client.download_fileobj(BUCKET, self._get_manifest_key(product_id), buffer)
+        buffer.seek(0)
+        return buffer
+
+    def get_footprint(self, product_id):
+        """ Returns the footprint of a product as stated in its manifest file. Footprints are cached per product, so
+        the manifest of a product is fetched only once per client.
+
+        :param product_id: product identifier or key of the product on the CODE-DE bucket
+        :type product_id: str
+        :return: footprint polygon with coordinates in the order of the manifest file (latitude, longitude)
+        :rtype: shapely.geometry.Polygon
+        """
+        if product_id not in self._footprint_cache:
+            coordinates = self.read_feature_from_manifest(self.load_manifest(product_id),
+                                                          'measurementFrameSet', 'coordinates')
+            self._footprint_cache[product_id] = Polygon(coordinates)
+
+        return self._footprint_cache[product_id]
+
+    def get_footprints(self, product_id_list, max_workers=MAX_WORKERS):
+        """ Fetches and parses the footprints of several products concurrently.
+
+        :param product_id_list: product identifiers or keys of the products on the CODE-DE bucket
+        :type product_id_list: list of str
+        :param max_workers: maximum number of manifest files being downloaded at the same time
+        :type max_workers: int
+        :return: footprints in the same order as the given product list
+        :rtype: list of shapely.geometry.Polygon
+        """
+        missing_ids = [product_id for product_id in dict.fromkeys(product_id_list)
+                       if product_id not in self._footprint_cache]
+        if missing_ids:
+            with ThreadPoolExecutor(max_workers=min(max_workers, len(missing_ids))) as executor:
+                list(executor.map(self.get_footprint, missing_ids))
+
+        return [self._footprint_cache[product_id] for product_id in product_id_list]
+
+    def filter_for_aoi(self, product_id_list, aoi: BBox, max_workers=MAX_WORKERS):
+        """ Filters the given products for those whose footprint intersects the area of interest.
+
+        :param product_id_list: product identifiers or keys of the products on the CODE-DE bucket
+        :type product_id_list: list of str
+        :param aoi: area of interest
+        :type aoi: BBox
+        :param max_workers: maximum number of manifest files being downloaded at the same time
+        :type max_workers: int
+        :return: products intersecting the area of interest, without duplicates
+        :rtype: list of str
+        """
+        product_id_list = list(dict.fromkeys(product_id_list))
+        if not product_id_list:
+            return []
+
+        footprints = self.get_footprints(product_id_list, max_workers=max_workers)
+
+        # manifest coordinates are given in (latitude, longitude) order, which is the authority axis order of WGS84
+        x_coords, y_coords = zip(*aoi.get_polygon())
+        longitudes, latitudes = transform_points(x_coords, y_coords, crs_from=aoi.crs, crs_to=MANIFEST_CRS)
+        aoi_polygon = Polygon(np.column_stack((latitudes, longitudes)))
+        prepared_aoi = prep(aoi_polygon)
+
+        return [product_id for product_id, footprint in zip(product_id_list, footprints)
+                if prepared_aoi.intersects(footprint)]
 
-        for product_id in product_id_list:
-            self.download_manifest(product_id, temp_file)
-
-            scene_boundings = self.read_feature_from_manifest(temp_file, 'measurementFrameSet', 'coordinates')
-            remove_file(temp_file)
-            scene_crs = 'epsg:4263'  # !!!  change to:
-            #             scene_geometry, scene_crs = self.get_footprint_from_manifest(product_id)
-            #             transform scene geometry to iterable list of coordinates, like scene_geometry
-            #             Transform the given geometry to the scene crs
+    @staticmethod
+    def _iter_concurrently(function, jobs, max_workers=MAX_WORKERS):
+        """ Runs a function over keyword argument sets in a thread pool and yields the results as they complete. At
+        most twice as many jobs as workers are submitted at a time.
+
+        :param function: function to be called with each keyword argument set
+        :type function: callable
+        :param jobs: keyword argument sets
+        :type jobs: iterable of dict
+        :param max_workers: maximum number of concurrent calls
+        :type max_workers: int
+        :return: pairs of keyword arguments and the corresponding result
+        :rtype: generator of (dict, object)
+        """
+        jobs = iter(jobs)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = dict()
+            while True:
+                for job in jobs:
+                    pending[executor.submit(function, **job)] = job
+                    if len(pending) >= 2 * max_workers:
+                        break
 
-            transformer = Transformer.from_crs(crs_from=str(aoi.crs), crs_to=str(scene_crs))
-            for coordinate in [aoi.lower_left, aoi.upper_right]:
-                if not point_in_bounding_box(scene_boundings, transformer.transform(coordinate[0], coordinate[1])):
-                    continue
-                if not product_id in filtered_products:
-                    filtered_products.append(product_id)
+                if not pending:
+                    return
 
-        return filtered_products
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield pending.pop(future), future.result()
 
 
 class Sentinel2Client(SentinelIOClient):
@@ -172,6 +254,16 @@ class Sentinel2Client(SentinelIOClient):
 
     def get_data_file_keys(self, collection: str, date: str, tile_id: str, resolution: str, bands: list,
                            max_directory_depth=5):
+        data_keys = self._find_data_file_keys(collection, date, tile_id, resolution, bands,
+                                              max_directory_depth=max_directory_depth)
+
+        print(f"{len(data_keys)} elements have been found")
+        for key in data_keys:
+            print(key)
+        return data_keys
+
+    def _find_data_file_keys(self, collection: str, date: str, tile_id: str, resolution: str, bands: list,
+                             max_directory_depth=5):
         prefix = collection + date + '/'
         i = 0
         data_keys = []
@@ -218,11 +310,53 @@ class Sentinel2Client(SentinelIOClient):
                         print(object_key)
             i += 1
 
-        print(f"{len(data_keys)} elements have been found")
-        for key in data_keys:
-            print(key)
         return data_keys
 
+    def iter_data_file_keys(self, collection: str, start_date, end_date, tile_ids, resolution: str, bands: list,
+                            max_workers=MAX_WORKERS):
+        """ Searches the data file keys of several tiles over a date range. The listings of the single days and tiles
+        run concurrently and their results are yielded as soon as they complete.
+
+        :param collection: collection prefix on the CODE-DE bucket
+        :type collection: str
+        :param start_date: first day of the date range
+        :type start_date: date or datetime or str
+        :param end_date: last day of the date range
+        :type end_date: date or datetime or str
+        :param tile_ids: one or several tile identifiers, e.g. 'T32UMV'
+        :type tile_ids: str or list of str
+        :param resolution: resolution of the bands, e.g. '10'
+        :type resolution: str
+        :param bands: band names, e.g. ['B02', 'B03']
+        :type bands: list of str
+        :param max_workers: maximum number of concurrent listings
+        :type max_workers: int
+        :return: date, tile identifier and the found data file keys
+        :rtype: generator of (str, str, list of str)
+        """
+        if isinstance(tile_ids, str):
+            tile_ids = [tile_ids]
+
+        jobs = ({'collection': collection, 'date': date, 'tile_id': tile_id, 'resolution': resolution,
+                 'bands': bands} for date in get_dates(start_date, end_date) for tile_id in tile_ids)
+
+        for job, data_keys in self._iter_concurrently(self._find_data_file_keys, jobs, max_workers=max_workers):
+            yield job['date'], job['tile_id'], data_keys
+
+    def get_data_file_keys_batch(self, collection: str, start_date, end_date, tile_ids, resolution: str,
+                                 bands: list, max_workers=MAX_WORKERS):
+        """ Collects the data file keys of several tiles over a date range into one table, see `iter_data_file_keys`.
+
+        :return: A table with the columns date, tile_id and key sorted by date and tile
+        :rtype: pandas.DataFrame
+        """
+        rows = [(date, tile_id, key) for date, tile_id, data_keys in
+                self.iter_data_file_keys(collection, start_date, end_date, tile_ids, resolution, bands,
+                                         max_workers=max_workers) for key in data_keys]
+
+        key_table = pd.DataFrame(rows, columns=['date', 'tile_id', 'key'])
+        return key_table.sort_values(['date', 'tile_id', 'key'], ignore_index=True)
+
     def download_band_data(self, target_files: list, download_files: list):
         if len(target_files) != len(download_files):
             raise ValueError('The file lists have to be the same length.')
@@ -236,63 +370,51 @@ class Sentinel1Client(SentinelIOClient):
     def __init__(self, access_key, secret_key):
         super().__init__(access_key, secret_key)
 
-    def get_data_file_keys(self, collection: str, date: str, mission_id: str, scan_mode: str, product_type: str,
-                           resolution: str, polarisation_class: str, check_for_relative_orbit=None,
-                           processing_level='1', product_class='S', aoi=None, max_directory_depth=5):
+    def list_products(self, collection: str, date: str):
+        """ Lists the Sentinel-1 products of a collection at the given date and parses their names.
 
+        :param collection: collection prefix on the CODE-DE bucket, e.g. 'Sentinel-1/SAR/GRD/'
+        :type collection: str
+        :param date: acquisition date in the format YYYY/MM/DD
+        :type date: str
+        :return: one record per product, see `sentinel_io_utils.S1_PRODUCT_DTYPE`
+        :rtype: numpy.recarray
+        """
         if collection.startswith('codede/'):
             collection = collection.lstrip('codede/')
 
         prefix = collection + date + '/'
-        product_title_elements = ['Mission ID', 'Scan Mode', 'Produkt Typ', 'Resolution', 'Processing Level',
-                                  'Product Class', 'Polarisation Class', 'Date']
-        product_title_list = [mission_id + '_', scan_mode + '_', product_type, resolution + '_', processing_level,
-                              product_class, polarisation_class + '_', date.replace('/', '')]
-        product_title = prefix
-        i_product_err = 0
+        response = self.aws_client.list_objects(Delimiter='/', Bucket=BUCKET, Prefix=prefix, MaxKeys=30000)
 
-        i = 0
-        data_keys = []
-
-        while i < max_directory_depth and data_keys == []:  # Schleife durch die Ebenen
-
-            objects = [i for i in
-                       self.aws_client.list_objects(Delimiter='/', Bucket='CODEDE', Prefix=prefix, MaxKeys=30000)[
-                           'CommonPrefixes']]
-
-            for object_key in objects:  # Schleife durch die Objekte eines Datums
-                err = None
-
-                product_title = prefix
-                for i_product in range(len(product_title_list)):  # Schleife durch die Elemente des Produkttitels
-                    product_title += product_title_list[i_product]
+        return parse_s1_product_names([object_key['Prefix'] for object_key in response.get('CommonPrefixes', [])])
 
-                    if not object_key['Prefix'].startswith(product_title):
-                        i_product_err = max(i_product, i_product_err)
-                        err = f"No data could be found under the given {product_title_elements[i_product_err]}: {product_title_list[i_product_err].rstrip('_')}"
-                        break
-
-                    if check_for_relative_orbit:
-                        abs_orbit_nr = int(
-                            object_key['Prefix'].split('_')[-3])  # check whether the orbit number matches the date
-                        if not self._is_in_relative_orbit(abs_orbit_nr, int(check_for_relative_orbit), mission_id):
-                            err = f"No data could be found for the given relative orbit number ({check_for_relative_orbit}) on the {date}."
-                            break
-
-                    if not err and i_product == len(product_title_list) - 1:
-                        data_keys.append(object_key['Prefix'])
-
-            if data_keys == []:
-                print(err)
+    def get_data_file_keys(self, collection: str, date: str, mission_id: str, scan_mode: str, product_type: str,
+                           resolution: str, polarisation_class: str, check_for_relative_orbit=None,
+                           processing_level='1', product_class='S', aoi=None):
+
+        products = self.list_products(collection, date)
+
+        masks = get_s1_product_masks(products, mission_id=mission_id, scan_mode=scan_mode, product_type=product_type,
+                                     resolution=resolution, processing_level=processing_level,
+                                     product_class=product_class, polarisation_class=polarisation_class, date=date,
+                                     relative_orbit=check_for_relative_orbit)
+
+        selection = np.ones(len(products), dtype=bool)
+        for element_name, mask in masks:
+            selection &= mask
+            if not selection.any():
+                if element_name == 'Relative Orbit':
+                    print(f"No data could be found for the given relative orbit number ({check_for_relative_orbit}) "
+                          f"on the {date}.")
+                else:
+                    print(f"No data could be found under the given {element_name}.")
                 break
 
-            i += 1  # Ende der while-Schleife, neue Ebene im Data-file-Path
+        data_keys = [BUCKET + '/' + key for key in products.key[selection]]
 
         print(f"{len(data_keys)} elements have been found")
-        for i_key in range(len(data_keys)):
-            data_keys[i_key] = BUCKET + '/' + data_keys[i_key]
-
-            print(data_keys[i_key])
+        for key in data_keys:
+            print(key)
 
         if type(aoi) == BBox:
             filtered_keys = self.filter_for_aoi(data_keys, aoi)
@@ -300,19 +422,60 @@ class Sentinel1Client(SentinelIOClient):
         else:
             return data_keys
 
+    def iter_data_file_keys(self, collection: str, start_date, end_date, mission_id=None, scan_mode=None,
+                            product_type=None, resolution=None, polarisation_class=None, relative_orbits=None,
+                            processing_level='1', product_class='S', max_workers=MAX_WORKERS):
+        """ Searches the products of a date range. The listings of the single days run concurrently and are filtered
+        as soon as they complete, filters which are None are skipped.
+
+        :param collection: collection prefix on the CODE-DE bucket, e.g. 'Sentinel-1/SAR/GRD/'
+        :type collection: str
+        :param start_date: first day of the date range
+        :type start_date: date or datetime or str
+        :param end_date: last day of the date range
+        :type end_date: date or datetime or str
+        :param relative_orbits: one or several relative orbit numbers
+        :type relative_orbits: int or list of int
+        :param max_workers: maximum number of concurrent listings
+        :type max_workers: int
+        :return: date and the matching products of that date
+        :rtype: generator of (str, numpy.recarray)
+        """
+        jobs = ({'collection': collection, 'date': date} for date in get_dates(start_date, end_date))
+
+        for job, products in self._iter_concurrently(self.list_products, jobs, max_workers=max_workers):
+            masks = get_s1_product_masks(products, mission_id=mission_id, scan_mode=scan_mode,
+                                         product_type=product_type, resolution=resolution,
+                                         processing_level=processing_level, product_class=product_class,
+                                         polarisation_class=polarisation_class, date=job['date'],
+                                         relative_orbit=relative_orbits)
+
+            selection = np.ones(len(products), dtype=bool)
+            for _, mask in masks:
+                selection &= mask
+
+            yield job['date'], products[selection]
+
+    def get_data_file_keys_batch(self, collection: str, start_date, end_date, max_workers=MAX_WORKERS, **filters):
+        """ Collects the products of a date range into one table, see `iter_data_file_keys` for the filters.
+
+        :return: A table with one row per product holding the parsed product name and its key on the bucket, sorted
+            by the start time of the acquisitions
+        :rtype: pandas.DataFrame
+        """
+        products = [products for _, products in
+                    self.iter_data_file_keys(collection, start_date, end_date, max_workers=max_workers, **filters)]
+
+        key_table = pd.DataFrame.from_records(np.concatenate(products) if products else products)
+        if key_table.empty:
+            return pd.DataFrame(columns=list(parse_s1_product_names([]).dtype.names))
+
+        key_table['key'] = BUCKET + '/' + key_table['key']
+        return key_table.sort_values('start_time', ignore_index=True)
+
     @staticmethod
     def _is_in_relative_orbit(abs_orbit_nr: int, relative_orbit_nr: int, mission_id: str):
-
-        if mission_id == 'S1A':
-            def _in_orbit(abs_orbit_nr, relative_orbit_nr):
-                return relative_orbit_nr == (abs_orbit_nr - 73) % 175 + 1
-        elif mission_id == 'S1B':
-            def _in_orbit(abs_orbit_nr, relative_orbit_nr):
-                return relative_orbit_nr == (abs_orbit_nr - 27) % 175 + 1
-        else:
-            raise ValueError('The mission ID is restricted to either \'S1A\' or \'S1B\'.')
-
-        return _in_orbit(abs_orbit_nr, relative_orbit_nr)
+        return relative_orbit_nr == get_relative_orbit(abs_orbit_nr, mission_id)
 
     def download_grd_data(self, product_id: str, polarisation: str, target_directory='',
                           target_files_list=None):  # Polarisation vv, vh , hh oder hv, auch v und h für beide polarisierung
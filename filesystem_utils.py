@@ -8,18 +8,52 @@ Copyright (c) 2017-2020 Nejc Vesel, Jovan Višnjić, Anže Zupanc (Sinergise)
 This source code is licensed under the MIT license found in the LICENSE
 file in the root directory of this source tree.
 """
+import io
 import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from pathlib import Path, PurePath
 
 import fs
+from botocore.exceptions import ClientError
 from fs_s3fs import S3FS
 
 from sentinelhub import SHConfig
 
+FILESYSTEM_CACHE_SIZE = 32
+S3_BLOCK_SIZE = 2 ** 16
+S3_CACHE_BLOCKS = 256
+S3_READ_AHEAD = 16
+PREFETCH_DEPTH = 2
+
+# open filesystem objects by their root path, create flag, credentials and parameters, in the order of their last use
+_FILESYSTEMS = OrderedDict()
+_FILESYSTEMS_LOCK = threading.Lock()
+
+
+def _reset_filesystems():
+    """ Forgets the filesystem objects inherited by a forked process, their connections belong to the parent process
+    """
+    global _FILESYSTEMS_LOCK
+    _FILESYSTEMS_LOCK = threading.Lock()
+    _FILESYSTEMS.clear()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_filesystems)
+
 
 def get_filesystem(path, create=False, config=None, **kwargs):
     """ A utility function for initializing any type of filesystem object with PyFilesystem2 package
 
+    Filesystem objects are cached by their root path, credentials and parameters and are shared by all tasks and
+    threads of a process, so that e.g. a S3 filesystem sets up its connection only once. At most
+    `FILESYSTEM_CACHE_SIZE` filesystems are cached, the least recently used one is dropped from the cache when another
+    one is opened. A dropped filesystem is not closed, as it may still be in use, it is closed once it is garbage
+    collected. Users of a filesystem must not close it either, see `close_filesystems`.
+
     :param path: A filesystem path
     :type path: str
     :param create: If the filesystem path doesn't exist this flag indicates to either create it or raise an error
@@ -33,6 +67,42 @@ def get_filesystem(path, create=False, config=None, **kwargs):
     if isinstance(path, Path):
         path = str(path)
 
+    credentials = None
+    if path.startswith('s3://') and config is not None:
+        credentials = config.aws_access_key_id, config.aws_secret_access_key
+    key = path, create, credentials, tuple(sorted(kwargs.items()))
+
+    try:
+        hash(key)
+    except TypeError:
+        return _open_filesystem(path, create=create, config=config, **kwargs)
+
+    with _FILESYSTEMS_LOCK:
+        filesystem = _FILESYSTEMS.get(key)
+        if filesystem is not None and not filesystem.isclosed():
+            _FILESYSTEMS.move_to_end(key)
+            return filesystem
+
+        filesystem = _FILESYSTEMS[key] = _open_filesystem(path, create=create, config=config, **kwargs)
+        _FILESYSTEMS.move_to_end(key)
+        while len(_FILESYSTEMS) > FILESYSTEM_CACHE_SIZE:
+            _FILESYSTEMS.popitem(last=False)
+
+    return filesystem
+
+
+def close_filesystems():
+    """ Closes all cached filesystem objects, e.g. at the end of a script
+    """
+    with _FILESYSTEMS_LOCK:
+        while _FILESYSTEMS:
+            _, filesystem = _FILESYSTEMS.popitem()
+            filesystem.close()
+
+
+def _open_filesystem(path, create=False, config=None, **kwargs):
+    """ Initializes a new filesystem object
+    """
     if path.startswith('s3://'):
         return load_s3_filesystem(path, config=config, **kwargs)
 
@@ -100,3 +170,250 @@ def load_s3_filesystem(path, strict=False, config=None):
         aws_secret_access_key=config.aws_secret_access_key if config.aws_secret_access_key else None,
         strict=strict
     )
+
+
+class PrefetchingReader:
+    """ Iterates over the contents of files, while the content of a file is processed the following `depth` files are
+    already read into memory by background threads. This hides the latency of a filesystem behind the processing, at
+    most `depth` files besides the current one are held in memory.
+    """
+    def __init__(self, filesystem, paths, depth=PREFETCH_DEPTH):
+        """
+        :param filesystem: A filesystem object
+        :type filesystem: fs.FS
+        :param paths: Paths of files in the filesystem, in the order of reading
+        :type paths: list(str)
+        :param depth: A number of files read in advance
+        :type depth: int
+        """
+        if depth < 1:
+            raise ValueError(f'Prefetch depth has to be at least 1, got {depth}')
+
+        self.filesystem = filesystem
+        self.paths = paths
+        self.depth = depth
+
+    def __iter__(self):
+        """
+        :return: Pairs of a path and the content of its file
+        :rtype: Iterator((str, bytes))
+        """
+        paths = iter(self.paths)
+        executor = ThreadPoolExecutor(max_workers=self.depth)
+        pending = deque()
+        try:
+            for path in islice(paths, self.depth):
+                pending.append((path, executor.submit(self._read, path)))
+
+            while pending:
+                path, future = pending.popleft()
+                content = future.result()
+                for next_path in islice(paths, 1):
+                    pending.append((next_path, executor.submit(self._read, next_path)))
+
+                # the generator does not keep a reference, so the consumer can release the content while processing it
+                yield path, content.pop()
+        finally:
+            for _, future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _read(self, path):
+        """ Reads a file into a single-item list, from which the content can be taken over without leaving a
+        reference in the future
+        """
+        return [self.filesystem.readbytes(path)]
+
+
+def open_s3_file(filesystem, path, mode='rb', **kwargs):
+    """ Opens a file of a S3 filesystem for reading as a seekable file object which downloads only the parts of the
+    file that are read, unlike `S3FS.openbin` which downloads the entire file first. The signature allows to use it as
+    an opener of `rasterio.open`, e.g. `rasterio.open(path, opener=functools.partial(open_s3_file, filesystem))`.
+
+    :param filesystem: A S3 filesystem
+    :type filesystem: fs_s3fs.S3FS
+    :param path: A path of a file in the filesystem
+    :type path: str
+    :param mode: A reading mode, either 'r' or 'rb'
+    :type mode: str
+    :param kwargs: Parameters of the `S3BlockFile`, i.e. `block_size`, `cache_blocks` and `read_ahead`
+    :return: A binary file object
+    :rtype: S3BlockFile
+    """
+    if mode not in ('r', 'rb'):
+        raise ValueError(f'S3 files can only be opened for reading, got mode {mode}')
+
+    return S3BlockFile(filesystem.client, filesystem._bucket_name, filesystem._path_to_key(path), **kwargs)
+
+
+class S3BlockFile(io.RawIOBase):
+    """ A read-only, seekable file object of an object on S3. The object is read in blocks of `block_size` bytes which
+    are downloaded with byte range requests, so that e.g. windowed reads of a tiled GeoTIFF transfer only the headers
+    and the tiles they touch. The last `cache_blocks` blocks are kept in a LRU cache. When reading continues at the
+    end of the previous read, following blocks are downloaded with the same request. Their number doubles with each
+    such request up to `read_ahead` and is reset by a seek elsewhere.
+    """
+    def __init__(self, client, bucket_name, key, *, block_size=S3_BLOCK_SIZE, cache_blocks=S3_CACHE_BLOCKS,
+                 read_ahead=S3_READ_AHEAD):
+        """
+        :param client: A boto3 S3 client
+        :type client: botocore.client.S3
+        :param bucket_name: A name of the bucket
+        :type bucket_name: str
+        :param key: A key of the object in the bucket
+        :type key: str
+        :param block_size: A number of bytes downloaded and cached together
+        :type block_size: int
+        :param cache_blocks: A maximal number of cached blocks
+        :type cache_blocks: int
+        :param read_ahead: A maximal number of blocks downloaded in advance when the object is read sequentially
+        :type read_ahead: int
+        """
+        super().__init__()
+        if block_size < 1 or cache_blocks < 1 or read_ahead < 0:
+            raise ValueError('Parameters block_size and cache_blocks must be positive and read_ahead non-negative')
+
+        self.client = client
+        self.bucket_name = bucket_name
+        self.key = key
+        self.block_size = block_size
+        self.cache_blocks = cache_blocks
+        self.read_ahead = read_ahead
+
+        try:
+            self.size = client.head_object(Bucket=bucket_name, Key=key)['ContentLength']
+        except ClientError as exception:
+            if exception.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey'):
+                raise FileNotFoundError(f'No such object s3://{bucket_name}/{key}') from exception
+            raise
+
+        self.request_count = 0
+        self.fetched_bytes = 0
+
+        self._position = 0
+        self._next_block = 0
+        self._read_ahead_blocks = 0
+        self._blocks = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f'{self.__class__.__name__}(s3://{self.bucket_name}/{self.key})'
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+
+        if whence == io.SEEK_CUR:
+            offset += self._position
+        elif whence == io.SEEK_END:
+            offset += self.size
+        elif whence != io.SEEK_SET:
+            raise ValueError(f'Invalid whence {whence}')
+        if offset < 0:
+            raise ValueError(f'Negative seek position {offset}')
+
+        self._position = offset
+        return offset
+
+    def readinto(self, buffer):
+        """ Reads bytes at the current position into a buffer from the cached and newly downloaded blocks
+        """
+        if self.closed:
+            raise ValueError('I/O operation on closed file')
+
+        view = memoryview(buffer).cast('B')
+        start, stop = self._position, min(self._position + len(view), self.size)
+        if start >= stop:
+            return 0
+
+        first_block, last_block = start // self.block_size, (stop - 1) // self.block_size
+        blocks = self._get_blocks(first_block, last_block)
+
+        offset = 0
+        for index in range(first_block, last_block + 1):
+            block_start = index * self.block_size
+            chunk = blocks[index][max(start - block_start, 0):stop - block_start]
+            view[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+        self._position = stop
+        return offset
+
+    def readall(self):
+        """ Reads the rest of the object with a single request, bypassing the cache
+        """
+        if self._position >= self.size:
+            return b''
+
+        data = self._get_range(self._position, self.size)
+        self._position = self.size
+        return data
+
+    def close(self):
+        self._blocks.clear()
+        super().close()
+
+    def _get_blocks(self, first_block, last_block):
+        """ Collects the blocks of an index range from the cache and downloads the missing ones, each run of
+        consecutive missing blocks with a single request. Read-ahead extends the last run if the range continues the
+        previous read.
+        """
+        with self._lock:
+            blocks, missing = {}, []
+            for index in range(first_block, last_block + 1):
+                if index in self._blocks:
+                    self._blocks.move_to_end(index)
+                    blocks[index] = self._blocks[index]
+                else:
+                    missing.append(index)
+
+            runs = []
+            for index in missing:
+                if runs and runs[-1][1] == index - 1:
+                    runs[-1][1] = index
+                else:
+                    runs.append([index, index])
+
+            if self._next_block not in (first_block, first_block + 1):
+                self._read_ahead_blocks = 0
+            elif runs and runs[-1][1] == last_block:
+                self._read_ahead_blocks = min(max(2 * self._read_ahead_blocks, 1), self.read_ahead)
+                read_ahead_block = min(last_block + self._read_ahead_blocks, (self.size - 1) // self.block_size)
+                while runs[-1][1] < read_ahead_block and runs[-1][1] + 1 not in self._blocks:
+                    runs[-1][1] += 1
+            self._next_block = last_block + 1
+
+        for run_first, run_last in runs:
+            data = self._get_range(run_first * self.block_size, min((run_last + 1) * self.block_size, self.size))
+            for index in range(run_first, run_last + 1):
+                block_start = (index - run_first) * self.block_size
+                blocks.setdefault(index, data[block_start:block_start + self.block_size])
+
+        with self._lock:
+            for index in sorted(blocks):
+                if index not in self._blocks:
+                    self._blocks[index] = blocks[index]
+            while len(self._blocks) > self.cache_blocks:
+                self._blocks.popitem(last=False)
+
+        return blocks
+
+    def _get_range(self, start, stop):
+        """ Downloads the bytes from `start` up to `stop` with a byte range request
+        """
+        response = self.client.get_object(Bucket=self.bucket_name, Key=self.key, Range=f'bytes={start}-{stop - 1}')
+        data = response['Body'].read()
+
+        with self._lock:
+            self.request_count += 1
+            self.fetched_bytes += len(data)
+        return data
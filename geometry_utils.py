@@ -1,4 +1,3 @@
-from itertools import product
 """
 Module implementing geometry classes
 """
@@ -12,40 +11,237 @@ import shapely.wkt
 """
 Module implementing geometry classes
 """
+import threading
+import numpy as np
+
 from abc import ABC, abstractmethod
 from math import ceil
-from sentinelhub import CRS, transform_point
+from collections import OrderedDict
+from pyproj import Transformer
+from sentinelhub import CRS
 
 import shapely.geometry
 import shapely.ops
 import shapely.wkt
 
 
-def inside_counter_clockwise_edges(bound1, bound2, point):
-    if (bound2[0] - bound1[0]) * (point[1] - bound1[1]) - (point[0] - bound1[0]) * (bound2[1] - bound1[1]) < 0:
-        return False
+def point_in_bounding_box(coords: list, points: list):
+    """ Checks which points lie inside of a footprint polygon, e.g. the coordinates of a measurement frame of a
+    Sentinel product, see `points_in_polygon`
+
+    :param coords: Vertices of the polygon
+    :type coords: list((float, float))
+    :param points: Points to check
+    :type points: list((float, float)) or numpy.ndarray
+    :return: A flag per point
+    :rtype: numpy.ndarray
+    """
+    return points_in_polygon(points, coords)
+
+
+def points_in_polygon(points, polygon, convex=None):
+    """ Checks which of the points lie inside of a polygon, vectorized over the points. Convex polygons, like
+    footprints of scenes, are checked with the cross products of their edges and the points, with points on the
+    boundary counting as inside. Other polygons are checked by casting a ray from each point and counting the edges
+    it crosses, the holes of a shapely polygon are taken into account.
+
+    :param points: An array of shape (N, 2) with x and y coordinates of the points, or a single point
+    :type points: numpy.ndarray or list((float, float))
+    :param polygon: Vertices of the polygon in either orientation, the first vertex may be repeated at the end, or a
+        shapely polygon
+    :type polygon: numpy.ndarray or list((float, float)) or shapely.geometry.Polygon
+    :param convex: Whether the polygon is convex, by default it is determined from the vertices
+    :type convex: bool or None
+    :return: A boolean array of shape (N,)
+    :rtype: numpy.ndarray
+    """
+    points = np.asarray(points, dtype=np.float64)
+    if points.size == 0:
+        return np.zeros(0, dtype=bool)
+    if points.ndim == 1:
+        points = points[np.newaxis, :]
+
+    if isinstance(polygon, shapely.geometry.Polygon):
+        rings = [np.asarray(ring.coords, dtype=np.float64) for ring in (polygon.exterior, *polygon.interiors)]
+        if polygon.interiors:
+            convex = False
+    else:
+        rings = [np.asarray(polygon, dtype=np.float64)]
+    rings = [ring[:-1] if len(ring) > 1 and np.array_equal(ring[0], ring[-1]) else ring for ring in rings]
+
+    inside = np.zeros(len(points), dtype=bool)
+    if len(rings[0]) < 3:
+        return inside
+
+    # points outside of the bounding box of the polygon are not checked further
+    min_x, min_y = rings[0].min(axis=0)
+    max_x, max_y = rings[0].max(axis=0)
+    x_coords, y_coords = points[:, 0], points[:, 1]
+    candidates = (x_coords >= min_x) & (x_coords <= max_x) & (y_coords >= min_y) & (y_coords <= max_y)
+    if not candidates.all():
+        candidate_indices = np.flatnonzero(candidates)
+        x_coords, y_coords = x_coords[candidate_indices], y_coords[candidate_indices]
+
+    if convex is None:
+        convex = _is_convex(rings[0])
+
+    if convex:
+        result = _inside_convex_polygon(x_coords, y_coords, rings[0])
     else:
-        return True
+        result = np.zeros(len(x_coords), dtype=bool)
+        for ring in rings:
+            result ^= _crossed_edges_parity(x_coords, y_coords, ring)
 
+    if candidates.all():
+        return result
 
-def point_in_bounding_box(coords: list, points: list):
-    coords.append(coords[0])
-    inside = []
-    for i, point in product(range(len(coords)-1), points):
-        inside.append(inside_counter_clockwise_edges(coords[i], coords[i+1], point))
+    inside[candidate_indices] = result
+    return inside
+
+
+def _get_edges(ring):
+    """ Returns start and end vertices of the edges of a ring of vertices
+    """
+    return ring, np.roll(ring, -1, axis=0)
+
+
+def _is_convex(ring):
+    """ Checks whether a ring of vertices is a simple convex polygon, i.e. turns in one direction at each vertex and
+    winds around only once
+    """
+    starts, ends = _get_edges(ring)
+    edges = ends - starts
+    next_edges = np.roll(edges, -1, axis=0)
+    turns = edges[:, 0] * next_edges[:, 1] - edges[:, 1] * next_edges[:, 0]
+    if (turns > 0).any() and (turns < 0).any():
+        return False
+
+    turning_angles = np.arctan2(turns, (edges * next_edges).sum(axis=1))
+    return bool(np.isclose(np.abs(turning_angles.sum()), 2 * np.pi))
+
+
+def _inside_convex_polygon(x_coords, y_coords, ring):
+    """ Checks points against a convex polygon, a point is inside if it lies on the inner side of all edges
+    """
+    starts, ends = _get_edges(ring)
+    area_sign = np.sign(np.sum(starts[:, 0] * ends[:, 1] - ends[:, 0] * starts[:, 1]))
+
+    inside = np.ones(len(x_coords), dtype=bool)
+    for (start_x, start_y), (end_x, end_y) in zip(starts, ends):
+        cross = (end_x - start_x) * (y_coords - start_y) - (x_coords - start_x) * (end_y - start_y)
+        inside &= cross * area_sign >= 0
+    return inside
+
+
+def _crossed_edges_parity(x_coords, y_coords, ring):
+    """ Casts a ray from each point in the positive x direction and returns whether it crosses an odd number of edges
+    of the ring
+    """
+    parity = np.zeros(len(x_coords), dtype=bool)
+    for (start_x, start_y), (end_x, end_y) in zip(*_get_edges(ring)):
+        if start_y == end_y:
+            continue
+
+        spans = (start_y > y_coords) != (end_y > y_coords)
+        crossing_x = start_x + (y_coords - start_y) * ((end_x - start_x) / (end_y - start_y))
+        parity ^= spans & (x_coords < crossing_x)
+    return parity
+
+
+TRANSFORMER_CACHE_SIZE = 128
 
-    return all(item == True for item in inside)
+# transformers of each thread by their CRS and axis order, in the order of their last use
+_TRANSFORMERS = threading.local()
+
+
+def _get_crs_key(crs):
+    """ Converts a CRS given as a sentinelhub CRS, an EPSG code, a string or a pyproj/rasterio CRS object into a
+    hashable string which is understood by pyproj, e.g. 'EPSG:32632'
+    """
+    if isinstance(crs, CRS):
+        return crs.ogc_string()
+    if isinstance(crs, int) or (isinstance(crs, str) and crs.isdigit()):
+        return f'EPSG:{crs}'
+    if isinstance(crs, str):
+        return f'EPSG:{crs[5:]}' if crs.lower().startswith('epsg:') else crs
+    return crs.to_string()
+
+
+def _get_cached_transformer(crs_from, crs_to, always_xy):
+    """ Returns a transformer from the LRU cache of the current thread, a new one is created if it is not cached
+    """
+    cache = getattr(_TRANSFORMERS, 'cache', None)
+    if cache is None:
+        cache = _TRANSFORMERS.cache = OrderedDict()
+
+    key = crs_from, crs_to, always_xy
+    transformer = cache.get(key)
+    if transformer is not None:
+        cache.move_to_end(key)
+        return transformer
+
+    transformer = cache[key] = Transformer.from_crs(crs_from, crs_to, always_xy=always_xy)
+    if len(cache) > TRANSFORMER_CACHE_SIZE:
+        cache.popitem(last=False)
+    return transformer
+
+
+def get_transformer(crs_from, crs_to, always_xy=True):
+    """ Returns a transformer between two coordinate reference systems. Creating a transformer takes milliseconds, so
+    transformers are kept in an LRU cache per thread. A transformer is not shared between threads, each thread gets its
+    own one, and the cache of a thread is released together with the thread.
+
+    :param crs_from: Source CRS, as a sentinelhub CRS, an EPSG code, a string like 'epsg:4326' or a pyproj CRS
+    :type crs_from: CRS or int or str or pyproj.CRS
+    :param crs_to: Target CRS
+    :type crs_to: CRS or int or str or pyproj.CRS
+    :param always_xy: If `True` coordinates are in x, y (longitude, latitude) order, otherwise in the axis order of
+        the CRS definitions, e.g. latitude, longitude for WGS84
+    :type always_xy: bool
+    :return: A cached transformer
+    :rtype: pyproj.Transformer
+    """
+    return _get_cached_transformer(_get_crs_key(crs_from), _get_crs_key(crs_to), always_xy)
+
+
+def transform_points(x_coords, y_coords, crs_from, crs_to, always_xy=True):
+    """ Transforms arrays of coordinates from one CRS to another in a single call
+
+    :param x_coords: First coordinates of the points
+    :type x_coords: numpy.ndarray or list(float) or float
+    :param y_coords: Second coordinates of the points
+    :type y_coords: numpy.ndarray or list(float) or float
+    :param crs_from: Source CRS, see `get_transformer`
+    :param crs_to: Target CRS, see `get_transformer`
+    :param always_xy: Axis order of the coordinates, see `get_transformer`
+    :type always_xy: bool
+    :return: Transformed first and second coordinates
+    :rtype: (numpy.ndarray, numpy.ndarray)
+    """
+    x_coords, y_coords = np.asarray(x_coords, dtype=np.float64), np.asarray(y_coords, dtype=np.float64)
+    if _get_crs_key(crs_from) == _get_crs_key(crs_to):
+        return x_coords, y_coords
+
+    return get_transformer(crs_from, crs_to, always_xy=always_xy).transform(x_coords, y_coords)
+
+
+def _parse_crs(crs):
+    """ Parses a CRS, a given CRS object is returned as it is without going through the lookup of the CRS enum
+    """
+    return crs if isinstance(crs, CRS) else CRS(crs)
 
 
 class BaseGeometry(ABC):
     """ Base geometry class
     """
+    __slots__ = ('_crs',)
+
     def __init__(self, crs):
         """
         :param crs: Coordinate reference system of the geometry
         :type crs: constants.CRS
         """
-        self._crs = CRS(crs)
+        self._crs = _parse_crs(crs)
 
     @property
     def crs(self):
@@ -131,6 +327,8 @@ class BBox(BaseGeometry):
     - In case of ``constants.CRS.POP_WEB`` axis x represents easting and axis y represents northing
     - In case of ``constants.CRS.UTM_*`` axis x represents easting and axis y represents northing
     """
+    __slots__ = ('min_x', 'min_y', 'max_x', 'max_y')
+
     def __init__(self, bbox, crs):
         """
         :param bbox: A bbox in any valid representation
@@ -145,10 +343,19 @@ class BBox(BaseGeometry):
 
         super().__init__(crs)
 
+    @classmethod
+    def _from_bounds(cls, min_x, min_y, max_x, max_y, crs):
+        """ Creates a bounding box from ordered coordinates and a parsed CRS, skipping the parsing of the constructor
+        """
+        bbox = cls.__new__(cls)
+        bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y = min_x, min_y, max_x, max_y
+        bbox._crs = crs
+        return bbox
+
     def __iter__(self):
         """ This method enables iteration over coordinates of bounding box
         """
-        return iter(self.lower_left + self.upper_right)
+        return iter((self.min_x, self.min_y, self.max_x, self.max_y))
 
     def __repr__(self):
         """ Class representation
@@ -212,7 +419,7 @@ class BBox(BaseGeometry):
         :return: New BBox object with switched coordinates
         :rtype: BBox
         """
-        return BBox((self.min_y, self.min_x, self.max_y, self.max_x), crs=self.crs)
+        return BBox._from_bounds(self.min_y, self.min_x, self.max_y, self.max_x, self.crs)
 
     def transform(self, crs, always_xy=True):
         """ Transforms BBox from current CRS to target CRS
@@ -229,9 +436,10 @@ class BBox(BaseGeometry):
         :return: Bounding box in target CRS
         :rtype: BBox
         """
-        new_crs = CRS(crs)
-        return BBox((transform_point(self.lower_left, self.crs, new_crs, always_xy=always_xy),
-                     transform_point(self.upper_right, self.crs, new_crs, always_xy=always_xy)), crs=new_crs)
+        new_crs = _parse_crs(crs)
+        x_coords, y_coords = transform_points((self.min_x, self.max_x), (self.min_y, self.max_y), self.crs, new_crs,
+                                              always_xy=always_xy)
+        return BBox((x_coords[0], y_coords[0], x_coords[1], y_coords[1]), crs=new_crs)
 
     def transform_bounds(self, crs, always_xy=True):
         """ Alternative way to transform BBox from current CRS to target CRS.
@@ -319,9 +527,9 @@ class BBox(BaseGeometry):
         else:
             raise ValueError('Not supported partition. Either (num_x, num_y) or (size_x, size_y) must be specified')
 
-        return [[BBox([self.min_x + i * size_x, self.min_y + j * size_y,
-                       self.min_x + (i + 1) * size_x, self.min_y + (j + 1) * size_y],
-                      crs=self.crs) for j in range(num_y)] for i in range(num_x)]
+        return [[BBox._from_bounds(self.min_x + i * size_x, self.min_y + j * size_y,
+                                   self.min_x + (i + 1) * size_x, self.min_y + (j + 1) * size_y, self.crs)
+                 for j in range(num_y)] for i in range(num_x)]
 
     def get_transform_vector(self, resx, resy):
         """ Given resolution it returns a transformation vector
@@ -422,6 +630,8 @@ class Geometry(BaseGeometry):
     - A GeoJSON dictionary with (multi)polygon coordinates
     - A WKT string with (multi)polygon coordinates
     """
+    __slots__ = ('_geometry',)
+
     def __init__(self, geometry, crs):
         """
         :param geometry: A polygon or multipolygon in any valid representation
@@ -469,12 +679,12 @@ class Geometry(BaseGeometry):
         :return: Geometry in target CRS
         :rtype: Geometry
         """
-        new_crs = CRS(crs)
+        new_crs = _parse_crs(crs)
 
         geometry = self.geometry
         if new_crs is not self.crs:
-            transform_function = self.crs.get_transform_function(new_crs, always_xy=always_xy)
-            geometry = shapely.ops.transform(transform_function, geometry)
+            transformer = get_transformer(self.crs, new_crs, always_xy=always_xy)
+            geometry = shapely.ops.transform(transformer.transform, geometry)
 
         return Geometry(geometry, crs=new_crs)
 
@@ -538,16 +748,65 @@ class Geometry(BaseGeometry):
 
 
 class BBoxCollection(BaseGeometry):
-    """ A collection of bounding boxes
+    """ A collection of bounding boxes in the same CRS
+
+    The collection is backed by an array of shape (N, 4) with coordinates `min_x, min_y, max_x, max_y` of the
+    bounding boxes, on which its operations are vectorized. The list of `BBox` objects and the multipolygon geometry
+    are only created when they are requested.
     """
+    __slots__ = ('_bounds', '_bbox_list', '_geometry')
+
     def __init__(self, bbox_list):
         """
         :param bbox_list: A list of BBox objects which have to be in the same CRS
-        :type bbox_list: list(BBox)
+        :type bbox_list: list(BBox) or BBoxCollection
         """
-        self._bbox_list, crs = self._parse_bbox_list(bbox_list)
-        self._geometry = self._get_geometry()
+        if isinstance(bbox_list, BBoxCollection):
+            self._set(bbox_list._bounds, bbox_list.crs, bbox_list._bbox_list)
+            return
+
+        if not isinstance(bbox_list, list) or not bbox_list:
+            raise ValueError('Expected non-empty list of BBox objects')
 
+        crs = None
+        for bbox in bbox_list:
+            if not isinstance(bbox, BBox):
+                raise ValueError(f'Elements in the list should be of type {BBox.__name__}, got {type(bbox)}')
+            if crs is None:
+                crs = bbox.crs
+            elif bbox.crs is not crs:
+                raise ValueError('All bounding boxes should have the same CRS')
+
+        bounds = np.array([(bbox.min_x, bbox.min_y, bbox.max_x, bbox.max_y) for bbox in bbox_list], dtype=np.float64)
+        self._set(bounds, crs, bbox_list)
+
+    @classmethod
+    def from_bounds(cls, bounds, crs):
+        """ Creates a collection from an array of bounding box coordinates without creating BBox objects
+
+        :param bounds: An array of shape (N, 4) with coordinates `min_x, min_y, max_x, max_y` of the bounding boxes
+        :type bounds: numpy.ndarray or list(list(float))
+        :param crs: Coordinate reference system of the bounding boxes
+        :type crs: constants.CRS
+        :return: A collection of bounding boxes
+        :rtype: BBoxCollection
+        """
+        bounds = np.array(bounds, dtype=np.float64)
+        if bounds.ndim != 2 or bounds.shape[1] != 4 or not len(bounds):
+            raise ValueError(f'Expected a non-empty array of shape (N, 4), got shape {bounds.shape}')
+
+        collection = cls.__new__(cls)
+        collection._set(np.hstack([np.minimum(bounds[:, :2], bounds[:, 2:]), np.maximum(bounds[:, :2], bounds[:, 2:])]),
+                        crs)
+        return collection
+
+    def _set(self, bounds, crs, bbox_list=None):
+        """ Initializes the collection from an array of ordered coordinates
+        """
+        bounds.setflags(write=False)
+        self._bounds = bounds
+        self._bbox_list = bbox_list
+        self._geometry = None
         super().__init__(crs)
 
     def __repr__(self):
@@ -561,14 +820,27 @@ class BBoxCollection(BaseGeometry):
         """
         if not isinstance(other, BBoxCollection):
             return False
-        return self.crs is other.crs and len(self.bbox_list) == len(other.bbox_list) and \
-            all(bbox == other_bbox for bbox, other_bbox in zip(self, other))
+        return self.crs is other.crs and np.array_equal(self._bounds, other._bounds)
 
     def __iter__(self):
         """ This method enables iteration over bounding boxes in collection
         """
         return iter(self.bbox_list)
 
+    def __len__(self):
+        """ Returns the number of bounding boxes in collection
+        """
+        return len(self._bounds)
+
+    @property
+    def bounds(self):
+        """ Returns a read-only array of coordinates of the bounding boxes
+
+        :return: An array of shape (N, 4) with coordinates `min_x, min_y, max_x, max_y`
+        :rtype: numpy.ndarray
+        """
+        return self._bounds
+
     @property
     def bbox_list(self):
         """ Returns the list of bounding boxes from collection
@@ -576,6 +848,8 @@ class BBoxCollection(BaseGeometry):
         :return: The list of bounding boxes
         :rtype: list(BBox)
         """
+        if self._bbox_list is None:
+            self._bbox_list = [BBox._from_bounds(*bounds, self.crs) for bounds in self._bounds.tolist()]
         return self._bbox_list
 
     @property
@@ -585,6 +859,8 @@ class BBoxCollection(BaseGeometry):
         :return: A multipolygon of bounding boxes
         :rtype: shapely.geometry.MultiPolygon
         """
+        if self._geometry is None:
+            self._geometry = self._get_geometry()
         return self._geometry
 
     @property
@@ -594,7 +870,77 @@ class BBoxCollection(BaseGeometry):
         :return: A bounding box, with same CRS
         :rtype: BBox
         """
-        return BBox(self.geometry, self.crs)
+        return BBox._from_bounds(*self._bounds[:, :2].min(axis=0).tolist(), *self._bounds[:, 2:].max(axis=0).tolist(),
+                                 self.crs)
+
+    @property
+    def area(self):
+        """ Returns areas of the bounding boxes
+
+        :return: An array of areas in units of the CRS
+        :rtype: numpy.ndarray
+        """
+        return (self._bounds[:, 2] - self._bounds[:, 0]) * (self._bounds[:, 3] - self._bounds[:, 1])
+
+    def intersects(self, other):
+        """ Checks which bounding boxes intersect a bounding box or, pairwise, the bounding boxes of another
+        collection of the same length. Touching bounding boxes do not intersect.
+
+        :param other: A bounding box or a collection in the same CRS
+        :type other: BBox or BBoxCollection
+        :return: A flag per bounding box
+        :rtype: numpy.ndarray
+        """
+        other_bounds = self._get_other_bounds(other)
+        return (np.maximum(self._bounds[:, :2], other_bounds[:, :2]) <
+                np.minimum(self._bounds[:, 2:], other_bounds[:, 2:])).all(axis=1)
+
+    def intersection(self, other):
+        """ Intersects the bounding boxes with a bounding box or, pairwise, with the bounding boxes of another
+        collection of the same length. The intersections stay aligned with the bounding boxes of the collection, those
+        of bounding boxes without an intersection, see `intersects`, are NaN. A collection of the intersections is
+        given by `BBoxCollection.from_bounds(bounds[intersects], crs)` if any of them intersects.
+
+        :param other: A bounding box or a collection in the same CRS
+        :type other: BBox or BBoxCollection
+        :return: An array of shape (N, 4) with coordinates `min_x, min_y, max_x, max_y` of the intersections and a flag
+            per bounding box whether it intersects
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        other_bounds = self._get_other_bounds(other)
+        bounds = np.hstack([np.maximum(self._bounds[:, :2], other_bounds[:, :2]),
+                            np.minimum(self._bounds[:, 2:], other_bounds[:, 2:])])
+        intersects = (bounds[:, :2] < bounds[:, 2:]).all(axis=1)
+        bounds[~intersects] = np.nan
+        return bounds, intersects
+
+    def union(self, other):
+        """ Joins the bounding boxes with a bounding box or, pairwise, with the bounding boxes of another collection of
+        the same length into the smallest bounding boxes covering both. The union of all bounding boxes of the
+        collection is given by `bbox`.
+
+        :param other: A bounding box or a collection in the same CRS
+        :type other: BBox or BBoxCollection
+        :return: A collection of unions
+        :rtype: BBoxCollection
+        """
+        other_bounds = self._get_other_bounds(other)
+        return BBoxCollection.from_bounds(np.hstack([np.minimum(self._bounds[:, :2], other_bounds[:, :2]),
+                                                     np.maximum(self._bounds[:, 2:], other_bounds[:, 2:])]), self.crs)
+
+    def buffer(self, buffer):
+        """ Changes dimensions of all bounding boxes by a percentage of their size, see `BBox.buffer`
+
+        :param buffer: A percentage of BBox size change
+        :type buffer: float
+        :return: A collection of buffered bounding boxes
+        :rtype: BBoxCollection
+        """
+        if buffer < -1:
+            raise ValueError('Cannot reduce the bounding box to nothing, buffer must be >= -1.0')
+        middle = (self._bounds[:, :2] + self._bounds[:, 2:]) / 2
+        half_size = (self._bounds[:, 2:] - self._bounds[:, :2]) / 2 * (1 + buffer)
+        return BBoxCollection.from_bounds(np.hstack([middle - half_size, middle + half_size]), self.crs)
 
     def reverse(self):
         """ Returns a new BBoxCollection object where all x and y coordinates are switched
@@ -602,10 +948,11 @@ class BBoxCollection(BaseGeometry):
         :return: New Geometry object with switched coordinates
         :rtype: BBoxCollection
         """
-        return BBoxCollection([bbox.reverse() for bbox in self.bbox_list])
+        return BBoxCollection.from_bounds(self._bounds[:, [1, 0, 3, 2]], self.crs)
 
     def transform(self, crs, always_xy=True):
-        """ Transforms BBoxCollection from current CRS to target CRS
+        """ Transforms BBoxCollection from current CRS to target CRS. Like `BBox.transform` it transforms the lower
+        left and upper right corners of the bounding boxes, all of them in a single call.
 
         :param crs: target CRS
         :type crs: constants.CRS
@@ -615,30 +962,36 @@ class BBoxCollection(BaseGeometry):
         :return: BBoxCollection in target CRS
         :rtype: BBoxCollection
         """
-        return BBoxCollection([bbox.transform(crs, always_xy=always_xy) for bbox in self.bbox_list])
+        new_crs = _parse_crs(crs)
+        x_coords, y_coords = transform_points(self._bounds[:, [0, 2]], self._bounds[:, [1, 3]], self.crs, new_crs,
+                                              always_xy=always_xy)
+        return BBoxCollection.from_bounds(np.stack([x_coords[:, 0], y_coords[:, 0], x_coords[:, 1], y_coords[:, 1]],
+                                                   axis=1), new_crs)
+
+    def _get_other_bounds(self, other):
+        """ Returns coordinates of a bounding box or a collection which can be broadcast against the collection
+        """
+        if isinstance(other, BBox):
+            other_bounds = np.array([tuple(other)], dtype=np.float64)
+        elif isinstance(other, BBoxCollection):
+            if len(other) != len(self):
+                raise ValueError(f'Collections have different lengths {len(self)} and {len(other)}')
+            other_bounds = other.bounds
+        else:
+            raise TypeError(f'Expected a {BBox.__name__} or a {BBoxCollection.__name__}, got {type(other)}')
 
-    def _get_geometry(self):
-        """ Creates a multipolygon of bounding box polygons
-        """
-        return shapely.geometry.MultiPolygon([bbox.geometry for bbox in self.bbox_list])
+        if other.crs is not self.crs:
+            raise ValueError('Bounding boxes should have the same CRS')
+        return other_bounds
 
-    @staticmethod
-    def _parse_bbox_list(bbox_list):
-        """ Helper method for parsing a list of bounding boxes
+    def _get_geometry(self):
+        """ Creates a multipolygon of bounding box polygons, with the vertices in the order of `BBox.get_polygon`
         """
-        if isinstance(bbox_list, BBoxCollection):
-            return bbox_list.bbox_list, bbox_list.crs
-
-        if not isinstance(bbox_list, list) or not bbox_list:
-            raise ValueError('Expected non-empty list of BBox objects')
-
-        for bbox in bbox_list:
-            if not isinstance(bbox, BBox):
-                raise ValueError(f'Elements in the list should be of type {BBox.__name__}, got {type(bbox)}')
-
-        crs = bbox_list[0].crs
-        for bbox in bbox_list:
-            if bbox.crs is not crs:
-                raise ValueError('All bounding boxes should have the same CRS')
+        min_x, min_y, max_x, max_y = self._bounds.T
+        polygons = np.stack([np.stack([min_x, min_y], axis=1), np.stack([min_x, max_y], axis=1),
+                             np.stack([max_x, max_y], axis=1), np.stack([max_x, min_y], axis=1),
+                             np.stack([min_x, min_y], axis=1)], axis=1)
 
-        return bbox_list, crs
+        if hasattr(shapely, 'polygons'):  # vectorized creation since shapely 2.0
+            return shapely.multipolygons(shapely.polygons(polygons))
+        return shapely.geometry.MultiPolygon([shapely.geometry.Polygon(polygon) for polygon in polygons])
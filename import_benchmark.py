@@ -0,0 +1,123 @@
+"""
+A benchmark measuring the peak memory of importing a multi-band tiff image with the import tasks, relative to the size
+of the imported feature. An import which reads the bands straight into the final layout and data type stays close to
+a single copy of the output. The time stack of `ImportTimeFeatureFromTiffTask` additionally holds spare capacity and
+is copied whenever its buffer is doubled.
+
+On Windows, which has no `resource` module, the memory is measured with psutil.
+"""
+import os
+import sys
+import time
+import shutil
+import tempfile
+import datetime as dt
+import numpy as np
+import rasterio
+
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from rasterio.transform import from_origin
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+    import psutil
+
+# Benchmark Settings
+image_size = 2048  # pixels of 10 m
+bands = 13
+times = 3
+configurations = {
+    'timeless uint16': ('timeless', None),
+    'timeless float32': ('timeless', np.float32),
+    'time uint16': ('time', None),
+    'time float32': ('time', np.float32),
+}
+
+
+def create_image(folder, seed=42):
+    """ Writes a tiled uint16 tiff image with the bands of `times` time frames, like a stack of S2 L1C digital numbers
+    """
+    rng = np.random.default_rng(seed)
+    path = os.path.join(folder, 'image.tif')
+    with rasterio.open(path, 'w', driver='GTiff', width=image_size, height=image_size, count=times * bands,
+                       dtype='uint16', crs='EPSG:32632', transform=from_origin(500000, 5500000, 10, 10), tiled=True,
+                       blockxsize=512, blockysize=512) as dst:
+        for band in range(1, times * bands + 1):
+            dst.write(rng.integers(0, 10000, (image_size, image_size), dtype=np.uint16), band)
+    return path
+
+
+def get_peak_rss():
+    """ Returns the peak resident set size of the current process in bytes, on Windows the peak working set
+    """
+    if resource is None:
+        return psutil.Process().memory_info().peak_wset
+
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def get_rss():
+    """ Returns the current resident set size of the current process in bytes, where it is not available the peak one
+    """
+    if resource is None:
+        return psutil.Process().memory_info().rss
+
+    try:
+        with open('/proc/self/statm') as file_handle:
+            return int(file_handle.read().split()[1]) * resource.getpagesize()
+    except OSError:
+        return get_peak_rss()
+
+
+def run_import(path, kind, image_dtype):
+    """ Imports the image in a fresh process and returns the import time, the size of the imported feature and the
+    increase of the peak resident set size during the import
+    """
+    from eolearn.core import FeatureType
+    from EOPatch_IO import ImportFromTiffTask, ImportTimeFeatureFromTiffTask
+
+    folder, filename = os.path.split(path)
+    if kind == 'time':
+        task = ImportTimeFeatureFromTiffTask('BANDS', folder, image_dtype=image_dtype)
+        time_stamps = [dt.datetime(2021, 4, 1) + dt.timedelta(days=5 * index) for index in range(times)]
+        arguments = filename, time_stamps
+        feature = FeatureType.DATA, 'BANDS'
+    else:
+        task = ImportFromTiffTask((FeatureType.DATA_TIMELESS, 'BANDS'), path, image_dtype=image_dtype)
+        arguments = ()
+        feature = FeatureType.DATA_TIMELESS, 'BANDS'
+
+    base_rss = get_rss()
+    start_time = time.perf_counter()
+    eopatch = task.execute(*arguments)
+    import_time = time.perf_counter() - start_time
+
+    return import_time, eopatch[feature].nbytes, get_peak_rss() - base_rss
+
+
+def run_benchmark(path):
+    """ Runs each configuration in its own process and returns rows of (name, time, feature size, peak RSS increase)
+    """
+    rows = []
+    for name, (kind, image_dtype) in configurations.items():
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as executor:
+            rows.append((name, *executor.submit(run_import, path, kind, image_dtype).result()))
+    return rows
+
+
+if __name__ == '__main__':
+    benchmark_folder = tempfile.mkdtemp()
+    try:
+        image_path = create_image(benchmark_folder)
+        print(f'Image of {image_size}x{image_size} pixels with {times} x {bands} uint16 bands')
+
+        print(f'{"configuration":<20}{"import [s]":>12}{"feature [MiB]":>15}{"peak RSS [MiB]":>16}{"ratio":>8}')
+        for name, import_time, size, peak_rss in run_benchmark(image_path):
+            print(f'{name:<20}{import_time:>12.2f}{size / 2 ** 20:>15.1f}{peak_rss / 2 ** 20:>16.1f}'
+                  f'{peak_rss / size:>8.2f}')
+    finally:
+        shutil.rmtree(benchmark_folder)
@@ -0,0 +1,445 @@
+"""
+A module implementing utilities for running the stages of a workflow (search, download, import, save) concurrently and
+for running chains of tasks over many EOPatches in parallel processes
+"""
+import os
+import json
+import time
+import queue
+import logging
+import threading
+
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+LOGGER = logging.getLogger(__name__)
+
+_STOP = object()
+_POLL_INTERVAL = 0.1
+
+
+class PipelineStage:
+    """ A single stage of a pipeline, e.g. downloading products or importing them into EOPatches
+    """
+    def __init__(self, name, function, workers=1, fan_out=False):
+        """
+        :param name: Name of the stage which is used in the statistics
+        :type name: str
+        :param function: A function which is applied to each item of the stage and returns the item for the next stage
+        :type function: callable
+        :param workers: Number of worker threads of the stage
+        :type workers: int
+        :param fan_out: If `True` the function is expected to return an iterable and each of its elements is passed on
+            to the next stage as a separate item, e.g. a search returning many products
+        :type fan_out: bool
+        """
+        if workers < 1:
+            raise ValueError(f'A pipeline stage needs at least one worker, got {workers}')
+
+        self.name = name
+        self.function = function
+        self.workers = workers
+        self.fan_out = fan_out
+
+
+class _StageStats:
+    """ Thread-safe counters of a single pipeline stage
+    """
+    def __init__(self, workers):
+        self.workers = workers
+        self.items_in = 0
+        self.items_out = 0
+        self.busy_time = 0.
+        self.idle_time = 0.
+        self.blocked_time = 0.
+        self._lock = threading.Lock()
+
+    def add(self, **values):
+        with self._lock:
+            for name, value in values.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def to_dict(self, wall_time):
+        return {
+            'workers': self.workers,
+            'items_in': self.items_in,
+            'items_out': self.items_out,
+            'busy_time': self.busy_time,
+            'idle_time': self.idle_time,
+            'blocked_time': self.blocked_time,
+            'utilisation': self.busy_time / (self.workers * wall_time) if wall_time else 0.
+        }
+
+
+class Pipeline:
+    """ Runs a sequence of stages in an overlapped way. Every stage has its own pool of worker threads and stages are
+    connected with bounded queues. A stage which is faster than its successor blocks as soon as the queue in between
+    is full, therefore the throughput of the pipeline is limited by its slowest stage and not by the sum of all stages.
+
+    Example of a workflow where the network is used while previously downloaded scenes are being imported:
+
+        pipeline = Pipeline([PipelineStage('search', search_keys, fan_out=True),
+                             PipelineStage('download', download_scene, workers=4),
+                             PipelineStage('import', import_scene, workers=2),
+                             PipelineStage('save', save_eopatch)], queue_size=4)
+        eopatches = pipeline.run(dates)
+        print(pipeline.get_report())
+    """
+    def __init__(self, stages, queue_size=4):
+        """
+        :param stages: Stages of the pipeline in the order of execution
+        :type stages: list(PipelineStage)
+        :param queue_size: Maximum number of items waiting in front of each stage
+        :type queue_size: int
+        """
+        if not stages:
+            raise ValueError('A pipeline needs at least one stage')
+
+        self.stages = stages
+        self.queue_size = queue_size
+        self.wall_time = 0.
+        self._stats = {}
+
+    def run(self, items):
+        """ Feeds the given items through all stages of the pipeline
+
+        :param items: Input items of the first stage
+        :type items: iterable
+        :return: Outputs of the last stage in the order of their completion
+        :rtype: list
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        self._stats = {stage.name: _StageStats(stage.workers) for stage in self.stages}
+        abort = threading.Event()
+        errors = []
+        results = []
+        active_workers = [stage.workers for stage in self.stages]
+        counter_lock = threading.Lock()
+
+        def put(stage_index, item):
+            """ Puts an item into the input queue of a stage, returns `False` if the pipeline has been aborted
+            """
+            if stage_index == len(self.stages):
+                results.append(item)
+                return True
+
+            while not abort.is_set():
+                try:
+                    queues[stage_index].put(item, timeout=_POLL_INTERVAL)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def stop_stage(stage_index):
+            """ Signals all workers of a stage that no more items will come
+            """
+            if stage_index < len(self.stages):
+                for _ in range(self.stages[stage_index].workers):
+                    put(stage_index, _STOP)
+
+        def feed():
+            try:
+                for item in items:
+                    if not put(0, item):
+                        return
+            except Exception as exception:
+                errors.append(exception)
+                abort.set()
+            stop_stage(0)
+
+        def work(stage_index):
+            stage = self.stages[stage_index]
+            stats = self._stats[stage.name]
+
+            while True:
+                start_time = time.perf_counter()
+                try:
+                    item = queues[stage_index].get(timeout=_POLL_INTERVAL)
+                except queue.Empty:
+                    stats.add(idle_time=time.perf_counter() - start_time)
+                    if abort.is_set():
+                        break
+                    continue
+                stats.add(idle_time=time.perf_counter() - start_time)
+
+                if item is _STOP:
+                    break
+                if abort.is_set():
+                    continue
+
+                start_time = time.perf_counter()
+                try:
+                    output = stage.function(item)
+                    outputs = list(output) if stage.fan_out else [output]
+                except Exception as exception:
+                    LOGGER.error('Stage %s failed on item %s: %s', stage.name, item, exception)
+                    errors.append(exception)
+                    abort.set()
+                    continue
+                stats.add(items_in=1, busy_time=time.perf_counter() - start_time)
+
+                start_time = time.perf_counter()
+                for output in outputs:
+                    if not put(stage_index + 1, output):
+                        break
+                    stats.add(items_out=1)
+                stats.add(blocked_time=time.perf_counter() - start_time)
+
+            with counter_lock:
+                active_workers[stage_index] -= 1
+                is_last_worker = active_workers[stage_index] == 0
+
+            if is_last_worker:
+                stop_stage(stage_index + 1)
+
+        threads = [threading.Thread(target=feed, name='pipeline-feed', daemon=True)]
+        for stage_index, stage in enumerate(self.stages):
+            threads.extend(threading.Thread(target=work, args=(stage_index,), name=f'pipeline-{stage.name}-{worker}',
+                                            daemon=True) for worker in range(stage.workers))
+
+        start_time = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.wall_time = time.perf_counter() - start_time
+
+        if errors:
+            raise errors[0]
+
+        return results
+
+    def get_stats(self):
+        """ Returns statistics of the last run for each stage. The utilisation of a stage is the share of time its
+        workers spent processing items, the stage with the highest utilisation is the bottleneck of the pipeline.
+
+        :return: A dictionary of statistics per stage name
+        :rtype: dict
+        """
+        return {name: stats.to_dict(self.wall_time) for name, stats in self._stats.items()}
+
+    def get_report(self):
+        """ Returns a human readable summary of the statistics of the last run
+
+        :return: A table with one line per stage
+        :rtype: str
+        """
+        lines = [f'Pipeline finished in {self.wall_time:.2f}s',
+                 f'{"stage":<16}{"workers":>8}{"items":>8}{"busy [s]":>10}{"blocked [s]":>13}{"utilisation":>13}']
+        for name, stats in self.get_stats().items():
+            lines.append(f'{name:<16}{stats["workers"]:>8}{stats["items_in"]:>8}{stats["busy_time"]:>10.2f}'
+                         f'{stats["blocked_time"]:>13.2f}{stats["utilisation"]:>13.1%}')
+
+        return '\n'.join(lines)
+
+
+_WORKER_TASKS = []
+
+
+def _init_batch_worker(tasks):
+    """ Stores the task chain in a worker process once, so that it is not sent again with every patch
+    """
+    global _WORKER_TASKS
+    _WORKER_TASKS = tasks
+
+
+def _run_batch_patch(patch_name, bbox, retries, retry_delay, retry_on):
+    """ Runs the task chain of a worker process on a new EOPatch with the given bounding box. Transient failures are
+    retried with an exponentially growing delay.
+
+    :return: Status, number of attempts, time of each task and error of the patch
+    :rtype: dict
+    """
+    from eolearn.core import EOPatch  # only batches of EOPatches require eo-learn, pipelines of stages do not
+
+    attempts = 0
+    while True:
+        attempts += 1
+        task_times = []
+        start_time = time.perf_counter()
+        try:
+            eopatch = EOPatch(bbox=bbox)
+            for task, kwargs in _WORKER_TASKS:
+                kwargs = kwargs(patch_name, bbox) if callable(kwargs) else kwargs
+                task_start_time = time.perf_counter()
+                eopatch = task.execute(eopatch=eopatch, **kwargs)
+                task_times.append(time.perf_counter() - task_start_time)
+
+            return {'status': 'done', 'attempts': attempts, 'task_times': task_times,
+                    'total_time': time.perf_counter() - start_time, 'error': None}
+        except retry_on as exception:
+            if attempts > retries:
+                error = exception
+            else:
+                delay = retry_delay * 2 ** (attempts - 1)
+                LOGGER.warning('Patch %s failed in attempt %d, retrying in %.1fs: %s', patch_name, attempts, delay,
+                               exception)
+                time.sleep(delay)
+                continue
+        except Exception as exception:
+            error = exception
+
+        LOGGER.error('Patch %s failed after %d attempts: %s', patch_name, attempts, error)
+        return {'status': 'failed', 'attempts': attempts, 'task_times': task_times,
+                'total_time': time.perf_counter() - start_time, 'error': repr(error)}
+
+
+class BatchExecutor:
+    """ Runs a chain of tasks for each bounding box of an area split into tiles in a pool of processes. Each chain
+    starts with a new EOPatch with the bounding box of its tile and every task gets the EOPatch returned by the
+    previous one, e.g. an import followed by a save:
+
+        executor = BatchExecutor([(ImportFromTiffTask((FeatureType.DATA, 'S2'), 'D:/S2/mosaic.tif'), {}),
+                                  (SaveTask('D:/eopatches', overwrite_permission=1), get_save_kwargs)],
+                                 done_folder='D:/eopatches/.done', max_workers=8)
+        executor.run(bbox_splitter.get_bbox_list())
+        print(executor.get_report())
+
+    The keyword arguments of a task are either a dictionary or a function of the patch name and the bounding box which
+    returns a dictionary, e.g. `{'eopatch_folder': patch_name}` for a `SaveTask`. Such functions have to be defined at
+    the module level, so that they can be sent to worker processes. Tasks with filesystem objects can't be sent either.
+
+    A patch is done when its chain succeeds, which is recorded by a marker file in `done_folder`. Patches with markers
+    are skipped, therefore a run which has been interrupted continues where it stopped when it is started again.
+    Failures of the types given in `retry_on`, e.g. network or file access errors, are retried, other failures and
+    patches which fail in all attempts are reported without stopping other patches.
+    """
+    def __init__(self, tasks, done_folder, max_workers=None, retries=2, retry_delay=1., retry_on=(OSError,)):
+        """
+        :param tasks: Tasks of the chain in the order of execution, each with its keyword arguments
+        :type tasks: list((EOTask, dict or callable))
+        :param done_folder: A local folder in which marker files of done patches are stored
+        :type done_folder: str
+        :param max_workers: Number of worker processes, by default the number of CPUs
+        :type max_workers: int or None
+        :param retries: Number of retries of a patch after a transient failure
+        :type retries: int
+        :param retry_delay: Delay in seconds before the first retry, it doubles with each further retry
+        :type retry_delay: float
+        :param retry_on: Types of exceptions of transient failures
+        :type retry_on: tuple(type)
+        """
+        if not tasks:
+            raise ValueError('A batch executor needs at least one task')
+
+        self.tasks = [(task, kwargs or {}) for task, kwargs in tasks]
+        self.done_folder = done_folder
+        self.max_workers = max_workers or os.cpu_count()
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.retry_on = tuple(retry_on)
+        self.task_names = self._get_task_names(self.tasks)
+        self.wall_time = 0.
+        self.results = {}
+
+    @staticmethod
+    def _get_task_names(tasks):
+        """ Names tasks by their classes, tasks of the same class are numbered
+        """
+        class_names = [task.__class__.__name__ for task, _ in tasks]
+        return [f'{name}_{class_names[:index].count(name) + 1}' if class_names.count(name) > 1 else name
+                for index, name in enumerate(class_names)]
+
+    def run(self, bbox_list, patch_names=None):
+        """ Runs the task chain for all patches which are not done yet
+
+        :param bbox_list: Bounding boxes of the patches, e.g. the tiles of a `BBoxSplitter`
+        :type bbox_list: list(BBox)
+        :param patch_names: Unique names of the patches which are used for marker files and in the report, by default
+            `eopatch_<index>`
+        :type patch_names: list(str) or None
+        :return: Results of the patches of this run by their names, skipped patches have the status 'skipped'
+        :rtype: dict(str, dict)
+        """
+        if patch_names is None:
+            patch_names = [f'eopatch_{index}' for index in range(len(bbox_list))]
+        if len(patch_names) != len(bbox_list) or len(set(patch_names)) != len(patch_names):
+            raise ValueError('Each bounding box needs its own unique patch name')
+
+        os.makedirs(self.done_folder, exist_ok=True)
+        self.results = {name: {'status': 'skipped'} for name in patch_names if os.path.exists(self._get_marker(name))}
+        pending = [(name, bbox) for name, bbox in zip(patch_names, bbox_list) if name not in self.results]
+        LOGGER.info('Running %d patches, %d are already done', len(pending), len(self.results))
+
+        start_time = time.perf_counter()
+        if pending:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pending)), initializer=_init_batch_worker,
+                                     initargs=(self.tasks,)) as executor:
+                futures = {executor.submit(_run_batch_patch, name, bbox, self.retries, self.retry_delay,
+                                           self.retry_on): name for name, bbox in pending}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    try:
+                        result = future.result()
+                    except Exception as exception:  # e.g. a worker process died or a task could not be pickled
+                        result = {'status': 'failed', 'attempts': 1, 'task_times': [], 'total_time': 0.,
+                                  'error': repr(exception)}
+
+                    self.results[name] = result
+                    if result['status'] == 'done':
+                        self._write_marker(name, result)
+        self.wall_time = time.perf_counter() - start_time
+
+        return {name: self.results[name] for name in patch_names}
+
+    def _get_marker(self, patch_name):
+        return os.path.join(self.done_folder, f'{patch_name}.json')
+
+    def _write_marker(self, patch_name, result):
+        """ Writes the marker file of a done patch atomically
+        """
+        marker = self._get_marker(patch_name)
+        with open(f'{marker}.tmp', 'w') as marker_file:
+            json.dump({**result, 'task_times': dict(zip(self.task_names, result['task_times']))}, marker_file)
+        os.replace(f'{marker}.tmp', marker)
+
+    def get_stats(self):
+        """ Returns the time spent in each task over all patches of the last run and the results of all patches
+
+        :return: A dictionary with statistics of tasks and patches
+        :rtype: dict
+        """
+        executed = [result for result in self.results.values() if result['status'] != 'skipped']
+        task_stats = {}
+        for index, name in enumerate(self.task_names):
+            times = [result['task_times'][index] for result in executed if len(result['task_times']) > index]
+            task_stats[name] = {
+                'patches': len(times),
+                'total_time': sum(times),
+                'mean_time': sum(times) / len(times) if times else 0.,
+                'max_time': max(times, default=0.)
+            }
+
+        statuses = [result['status'] for result in self.results.values()]
+        return {
+            'wall_time': self.wall_time,
+            'done': statuses.count('done'),
+            'skipped': statuses.count('skipped'),
+            'failed': statuses.count('failed'),
+            'tasks': task_stats,
+            'patches': self.results
+        }
+
+    def get_report(self):
+        """ Returns a human readable summary of the last run with one line per task and one line per executed patch
+
+        :return: A report of task and patch times
+        :rtype: str
+        """
+        stats = self.get_stats()
+        busy_time = sum(result['total_time'] for result in stats['patches'].values() if 'total_time' in result)
+        lines = [f'Batch finished in {self.wall_time:.2f}s with {self.max_workers} workers: {stats["done"]} done, '
+                 f'{stats["skipped"]} skipped, {stats["failed"]} failed, speed-up '
+                 f'{busy_time / self.wall_time if self.wall_time else 0.:.1f}x',
+                 f'{"task":<32}{"patches":>8}{"total [s]":>11}{"mean [s]":>10}{"max [s]":>10}']
+        for name, task_stats in stats['tasks'].items():
+            lines.append(f'{name:<32}{task_stats["patches"]:>8}{task_stats["total_time"]:>11.2f}'
+                         f'{task_stats["mean_time"]:>10.2f}{task_stats["max_time"]:>10.2f}')
+
+        lines.append(f'{"patch":<32}{"status":>8}{"attempts":>10}{"time [s]":>10}  error')
+        for name, result in stats['patches'].items():
+            if result['status'] != 'skipped':
+                lines.append(f'{name:<32}{result["status"]:>8}{result["attempts"]:>10}{result["total_time"]:>10.2f}'
+                             f'  {result["error"] or ""}')
+
+        return '\n'.join(lines)
@@ -0,0 +1,112 @@
+"""
+A benchmark comparing save time, load time and size of an EOPatch with Sentinel-1 and Sentinel-2 features for different
+codecs of the SaveTask and the serial EOPatch.save of eo-learn
+"""
+import os
+import time
+import shutil
+import tempfile
+import datetime as dt
+import numpy as np
+
+from sentinelhub import BBox, CRS
+from eolearn.core import EOPatch, FeatureType, OverwritePermission
+from EOPatch_IO import SaveTask
+
+# Benchmark Settings
+patch_size = 512  # pixels of 10 m
+s2_times, s2_bands = 12, 13
+s1_times = 24
+max_workers = 8
+configurations = {
+    'none': {},
+    'gzip 1': {'compress_level': 1},
+    'gzip 6': {'compress_level': 6},
+    'gzip 9': {'compress_level': 9},
+    'mixed': {'codecs': {FeatureType.DATA: ('gzip', 1), FeatureType.MASK: ('gzip', 9),
+                         FeatureType.DATA_TIMELESS: ('gzip', 6)}},
+}
+eolearn_compress_levels = (0, 1, 6)
+
+
+def smooth_field(shape, rng, scale=32):
+    """ Creates a spatially correlated random field in [0, 1] by upsampling coarse noise, similar to fields and land
+    cover parcels of a satellite image
+    """
+    coarse = rng.random((*shape[:-2], shape[-2] // scale + 1, shape[-1] // scale + 1))
+    field = np.repeat(np.repeat(coarse, scale, axis=-2), scale, axis=-1)
+    return field[..., :shape[-2], :shape[-1]]
+
+
+def create_patch(seed=42):
+    """ Creates an EOPatch with features of the shapes, data types and value distributions of S1 GRD backscatter,
+    S2 L1C reflectances, a cloud mask and a DEM
+    """
+    rng = np.random.default_rng(seed)
+    eopatch = EOPatch(bbox=BBox((500000, 5500000 - 10 * patch_size, 500000 + 10 * patch_size, 5500000), CRS(32632)))
+
+    start = dt.datetime(2021, 4, 1)
+    eopatch.timestamp = [start + dt.timedelta(days=5 * index) for index in range(s2_times)]
+
+    # reflectances are stored as digital numbers / 10000, i.e. quantized to 1e-4
+    reflectance = smooth_field((s2_times, s2_bands, patch_size, patch_size), rng) * 0.4 + \
+        rng.normal(0, 0.01, (s2_times, s2_bands, patch_size, patch_size))
+    eopatch.data['BANDS-S2-L1C'] = np.round(np.moveaxis(reflectance, 1, -1).clip(0, 1), 4).astype(np.float32)
+
+    clouds = smooth_field((s2_times, patch_size, patch_size), rng, scale=64) > 0.8
+    eopatch.mask['CLM'] = clouds[..., np.newaxis].astype(np.uint8)
+
+    # backscatter in linear scale with multiplicative speckle
+    backscatter = smooth_field((s1_times, 2, patch_size, patch_size), rng) * 0.2 + 0.01
+    speckle = rng.gamma(4, 0.25, (s1_times, 2, patch_size, patch_size))
+    eopatch.data['BANDS-S1-IW'] = np.moveaxis(backscatter * speckle, 1, -1).astype(np.float32)
+
+    dem = smooth_field((1, patch_size, patch_size), rng, scale=128)[0] * 300 + 100
+    eopatch.data_timeless['DEM'] = dem[..., np.newaxis].astype(np.int16)
+
+    return eopatch
+
+
+def get_folder_size(folder):
+    return sum(os.path.getsize(os.path.join(path, name)) for path, _, names in os.walk(folder) for name in names)
+
+
+def run_benchmark(eopatch, folder):
+    """ Saves and loads the EOPatch with each configuration and returns rows of (name, save time, load time, size)
+    """
+    rows = []
+    runs = [(f'SaveTask {name}', SaveTask(folder, overwrite_permission=OverwritePermission.OVERWRITE_PATCH,
+                                          max_workers=max_workers, **parameters).execute)
+            for name, parameters in configurations.items()]
+    runs += [(f'EOPatch.save gzip {level}',
+              lambda patch, eopatch_folder, level=level: patch.save(
+                  os.path.join(folder, eopatch_folder), overwrite_permission=OverwritePermission.OVERWRITE_PATCH,
+                  compress_level=level))
+             for level in eolearn_compress_levels]
+
+    for name, save in runs:
+        start_time = time.perf_counter()
+        save(eopatch, eopatch_folder='patch')
+        save_time = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        EOPatch.load(os.path.join(folder, 'patch'))
+        load_time = time.perf_counter() - start_time
+
+        rows.append((name, save_time, load_time, get_folder_size(os.path.join(folder, 'patch'))))
+
+    return rows
+
+
+if __name__ == '__main__':
+    patch = create_patch()
+    raw_size = sum(patch[feature].nbytes for feature in patch.get_feature_list() if isinstance(feature, tuple))
+    print(f'EOPatch of {patch_size}x{patch_size} pixels with {raw_size / 2 ** 20:.1f} MiB of raster data')
+
+    benchmark_folder = tempfile.mkdtemp()
+    try:
+        print(f'{"configuration":<24}{"save [s]":>10}{"load [s]":>10}{"size [MiB]":>12}{"ratio":>8}')
+        for name, save_time, load_time, size in run_benchmark(patch, benchmark_folder):
+            print(f'{name:<24}{save_time:>10.2f}{load_time:>10.2f}{size / 2 ** 20:>12.1f}{raw_size / size:>8.2f}')
+    finally:
+        shutil.rmtree(benchmark_folder)
@@ -3,15 +3,39 @@ A module implementing utilities for extracting meta information from Sentinel da
 """
 import re
 import xml.etree.ElementTree as ET
-
+import numpy as np
 
 
 from pathlib import Path
 from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
 from geometry_utils import CRS, Geometry
 from shapely.geometry.polygon import Polygon
 
 
+S1_PRODUCT_NAME_LENGTH = 67  # e.g. S1A_IW_GRDH_1SDV_20210927T053448_20210927T053513_039863_04B74D_943B
+S1_SEPARATOR_POSITIONS = [3, 6, 11, 16, 32, 48, 55, 62]
+S1_PRODUCT_FIELDS = [('mission', 0, 3), ('mode', 4, 6), ('product_type', 7, 10), ('resolution', 10, 11),
+                     ('level', 12, 13), ('product_class', 13, 14), ('polarisation', 14, 16), ('datatake', 56, 62),
+                     ('product_id', 63, 67)]
+S1_PRODUCT_DTYPE = np.dtype([('mission', 'U3'), ('mode', 'U2'), ('product_type', 'U3'), ('resolution', 'U1'),
+                             ('level', 'U1'), ('product_class', 'U1'), ('polarisation', 'U2'),
+                             ('start_time', 'datetime64[s]'), ('stop_time', 'datetime64[s]'),
+                             ('absolute_orbit', 'i4'), ('relative_orbit', 'i2'), ('datatake', 'U6'),
+                             ('product_id', 'U4'), ('key', 'O')])
+# first absolute orbit number of each mission that starts a relative orbit cycle, one cycle lasts 175 orbits
+S1_RELATIVE_ORBIT_OFFSETS = {'S1A': 73, 'S1B': 27, 'S1C': 172}
+S1_ORBIT_CYCLE = 175
+
+MANIFEST_FIELDS = ('footprint', 'epsg', 'start_time', 'stop_time', 'absolute_orbit', 'relative_orbit',
+                   'pass_direction', 'polarisations', 'checksums')
+TIME_STAMP_PATTERN = re.compile(r'(?<=[_-])\d{8}[Tt]\d{6}')
+EPSG_PATTERN = re.compile(r'(?<=#)\d{4,5}')
+_MANIFEST_CACHE = dict()
+GEOLOCATION_CACHE_SIZE = 32
+_GEOLOCATION_CACHE = dict()
+
+
 class API_Error(Exception):
     def __init__(self, param_key, param_value):
         message = f"There is an error finding the {param_key} ({param_value}) in the Finder API."
@@ -20,67 +44,237 @@ class API_Error(Exception):
 
 def get_time_stamp_from_filename(file_name):
     """ """
-    if re.search(r'(?<=_)\d\d\d\d\d\d\d\dT\d\d\d\d\d\d', file_name):
-        time_string = re.search(r'(?<=_)\d\d\d\d\d\d\d\dT\d\d\d\d\d\d', file_name).group(0)
-        year = int(time_string[0:4])
-        month = int(time_string[4:6])
-        day = int(time_string[6:8])
-        hour = int(time_string[9:11])
-        minute = int(time_string[11:13])
-        second = int(time_string[13:15])
-        stamp = datetime(year, month, day, hour, minute, second)
-
-    else:
+    time_match = TIME_STAMP_PATTERN.search(file_name)
+    if not time_match:
         raise ValueError('Time stamp could not be retrieved due to unknown date convention in the file name.')
 
-    return stamp
+    return datetime.strptime(time_match.group(0).upper(), '%Y%m%dT%H%M%S')
 
 
-def get_footprint_from_gcps(height: int, width: int, gcps: list, epsg_code: str):
-    """ """
-    for i in range(len(gcps)):
-        if gcps[i].col == 0 and gcps[i].row == 0:
-            p1 = (gcps[i].x, gcps[i].y)
-        elif gcps[i].col == width - 1 and gcps[i].row == 0:
-            p2 = (gcps[i].x, gcps[i].y)
-        elif gcps[i].col == width - 1 and gcps[i].row == height - 1:
-            p3 = (gcps[i].x, gcps[i].y)
-        elif gcps[i].col == 0 and gcps[i].row == height - 1:
-            p4 = (gcps[i].x, gcps[i].y)
-    return Geometry(Polygon([p1, p2, p3, p4]), crs=CRS(epsg_code))
+def get_time_stamps_from_filenames(file_names):
+    """ Retrieves the first time stamp of the form _YYYYMMDDTHHMMSS (or -yyyymmddthhmmss as in Sentinel-1 measurement
+    files) from many file names at once.
 
+    :param file_names: file names or paths
+    :type file_names: list of str
+    :return: time stamps with a precision of seconds, NaT where no time stamp was found
+    :rtype: numpy.ndarray of dtype datetime64[s]
+    """
+    time_strings = []
+    for file_name in file_names:
+        time_match = TIME_STAMP_PATTERN.search(file_name)
+        time_strings.append(time_match.group(0).upper() if time_match else '')
 
-def get_footprint_from_manifest(product_id, feature_id='measurementFrameSet'):
-    """ """
-    if product_id.endswith("manifest.safe"):
-        manifest_file_path = Path(product_id)
-    else:
-        manifest_file_path = Path(product_id) / Path("manifest.safe")
-
-    tree = ET.parse(manifest_file_path)
-    root = tree.getroot()
-
-    i = 0
-    for elem in root:
-        for sub_elem in elem:
-            if 'ID' in sub_elem.attrib.keys():
-                if sub_elem.attrib['ID'] == feature_id:
-                    while i < 8:
-                        i += 1
-                        for sub_sub_elem in sub_elem:
-                            if 'srsName' in sub_sub_elem.attrib.keys():
-                                if re.search(r'(?<=#)\d\d\d\d\d', sub_sub_elem.attrib['srsName']):
-                                    epsg_code = re.search(r'(?<=#)\d\d\d\d\d', sub_sub_elem.attrib['srsName']).group()
-                                else:
-                                    epsg_code = re.search(r'(?<=#)\d\d\d\d', sub_sub_elem.attrib['srsName']).group()
-
-                            if sub_sub_elem.tag.endswith('coordinates'):  # oder: if tag in sub_sub_elem.tag:
-                                coordinates_text = sub_sub_elem.text
-                                break
-                            else:
-                                sub_elem = sub_sub_elem
-    coordinates = []  # list of 4 coordinate tuples
-    coordinates_list_txt = coordinates_text.strip(' ').split(' ')
+    time_stamps = np.full(len(time_strings), np.datetime64('NaT'), dtype='datetime64[s]')
+    time_strings = np.array(time_strings, dtype='S15')
+    is_found = np.char.str_len(time_strings) == 15
+    if is_found.any():
+        time_chars = time_strings[is_found].view(np.uint8).reshape(-1, 15)
+        time_stamps[is_found] = compact_time_stamps_to_datetime64(time_chars)
+
+    return time_stamps
+
+
+class GCPGeolocation:
+    """ Geolocation model of a scene which is referenced by a regular grid of ground control points, as common for
+    Sentinel-1 GRD data. Pixel and map coordinates are mapped onto each other by bilinear interpolation within the
+    cells of the grid, both directions work on whole arrays of coordinates at once.
+
+    Pixel coordinates follow the convention of the GCPs (row and column index of a pixel), map coordinates are given
+    in the CRS of the GCPs with x as longitude and y as latitude.
+    """
+    def __init__(self, gcps, crs):
+        """
+        :param gcps: Ground control points of the scene, e.g. `src.gcps[0]` of a rasterio dataset
+        :type gcps: list(rasterio.control.GroundControlPoint)
+        :param crs: Coordinate reference system of the ground control points, e.g. `src.gcps[1]`
+        :type crs: str or rasterio.crs.CRS
+        """
+        gcp_array = np.array([(gcp.row, gcp.col, gcp.x, gcp.y) for gcp in gcps], dtype=np.float64)
+        self.rows = np.unique(gcp_array[:, 0])
+        self.cols = np.unique(gcp_array[:, 1])
+        self.crs = CRS(str(crs))
+
+        if len(self.rows) < 2 or len(self.cols) < 2 or len(gcp_array) != len(self.rows) * len(self.cols):
+            raise ValueError('The ground control points do not form a regular grid.')
+
+        gcp_array = gcp_array[np.lexsort((gcp_array[:, 1], gcp_array[:, 0]))]
+        self.x_grid = gcp_array[:, 2].reshape(len(self.rows), len(self.cols))
+        self.y_grid = gcp_array[:, 3].reshape(len(self.rows), len(self.cols))
+
+        # least squares affine estimate of the inverse mapping, used as start of the Newton iteration
+        design = np.column_stack([gcp_array[:, 2], gcp_array[:, 3], np.ones(len(gcp_array))])
+        self._inverse_affine = np.linalg.lstsq(design, gcp_array[:, [1, 0]], rcond=None)[0]
+
+    @property
+    def footprint(self):
+        """ Footprint of the scene along the outer GCPs of the grid
+
+        :return: Footprint geometry in the CRS of the GCPs
+        :rtype: Geometry
+        """
+        boundary_x = np.concatenate([self.x_grid[0, :], self.x_grid[1:, -1], self.x_grid[-1, -2::-1],
+                                     self.x_grid[-2:0:-1, 0]])
+        boundary_y = np.concatenate([self.y_grid[0, :], self.y_grid[1:, -1], self.y_grid[-1, -2::-1],
+                                     self.y_grid[-2:0:-1, 0]])
+        return Geometry(Polygon(np.column_stack([boundary_x, boundary_y])), crs=self.crs)
+
+    def _locate(self, rows, cols):
+        """ Returns the cell indices and relative positions within the cells of the given pixel coordinates. Pixels
+        outside of the grid are assigned to the border cells and therefore extrapolated linearly.
+        """
+        i_row = np.clip(np.searchsorted(self.rows, rows, side='right') - 1, 0, len(self.rows) - 2)
+        i_col = np.clip(np.searchsorted(self.cols, cols, side='right') - 1, 0, len(self.cols) - 2)
+
+        row_size = self.rows[i_row + 1] - self.rows[i_row]
+        col_size = self.cols[i_col + 1] - self.cols[i_col]
+        t_row = (rows - self.rows[i_row]) / row_size
+        t_col = (cols - self.cols[i_col]) / col_size
+
+        return i_row, i_col, t_row, t_col, row_size, col_size
+
+    @staticmethod
+    def _interpolate(grid, i_row, i_col, t_row, t_col):
+        """ Bilinear interpolation of a grid and its derivatives with respect to the relative cell positions
+        """
+        upper_left, upper_right = grid[i_row, i_col], grid[i_row, i_col + 1]
+        lower_left, lower_right = grid[i_row + 1, i_col], grid[i_row + 1, i_col + 1]
+
+        upper = upper_left + t_col * (upper_right - upper_left)
+        lower = lower_left + t_col * (lower_right - lower_left)
+        value = upper + t_row * (lower - upper)
+
+        d_col = (1 - t_row) * (upper_right - upper_left) + t_row * (lower_right - lower_left)
+        d_row = lower - upper
+
+        return value, d_row, d_col
+
+    def pixel_to_xy(self, rows, cols):
+        """ Transforms pixel coordinates into map coordinates
+
+        :param rows: Row coordinates of the pixels
+        :type rows: float or numpy.ndarray
+        :param cols: Column coordinates of the pixels
+        :type cols: float or numpy.ndarray
+        :return: Map coordinates x and y of the same shape as the input
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        rows, cols = np.broadcast_arrays(np.asarray(rows, dtype=np.float64), np.asarray(cols, dtype=np.float64))
+        i_row, i_col, t_row, t_col, _, _ = self._locate(rows, cols)
+
+        x_values = self._interpolate(self.x_grid, i_row, i_col, t_row, t_col)[0]
+        y_values = self._interpolate(self.y_grid, i_row, i_col, t_row, t_col)[0]
+        return x_values, y_values
+
+    def xy_to_pixel(self, x_values, y_values, max_iterations=10, tolerance=1e-3):
+        """ Transforms map coordinates into pixel coordinates by inverting the bilinear interpolation with Newton
+        iterations, starting from a least squares affine estimate.
+
+        :param x_values: Map x coordinates (longitudes)
+        :type x_values: float or numpy.ndarray
+        :param y_values: Map y coordinates (latitudes)
+        :type y_values: float or numpy.ndarray
+        :param max_iterations: Maximum number of Newton iterations
+        :type max_iterations: int
+        :param tolerance: Iterations stop when no pixel coordinate changes by more than this value
+        :type tolerance: float
+        :return: Row and column coordinates of the same shape as the input
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        x_values, y_values = np.broadcast_arrays(np.asarray(x_values, dtype=np.float64),
+                                                 np.asarray(y_values, dtype=np.float64))
+        (col_x, row_x), (col_y, row_y), (col_offset, row_offset) = self._inverse_affine
+        cols = col_x * x_values + col_y * y_values + col_offset
+        rows = row_x * x_values + row_y * y_values + row_offset
+
+        for _ in range(max_iterations):
+            i_row, i_col, t_row, t_col, row_size, col_size = self._locate(rows, cols)
+            x_estimate, dx_row, dx_col = self._interpolate(self.x_grid, i_row, i_col, t_row, t_col)
+            y_estimate, dy_row, dy_col = self._interpolate(self.y_grid, i_row, i_col, t_row, t_col)
+
+            dx_row, dx_col = dx_row / row_size, dx_col / col_size
+            dy_row, dy_col = dy_row / row_size, dy_col / col_size
+            x_error, y_error = x_values - x_estimate, y_values - y_estimate
+
+            determinant = dx_col * dy_row - dx_row * dy_col
+            col_step = (dy_row * x_error - dx_row * y_error) / determinant
+            row_step = (dx_col * y_error - dy_col * x_error) / determinant
+
+            cols, rows = cols + col_step, rows + row_step
+            if max(np.max(np.abs(col_step), initial=0), np.max(np.abs(row_step), initial=0)) < tolerance:
+                break
+
+        return rows, cols
+
+    def get_window(self, bbox, densify=16):
+        """ Calculates the pixel window which covers a bounding box. The boundary of the bounding box is densified
+        before it is transformed, so the window also covers the curvature of the mapping.
+
+        :param bbox: Bounding box in any CRS
+        :type bbox: BBox
+        :param densify: Number of points per edge of the bounding box
+        :type densify: int
+        :return: The window as ((row_start, row_stop), (col_start, col_stop))
+        :rtype: tuple
+        """
+        if bbox.crs is not self.crs:
+            bbox = bbox.transform_bounds(self.crs)
+
+        (min_x, min_y), (max_x, max_y) = bbox.lower_left, bbox.upper_right
+        steps = np.linspace(0, 1, densify)
+        x_values = np.concatenate([min_x + steps * (max_x - min_x), np.full(densify, max_x),
+                                   max_x - steps * (max_x - min_x), np.full(densify, min_x)])
+        y_values = np.concatenate([np.full(densify, min_y), min_y + steps * (max_y - min_y),
+                                   np.full(densify, max_y), max_y - steps * (max_y - min_y)])
+
+        rows, cols = self.xy_to_pixel(x_values, y_values)
+
+        return (int(np.floor(rows.min())), int(np.ceil(rows.max())) + 1), \
+            (int(np.floor(cols.min())), int(np.ceil(cols.max())) + 1)
+
+    def get_coordinates(self, window=None):
+        """ Computes the map coordinates of every pixel of a window in one step
+
+        :param window: The window as ((row_start, row_stop), (col_start, col_stop)), by default the whole GCP grid
+        :type window: tuple or None
+        :return: Arrays of x and y coordinates of shape (height, width)
+        :rtype: (numpy.ndarray, numpy.ndarray)
+        """
+        if window is None:
+            window = (int(self.rows[0]), int(self.rows[-1]) + 1), (int(self.cols[0]), int(self.cols[-1]) + 1)
+        (row_start, row_stop), (col_start, col_stop) = window
+
+        return self.pixel_to_xy(np.arange(row_start, row_stop)[:, np.newaxis],
+                                np.arange(col_start, col_stop)[np.newaxis, :])
+
+
+def get_gcp_geolocation(gcps, crs):
+    """ Returns the geolocation model of a GCP grid. Models are cached, so scenes sharing the same GCPs (e.g. the
+    polarisations of one product) build the model only once.
+
+    :param gcps: Ground control points, e.g. `src.gcps[0]` of a rasterio dataset
+    :type gcps: list(rasterio.control.GroundControlPoint)
+    :param crs: Coordinate reference system of the ground control points
+    :type crs: str or rasterio.crs.CRS
+    :return: The geolocation model
+    :rtype: GCPGeolocation
+    """
+    cache_key = (str(crs), np.array([(gcp.row, gcp.col, gcp.x, gcp.y) for gcp in gcps], dtype=np.float64).tobytes())
+
+    if cache_key not in _GEOLOCATION_CACHE:
+        if len(_GEOLOCATION_CACHE) >= GEOLOCATION_CACHE_SIZE:
+            _GEOLOCATION_CACHE.pop(next(iter(_GEOLOCATION_CACHE)))
+        _GEOLOCATION_CACHE[cache_key] = GCPGeolocation(gcps, crs)
+
+    return _GEOLOCATION_CACHE[cache_key]
+
+
+def parse_coordinates_text(coordinates_text):
+    """ Parses the text of a footprint element of a manifest file into a list of coordinate tuples. Sentinel-1
+    manifests state 4 comma separated pairs, Sentinel-2 manifests a closed ring of space separated values.
+    """
+    coordinates = []
+    coordinates_list_txt = coordinates_text.strip(' ').split()
 
     if len(coordinates_list_txt) == 4:  # Format for S1 coordinates: altitude1,latitude1 alt2,lat2 ...
         for coordinate in coordinates_list_txt:
@@ -94,4 +288,299 @@ def get_footprint_from_manifest(product_id, feature_id='measurementFrameSet'):
     else:
         raise ValueError('Coordinates from feature text could not be interpreted.')
 
-    return Geometry(Polygon(coordinates), crs=CRS(epsg_code))
\ No newline at end of file
+    return coordinates
+
+
+def _get_manifest_path(product_id):
+    if str(product_id).endswith("manifest.safe"):
+        return Path(product_id)
+    return Path(product_id) / Path("manifest.safe")
+
+
+def _local_name(tag):
+    return tag.rsplit('}', 1)[-1]
+
+
+def _parse_manifest_time(time_text):
+    return datetime.fromisoformat(time_text.strip().rstrip('Z'))
+
+
+def find_manifest_feature_text(source, feature_id='measurementFrameSet', tag='coordinates'):
+    """ Streams through a manifest file and returns the text of the first element ending with `tag` inside the
+    metadata object `feature_id`. Parsing stops as soon as the element has been found.
+
+    :param source: path of the manifest file or a file object
+    :type source: str or Path or file
+    :return: text of the element
+    :rtype: str
+    """
+    in_feature = False
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        if event == 'start':
+            if elem.attrib.get('ID') == feature_id:
+                in_feature = True
+        elif in_feature and elem.tag.endswith(tag):
+            return elem.text
+
+    raise ValueError(f"The manifest file does not feature an element '{tag}' in '{feature_id}'.")
+
+
+def extract_manifest_fields(source, fields=MANIFEST_FIELDS, feature_id='measurementFrameSet'):
+    """ Extracts meta information from a manifest file in a single streaming pass. Parsing stops as soon as all
+    requested fields have been found.
+
+    :param source: path of the manifest file or a file object
+    :type source: str or Path or file
+    :param fields: names of the fields to be extracted, any of `MANIFEST_FIELDS`:
+        footprint - list of coordinate tuples as stated in the manifest,
+        epsg - EPSG code of the footprint,
+        start_time, stop_time - acquisition period as datetime,
+        absolute_orbit, relative_orbit - orbit numbers at the start of the acquisition,
+        pass_direction - 'ASCENDING' or 'DESCENDING',
+        polarisations - list of polarisations, e.g. ['VV', 'VH'],
+        checksums - dictionary of the MD5 checksums of all data objects by their relative file location
+    :type fields: tuple of str
+    :param feature_id: ID of the metadata object holding the footprint
+    :type feature_id: str
+    :return: dictionary of the found fields, fields missing in the manifest are left out
+    :rtype: dict
+    """
+    fields = set(fields)
+    unknown_fields = fields.difference(MANIFEST_FIELDS)
+    if unknown_fields:
+        raise ValueError(f'Unknown manifest fields {unknown_fields}, supported are {MANIFEST_FIELDS}')
+
+    result, complete = dict(), set()
+    metadata_object, file_location = None, None
+
+    for event, elem in ET.iterparse(source, events=('start', 'end')):
+        name = _local_name(elem.tag)
+
+        if event == 'start':
+            if name == 'metadataObject':
+                metadata_object = elem.attrib.get('ID')
+            elif name == 'fileLocation':
+                file_location = elem.attrib.get('href')
+            elif metadata_object == feature_id and 'srsName' in elem.attrib and 'epsg' not in result:
+                epsg_match = EPSG_PATTERN.search(elem.attrib['srsName'])
+                if epsg_match:
+                    result['epsg'] = epsg_match.group()
+                    complete.add('epsg')
+            continue
+
+        if name in ('coordinates', 'posList') and metadata_object == feature_id and 'footprint' not in result:
+            result['footprint'] = parse_coordinates_text(elem.text)
+            complete.add('footprint')
+        elif name in ('startTime', 'stopTime') and name not in complete:
+            field = 'start_time' if name == 'startTime' else 'stop_time'
+            result[field] = _parse_manifest_time(elem.text)
+            complete.update((field, name))
+        elif name in ('orbitNumber', 'relativeOrbitNumber') and elem.attrib.get('type', 'start') == 'start':
+            field = 'absolute_orbit' if name == 'orbitNumber' else 'relative_orbit'
+            result[field] = int(elem.text)
+            complete.add(field)
+        elif name == 'pass':
+            result['pass_direction'] = elem.text.strip()
+            complete.add('pass_direction')
+        elif name == 'transmitterReceiverPolarisation':
+            result.setdefault('polarisations', []).append(elem.text.strip())
+        elif name == 'checksum' and file_location is not None:
+            result.setdefault('checksums', dict())[file_location.lstrip('./')] = elem.text.strip()
+        elif name == 'metadataObject':
+            if 'polarisations' in result:
+                complete.add('polarisations')
+            metadata_object = None
+        elif name == 'dataObjectSection':
+            complete.add('checksums')
+
+        elem.clear()
+        if fields.issubset(complete):
+            break
+
+    return {field: value for field, value in result.items() if field in fields}
+
+
+def read_manifest(product_id, fields=MANIFEST_FIELDS):
+    """ Reads the meta information of a local product from its manifest file, see `extract_manifest_fields`. Results
+    are memoized by the path and the modification time of the manifest file.
+
+    :param product_id: path of a .SAFE product folder or of its manifest file
+    :type product_id: str or Path
+    :param fields: names of the fields to be extracted
+    :type fields: tuple of str
+    :return: dictionary of the found fields
+    :rtype: dict
+    """
+    manifest_file_path = _get_manifest_path(product_id)
+    cache_key = (str(manifest_file_path.resolve()), frozenset(fields))
+    modification_time = manifest_file_path.stat().st_mtime_ns
+
+    cached = _MANIFEST_CACHE.get(cache_key)
+    if cached is None or cached[0] != modification_time:
+        cached = modification_time, extract_manifest_fields(manifest_file_path, fields=fields)
+        _MANIFEST_CACHE[cache_key] = cached
+
+    return dict(cached[1])
+
+
+def _read_manifest_with_time(manifest_file_path, fields):
+    return manifest_file_path.stat().st_mtime_ns, extract_manifest_fields(manifest_file_path, fields=fields)
+
+
+def read_manifests(product_ids, fields=MANIFEST_FIELDS, max_workers=None, chunksize=16):
+    """ Reads the manifest files of many local products in a process pool, see `read_manifest`. Already memoized
+    manifest files are not parsed again and the results of the pool are memoized in the calling process.
+
+    :param product_ids: paths of .SAFE product folders or of their manifest files
+    :type product_ids: list of str or Path
+    :param fields: names of the fields to be extracted
+    :type fields: tuple of str
+    :param max_workers: number of processes, by default the number of CPUs
+    :type max_workers: int or None
+    :param chunksize: number of manifest files sent to a process at once
+    :type chunksize: int
+    :return: dictionaries of the found fields in the order of the given products
+    :rtype: list of dict
+    """
+    manifest_file_paths = [_get_manifest_path(product_id) for product_id in product_ids]
+    cache_keys = [(str(path.resolve()), frozenset(fields)) for path in manifest_file_paths]
+
+    missing = [(path, key) for path, key in zip(manifest_file_paths, cache_keys)
+               if key not in _MANIFEST_CACHE or _MANIFEST_CACHE[key][0] != path.stat().st_mtime_ns]
+    missing = list(dict((key, path) for path, key in missing).items())
+
+    if missing:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = executor.map(_read_manifest_with_time, [path for _, path in missing],
+                                   [tuple(fields)] * len(missing), chunksize=chunksize)
+            for (key, _), result in zip(missing, results):
+                _MANIFEST_CACHE[key] = result
+
+    return [dict(_MANIFEST_CACHE[key][1]) for key in cache_keys]
+
+
+def get_footprint_from_manifest(product_id, feature_id='measurementFrameSet'):
+    """ """
+    if feature_id == 'measurementFrameSet':
+        manifest = read_manifest(product_id, fields=('footprint', 'epsg'))
+    else:
+        manifest = extract_manifest_fields(_get_manifest_path(product_id), fields=('footprint', 'epsg'),
+                                           feature_id=feature_id)
+
+    return Geometry(Polygon(manifest['footprint']), crs=CRS(manifest['epsg']))
+
+
+def compact_time_stamps_to_datetime64(time_chars):
+    """ Converts compact time stamps of the form YYYYMMDDTHHMMSS into numpy datetime64 values in one vectorized step.
+
+    :param time_chars: ascii codes of the time stamps, one time stamp per row
+    :type time_chars: numpy.ndarray of shape (N, 15) and dtype uint8
+    :return: time stamps with a precision of seconds
+    :rtype: numpy.ndarray of dtype datetime64[s]
+    """
+    iso_chars = np.empty((time_chars.shape[0], 19), dtype=np.uint8)
+    iso_chars[:, [4, 7]] = ord('-')
+    iso_chars[:, [13, 16]] = ord(':')
+    iso_chars[:, [0, 1, 2, 3, 5, 6, 8, 9, 10, 11, 12, 14, 15, 17, 18]] = time_chars
+
+    return iso_chars.view('S19').ravel().astype('datetime64[s]')
+
+
+def get_relative_orbit(absolute_orbit, mission):
+    """ Computes the relative orbit numbers of Sentinel-1 acquisitions from their absolute orbit numbers.
+
+    :param absolute_orbit: absolute orbit numbers
+    :type absolute_orbit: int or numpy.ndarray
+    :param mission: mission identifier(s), either 'S1A', 'S1B' or 'S1C'
+    :type mission: str or numpy.ndarray
+    :return: relative orbit numbers between 1 and 175, for an array of missions the relative orbits of unknown missions
+        are -1
+    :rtype: int or numpy.ndarray
+    :raises: ValueError if a single mission is unknown
+    """
+    if isinstance(mission, str):
+        if mission not in S1_RELATIVE_ORBIT_OFFSETS:
+            raise ValueError(f"The mission ID is restricted to one of {list(S1_RELATIVE_ORBIT_OFFSETS)}, "
+                             f"got '{mission}'.")
+        return (absolute_orbit - S1_RELATIVE_ORBIT_OFFSETS[mission]) % S1_ORBIT_CYCLE + 1
+
+    offsets = np.zeros(np.shape(mission), dtype=np.int64)
+    is_known = np.zeros(np.shape(mission), dtype=bool)
+    for mission_id, offset in S1_RELATIVE_ORBIT_OFFSETS.items():
+        is_mission = mission == mission_id
+        offsets[is_mission] = offset
+        is_known |= is_mission
+
+    return np.where(is_known, (np.asarray(absolute_orbit) - offsets) % S1_ORBIT_CYCLE + 1, -1)
+
+
+def parse_s1_product_names(keys):
+    """ Parses the names of Sentinel-1 products into a numpy record array. The names are parsed at once by slicing a
+    character matrix, keys which do not follow the Sentinel-1 naming convention are dropped.
+
+    :param keys: keys or paths of the products, e.g. Sentinel-1/SAR/GRD/2021/09/27/S1A_IW_GRDH_1SDV_..._943B.SAFE/
+    :type keys: list of str
+    :return: one record per valid product with the fields of `S1_PRODUCT_DTYPE`, the original key is kept in `key`.
+        The relative orbit of a product of an unknown mission is -1, see `get_relative_orbit`.
+    :rtype: numpy.recarray
+    """
+    keys = np.asarray(keys, dtype=object)
+    records = np.recarray(0, dtype=S1_PRODUCT_DTYPE)
+    if keys.size == 0:
+        return records
+
+    names = np.array([key.rstrip('/').rsplit('/', 1)[-1][:S1_PRODUCT_NAME_LENGTH + 1] for key in keys])
+    is_valid = np.char.str_len(names) >= S1_PRODUCT_NAME_LENGTH
+    names = np.char.encode(names, 'ascii', 'replace').astype(f'S{S1_PRODUCT_NAME_LENGTH}')
+
+    chars = names.view(np.uint8).reshape(-1, S1_PRODUCT_NAME_LENGTH)
+    is_valid &= np.all(chars[:, S1_SEPARATOR_POSITIONS] == ord('_'), axis=1)
+    is_valid &= np.all((chars[:, 49:55] >= ord('0')) & (chars[:, 49:55] <= ord('9')), axis=1)
+
+    keys, chars = keys[is_valid], chars[is_valid]
+    records = np.recarray(len(keys), dtype=S1_PRODUCT_DTYPE)
+    records.key = keys
+
+    for field, start, stop in S1_PRODUCT_FIELDS:
+        records[field] = np.ascontiguousarray(chars[:, start:stop]).view(f'S{stop - start}').ravel().astype(
+            f'U{stop - start}')
+
+    records.start_time = compact_time_stamps_to_datetime64(chars[:, 17:32])
+    records.stop_time = compact_time_stamps_to_datetime64(chars[:, 33:48])
+    records.absolute_orbit = (chars[:, 49:55].astype(np.int32) - ord('0')) @ (10 ** np.arange(5, -1, -1))
+    records.relative_orbit = get_relative_orbit(records.absolute_orbit, records.mission)
+
+    return records
+
+
+def get_s1_product_masks(records, mission_id=None, scan_mode=None, product_type=None, resolution=None,
+                         processing_level=None, product_class=None, polarisation_class=None, date=None,
+                         relative_orbit=None):
+    """ Builds a boolean mask for each of the given filters over a record array of Sentinel-1 products. Filters which
+    are None are skipped.
+
+    :param records: products as returned by `parse_s1_product_names`
+    :type records: numpy.recarray
+    :param date: acquisition date of the products, e.g. '2021/09/27' or a datetime
+    :type date: str or datetime or numpy.datetime64
+    :param relative_orbit: one or several relative orbit numbers
+    :type relative_orbit: int or list of int
+    :return: filter name and mask pairs in the order of the product title
+    :rtype: list of (str, numpy.ndarray)
+    """
+    filters = [('Mission ID', 'mission', mission_id), ('Scan Mode', 'mode', scan_mode),
+               ('Produkt Typ', 'product_type', product_type), ('Resolution', 'resolution', resolution),
+               ('Processing Level', 'level', processing_level), ('Product Class', 'product_class', product_class),
+               ('Polarisation Class', 'polarisation', polarisation_class)]
+
+    masks = [(name, records[field] == value) for name, field, value in filters if value is not None]
+
+    if date is not None:
+        if isinstance(date, str):
+            date = date.replace('/', '-')
+        masks.append(('Date', records.start_time.astype('datetime64[D]') == np.datetime64(date, 'D')))
+
+    if relative_orbit is not None:
+        masks.append(('Relative Orbit', np.isin(records.relative_orbit, np.atleast_1d(relative_orbit).astype(int))))
+
+    return masks
@@ -0,0 +1,78 @@
+"""
+Tests of importing images referenced by ground control points, as common for Sentinel-1 GRD data
+"""
+import numpy as np
+import pytest
+import rasterio
+from rasterio.control import GroundControlPoint
+
+from sentinelhub import BBox, CRS
+from eolearn.core import EOPatch, FeatureType
+
+from EOPatch_IO import ImportFromTiffTask, ImportTilesFromTiffTask
+from sentinel_io_utils import get_gcp_geolocation
+
+WIDTH, HEIGHT = 300, 500
+
+
+def _pixel_to_lon_lat(rows, cols, angle=np.radians(20), pixel_size=1e-4):
+    """ A north-up grid rotated by an angle, like the ground track of an ascending orbit
+    """
+    lon = 10 + pixel_size * (np.cos(angle) * cols + np.sin(angle) * rows)
+    lat = 46 + pixel_size * (np.sin(angle) * cols - np.cos(angle) * rows)
+    return lon, lat
+
+
+@pytest.fixture(name='gcp_image')
+def gcp_image_fixture(tmp_path):
+    """ Writes an image referenced by a rotated GCP grid, its bands hold the row and column index of each pixel
+    """
+    gcps = []
+    for row in np.linspace(0, HEIGHT - 1, 6):
+        for col in np.linspace(0, WIDTH - 1, 6):
+            lon, lat = _pixel_to_lon_lat(row, col)
+            gcps.append(GroundControlPoint(row=row, col=col, x=lon, y=lat))
+
+    rows, cols = np.mgrid[:HEIGHT, :WIDTH].astype(np.uint16)
+    path = str(tmp_path / 'grd.tif')
+    with rasterio.open(path, 'w', driver='GTiff', width=WIDTH, height=HEIGHT, count=2, dtype='uint16') as dst:
+        dst.write(np.stack([rows, cols]))
+        dst.gcps = gcps, rasterio.crs.CRS.from_epsg(4326)
+
+    return path, get_gcp_geolocation(gcps, 'EPSG:4326')
+
+
+def test_import_of_rotated_gcp_grid(gcp_image):
+    path, geolocation = gcp_image
+    lon, lat = _pixel_to_lon_lat(np.array([120, 160]), np.array([100, 140]))
+    bbox = BBox((lon.min(), lat.min(), lon.max(), lat.max()), CRS.WGS84)
+
+    eopatch = ImportFromTiffTask((FeatureType.DATA_TIMELESS, 'BANDS'), path).execute(EOPatch(bbox=bbox))
+    data = eopatch.data_timeless['BANDS']
+
+    (top, bottom), (left, right) = geolocation.get_window(bbox)
+    assert data.shape == (bottom - top, right - left, 2)
+    assert np.array_equal(data[..., 0], np.broadcast_to(np.arange(top, bottom)[:, np.newaxis], data.shape[:2]))
+    assert np.array_equal(data[..., 1], np.broadcast_to(np.arange(left, right), data.shape[:2]))
+
+    # the pixels of the corners of the bounding box are read from the rows and columns the model maps them to
+    corner_rows, corner_cols = geolocation.xy_to_pixel(lon, lat)
+    assert np.allclose(corner_rows, [120, 160], atol=1e-3) and np.allclose(corner_cols, [100, 140], atol=1e-3)
+    assert top <= 120 and bottom >= 160 and left <= 100 and right >= 140
+
+
+def test_tiles_of_rotated_gcp_grid(gcp_image):
+    path, geolocation = gcp_image
+    bbox_list = []
+    for row, col in ((50, 40), (300, 200)):
+        lon, lat = _pixel_to_lon_lat(np.array([row, row + 30]), np.array([col, col + 50]))
+        bbox_list.append(BBox((lon.min(), lat.min(), lon.max(), lat.max()), CRS.WGS84))
+
+    eopatches = ImportTilesFromTiffTask((FeatureType.DATA_TIMELESS, 'BANDS'), path).execute(bbox_list)
+
+    for bbox, eopatch in zip(bbox_list, eopatches):
+        data = eopatch.data_timeless['BANDS']
+        (top, bottom), (left, right) = geolocation.get_window(bbox)
+        assert data.shape == (bottom - top, right - left, 2)
+        assert np.array_equal(data[0, :, 1], np.arange(left, right))
+        assert np.array_equal(data[:, 0, 0], np.arange(top, bottom))
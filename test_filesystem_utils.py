@@ -0,0 +1,176 @@
+"""
+Tests of the S3 utilities of filesystem_utils against a local S3 stand-in, which requires moto
+"""
+import os
+
+import numpy as np
+import pytest
+import rasterio
+from rasterio.transform import from_origin
+
+moto = pytest.importorskip('moto')
+boto3 = pytest.importorskip('boto3')
+
+from fs_s3fs import S3FS
+from sentinelhub import BBox, CRS
+from eolearn.core import EOPatch, FeatureType
+
+from filesystem_utils import S3BlockFile, close_filesystems, open_s3_file
+from EOPatch_IO import RASTERIO_OPENER, ImportFromTiffTask, ImportTilesFromTiffTask
+
+BUCKET_NAME = 'test-bucket'
+mock_aws = getattr(moto, 'mock_aws', None) or moto.mock_s3
+
+
+@pytest.fixture(name='s3_requests')
+def s3_requests_fixture(monkeypatch):
+    """ Starts a mocked S3 with an empty bucket and yields a list into which the ranges of all GET requests are
+    recorded
+    """
+    for name, value in (('AWS_ACCESS_KEY_ID', 'testing'), ('AWS_SECRET_ACCESS_KEY', 'testing'),
+                        ('AWS_DEFAULT_REGION', 'us-east-1')):
+        monkeypatch.setenv(name, value)
+
+    with mock_aws():
+        boto3.setup_default_session()
+        boto3.client('s3').create_bucket(Bucket=BUCKET_NAME)
+
+        requests = []
+        boto3.DEFAULT_SESSION.events.register('provide-client-params.s3.GetObject',
+                                              lambda params, **_: requests.append(params.get('Range')))
+        yield requests
+
+        close_filesystems()
+        boto3.DEFAULT_SESSION = None
+
+
+@pytest.fixture(name='s3_filesystem')
+def s3_filesystem_fixture(s3_requests):
+    return S3FS(BUCKET_NAME, strict=False)
+
+
+def _get_range_size(byte_range):
+    start, stop = map(int, byte_range[len('bytes='):].split('-'))
+    return stop - start + 1
+
+
+def test_random_reads(s3_filesystem, s3_requests):
+    data = np.random.default_rng(0).bytes(100_003)
+    s3_filesystem.writebytes('blob', data)
+
+    with open_s3_file(s3_filesystem, 'blob', block_size=1000, cache_blocks=8, read_ahead=4) as file_handle:
+        rng = np.random.default_rng(1)
+        for start, length in zip(rng.integers(0, len(data), 200), rng.integers(0, 5000, 200)):
+            file_handle.seek(start)
+            assert file_handle.read(length) == data[start:start + length]
+
+        file_handle.seek(-10, os.SEEK_END)
+        assert file_handle.read(100) == data[-10:]
+        assert file_handle.read(100) == b''
+        assert len(file_handle._blocks) <= 8
+
+    assert s3_requests and all(byte_range is not None for byte_range in s3_requests)
+    assert file_handle.request_count == len(s3_requests)
+    assert file_handle.fetched_bytes == sum(_get_range_size(byte_range) for byte_range in s3_requests)
+
+
+def test_block_cache(s3_filesystem, s3_requests):
+    s3_filesystem.writebytes('blob', bytes(range(256)) * 400)
+
+    with open_s3_file(s3_filesystem, 'blob', block_size=1000, cache_blocks=4, read_ahead=0) as file_handle:
+        file_handle.seek(50_000)
+        file_handle.read(1500)
+        assert file_handle.request_count == 1
+        assert file_handle.fetched_bytes == 2000
+
+        file_handle.seek(50_100)
+        file_handle.read(1000)
+        assert file_handle.request_count == 1
+
+        for block in range(4):
+            file_handle.seek(block * 10_000)
+            file_handle.read(1)
+        file_handle.seek(50_000)
+        file_handle.read(1)
+        assert file_handle.request_count == 6, 'The evicted block should have been downloaded again'
+
+    assert s3_requests[0] == 'bytes=50000-51999'
+
+
+def test_read_ahead(s3_filesystem):
+    data = np.random.default_rng(2).bytes(64_000)
+    s3_filesystem.writebytes('blob', data)
+
+    with open_s3_file(s3_filesystem, 'blob', block_size=1000, cache_blocks=64, read_ahead=8) as file_handle:
+        chunks = [file_handle.read(300) for _ in range(-(-len(data) // 300))]
+        assert b''.join(chunks) == data
+        # the read-ahead of the 9 requests grows from 1 to 2, 4 and then 8 blocks
+        assert file_handle.request_count == 9
+        assert file_handle.fetched_bytes == len(data)
+
+    with open_s3_file(s3_filesystem, 'blob', block_size=1000, cache_blocks=64, read_ahead=8) as file_handle:
+        for start in range(4000, len(data), 8000):
+            file_handle.seek(start)
+            file_handle.read(10)
+        assert file_handle.request_count == 8
+        assert file_handle.fetched_bytes == 8000, 'Seeks should not trigger any read-ahead'
+
+
+def test_missing_object(s3_filesystem):
+    with pytest.raises(FileNotFoundError):
+        open_s3_file(s3_filesystem, 'missing.tif')
+
+    with pytest.raises(ValueError):
+        open_s3_file(s3_filesystem, 'blob', mode='wb')
+
+
+def test_invalid_parameters(s3_filesystem):
+    s3_filesystem.writebytes('blob', b'data')
+    with pytest.raises(ValueError):
+        S3BlockFile(s3_filesystem.client, BUCKET_NAME, 'blob', block_size=0)
+
+
+def _write_tiled_scene(s3_filesystem, tmp_path, size=2048):
+    """ Writes a tiled GeoTIFF of random values to the bucket and returns its values and size in bytes
+    """
+    image = np.random.default_rng(3).integers(0, 10000, (1, size, size), dtype=np.uint16)
+    local_path = str(tmp_path / 'scene.tif')
+    with rasterio.open(local_path, 'w', driver='GTiff', width=size, height=size, count=1, dtype='uint16',
+                       crs='EPSG:32632', transform=from_origin(500000, 5500000, 10, 10), tiled=True, blockxsize=256,
+                       blockysize=256) as dst:
+        dst.write(image)
+    with open(local_path, 'rb') as file_handle:
+        s3_filesystem.writebytes('scenes/scene.tif', file_handle.read())
+    return image, os.path.getsize(local_path)
+
+
+@pytest.mark.skipif(not RASTERIO_OPENER, reason='Reading through openers requires rasterio>=1.4')
+def test_windowed_read_of_tiled_geotiff(s3_filesystem, s3_requests, tmp_path):
+    image, file_size = _write_tiled_scene(s3_filesystem, tmp_path)
+    s3_requests.clear()
+
+    bbox = BBox((500000 + 3000, 5500000 - 2000, 500000 + 5000, 5500000 - 1000), CRS(32632))
+    task = ImportFromTiffTask((FeatureType.DATA_TIMELESS, 'BANDS'), f's3://{BUCKET_NAME}/scenes/scene.tif')
+    eopatch = task.execute(EOPatch(bbox=bbox))
+
+    assert np.array_equal(eopatch.data_timeless['BANDS'][..., 0], image[0, 100:200, 300:500])
+    assert s3_requests and all(byte_range is not None for byte_range in s3_requests)
+    assert sum(map(_get_range_size, s3_requests)) < file_size / 10
+
+
+@pytest.mark.skipif(not RASTERIO_OPENER, reason='Reading through openers requires rasterio>=1.4')
+def test_tiles_of_tiled_geotiff(s3_filesystem, s3_requests, tmp_path):
+    image, file_size = _write_tiled_scene(s3_filesystem, tmp_path)
+    s3_requests.clear()
+
+    bbox_list = [BBox((500000 + x, 5500000 - y - 2560, 500000 + x + 2560, 5500000 - y), CRS(32632))
+                 for x in (0, 2560) for y in (0, 2560)]
+    task = ImportTilesFromTiffTask((FeatureType.DATA_TIMELESS, 'BANDS'), f's3://{BUCKET_NAME}/scenes/scene.tif',
+                                   max_workers=2)
+    eopatches = task.execute(bbox_list)
+
+    for bbox, eopatch in zip(bbox_list, eopatches):
+        col, row = round((bbox.min_x - 500000) / 10), round((5500000 - bbox.max_y) / 10)
+        assert np.array_equal(eopatch.data_timeless['BANDS'][..., 0], image[0, row:row + 256, col:col + 256])
+    assert s3_requests and all(byte_range is not None for byte_range in s3_requests)
+    assert sum(map(_get_range_size, s3_requests)) < file_size / 2